@@ -1,11 +1,15 @@
 from datetime import datetime
 from pathlib import Path
-import sys
 
 from airflow import DAG
 from airflow.providers.standard.operators.python import PythonOperator
 
-from src.rasterscan.helper import project_src_rasterscan_path
+# airflow/plugins is on sys.path for workers and the triggerer
+from floorplan_recognition import RecognizeFloorplanOperator
+
+# Keep this module light: the scheduler re-parses it often. Pipeline modules
+# (shapely, requests, PIL, ...) are imported inside the task callables through
+# the lazily-loading src.rasterscan package.
 
 DEFAULT_ARGS = {
     'owner': 'floorplan-team',
@@ -13,55 +17,21 @@ DEFAULT_ARGS = {
 }
 
 
-def run_recognizer(**context):
+def _force_rerun(context) -> bool:
     """
-    Task 1 : run recognizer (RasterScan implementation)
+    Trigger with conf {"force": true} to ignore stage checkpoints
     """
-    rasterscan_path = project_src_rasterscan_path()
-    sys.path.insert(0, str(rasterscan_path))
-
-    from src.rasterscan.recognizer import FloorplanRecognizer
-    from src.rasterscan.helper import save_json
-
-    project_root = Path(__file__).resolve().parents[1]
-    outputs_dir = project_root / 'outputs' / 'rasterscan'
-    outputs_dir.mkdir(parents=True, exist_ok=True)
-
-    # Determine image path from dag_run conf or default
     dag_run = context.get('dag_run')
-    image_path = None
-    if dag_run and getattr(dag_run, 'conf', None):
-        image_path = dag_run.conf.get('image_path')
-    if not image_path:
-        image_path = str(project_root / 'floorplan-images' / 'floorplan_raw.png')
-
-    output_raw = outputs_dir / 'recognizer_raw.json'
-
-    # If recognizer output already exists, skip recognition and return path
-    if output_raw.exists():
-        # load/verify minimal content could be added here if desired
-        print(f"recognizer_raw.json already exists at {output_raw}; skipping recognition")
-        return str(output_raw)
-
-    # Run recognizer and save output
-    recognizer = FloorplanRecognizer(method='rasterscan')
-    raw = recognizer.recognize_from_image(image_path, str(output_raw))
-
-    # Ensure file saved (recognizer may already save but we save defensively)
-    save_json(raw, str(output_raw))
-
-    return str(output_raw)
+    return bool(dag_run and getattr(dag_run, 'conf', None) and dag_run.conf.get('force'))
 
 
 def run_cleaner(**context):
     """
     Task 2: load raw JSON and clean it with FloorplanCleaner
     """
-    rasterscan_path = project_src_rasterscan_path()
-    sys.path.insert(0, str(rasterscan_path))
-
-    from src.rasterscan.helper import load_json, save_json
-    from src.rasterscan.cleaner import FloorplanCleaner
+    from src.rasterscan import load_json, save_json
+    from src.rasterscan import FloorplanCleaner
+    from src.rasterscan import CheckpointStore
 
     project_root = Path(__file__).resolve().parents[1]
     outputs_dir = project_root / 'outputs' / 'rasterscan'
@@ -73,22 +43,26 @@ def run_cleaner(**context):
 
     raw = load_json(raw_path)
     cleaner = FloorplanCleaner(snap_threshold=5.0)
-    cleaned = cleaner.clean(raw)
+
+    # Retries and reruns with unchanged raw input reuse the checkpointed result
+    store = CheckpointStore(str(outputs_dir / '.checkpoints'))
+    cleaned, reused = store.run_stage('clean', raw, {'snap_threshold': 5.0},
+                                      lambda: cleaner.clean(raw).to_dict(),
+                                      force=_force_rerun(context))
+    print(f"clean stage: {'reused checkpoint' if reused else 'computed'}")
 
     cleaned_path = outputs_dir / 'cleaned_canonical.json'
-    save_json(cleaned.to_dict(), str(cleaned_path))
+    save_json(cleaned, str(cleaned_path))
 
     return str(cleaned_path)
 
 
 def run_optimizer(**context):
     """Task: apply optimizer to cleaned floorplan."""
-    rasterscan_path = project_src_rasterscan_path()
-    sys.path.insert(0, str(rasterscan_path))
-
-    from src.rasterscan.helper import load_json, save_json
-    from src.rasterscan.optimizer import FloorplanOptimizer
-    from src.rasterscan.canonical_schema import Floorplan as CSFloorplan
+    from src.rasterscan import load_json, save_json
+    from src.rasterscan import FloorplanOptimizer
+    from src.rasterscan import Floorplan as CSFloorplan
+    from src.rasterscan import CheckpointStore
     # Note: optimizer implementations are expected to operate on Floorplan dataclass
 
     project_root = Path(__file__).resolve().parents[1]
@@ -109,24 +83,28 @@ def run_optimizer(**context):
 
     # The rasterscan optimizer expects a dataclass Floorplan; try to import helper conversion
     try:
-        from src.rasterscan.helper import dict_to_floorplan
+        from src.rasterscan import dict_to_floorplan
         cleaned_fp = dict_to_floorplan(cleaned_json)
     except Exception:
         # Fallback: pass dict directly if optimizer accepts it
         cleaned_fp = cleaned_json
 
     # Apply optimizations
-    optimized = optimizer.split_bedroom(cleaned_fp) if hasattr(optimizer, 'split_bedroom') else cleaned_fp
-    if hasattr(optimizer, 'add_new_room'):
-        optimized = optimizer.add_new_room(optimized)
+    def optimize():
+        optimized = optimizer.split_bedroom(cleaned_fp) if hasattr(optimizer, 'split_bedroom') else cleaned_fp
+        if hasattr(optimizer, 'add_new_room'):
+            optimized = optimizer.add_new_room(optimized)
+        # If optimized has to_dict method, use it
+        return optimized.to_dict() if hasattr(optimized, 'to_dict') else optimized
+
+    store = CheckpointStore(str(outputs_dir / '.checkpoints'))
+    optimized, reused = store.run_stage('optimize', cleaned_json,
+                                        {'actions': ['split_bedroom', 'add_new_room']},
+                                        optimize, force=_force_rerun(context))
+    print(f"optimize stage: {'reused checkpoint' if reused else 'computed'}")
 
     optimized_path = outputs_dir / 'optimized.json'
-
-    # If optimized has to_dict method, use it
-    if hasattr(optimized, 'to_dict'):
-        save_json(optimized.to_dict(), str(optimized_path))
-    else:
-        save_json(optimized, str(optimized_path))
+    save_json(optimized, str(optimized_path))
 
     return str(optimized_path)
 
@@ -141,10 +119,15 @@ with DAG(
     tags=['floorplan', 'rasterscan'],
 ) as dag:
 
-    recognize_task = PythonOperator(
+    # Task 1: deferrable recognition; the worker slot is released while the
+    # RasterScan request is in flight (set RASTERSCAN_URL and
+    # RASTERSCAN_PREPROCESS=0 for a local fake)
+    project_root = Path(__file__).resolve().parents[1]
+    recognize_task = RecognizeFloorplanOperator(
         task_id='recognize_floorplan',
-        python_callable=run_recognizer,
-
+        image_path="{{ (dag_run.conf or {}).get('image_path', '') }}",
+        default_image_path=str(project_root / 'floorplan-images' / 'floorplan_raw.png'),
+        output_path=str(project_root / 'outputs' / 'rasterscan' / 'recognizer_raw.json'),
     )
 
     clean_task = PythonOperator(
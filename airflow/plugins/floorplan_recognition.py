@@ -0,0 +1,177 @@
+"""
+Deferrable RasterScan recognition for Airflow: the operator prepares the
+upload on a worker, then hands the HTTP round trip to the triggerer so the
+worker slot is free while the recognition is in flight
+
+Airflow puts this plugins folder on sys.path for workers and the triggerer,
+so the trigger is serialized as floorplan_recognition.RecognitionTrigger.
+Point RASTERSCAN_URL at a local fake endpoint to test without the API:
+
+    python -m src.rasterscan.service --replay outputs/rasterscan/recognizer_raw.json
+    export RASTERSCAN_URL=http://127.0.0.1:8765/raster-to-vector-raw
+    export RASTERSCAN_PREPROCESS=0
+
+The fake endpoint replays a recognition of the original image, so the
+upload must not be preprocessed (as with stream.py --replay)
+"""
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from airflow.exceptions import AirflowException
+from airflow.triggers.base import BaseTrigger, TriggerEvent
+
+try:
+    from airflow.sdk import BaseOperator
+except ImportError:  # Airflow 2
+    from airflow.models import BaseOperator
+
+DEFAULT_URL = 'https://backend.rasterscan.com/raster-to-vector-raw'
+
+# Shared by every RecognitionTrigger in the triggerer process; bounds the
+# number of uploads in flight without blocking the triggerer event loop
+_HTTP_POOL = ThreadPoolExecutor(max_workers=int(os.getenv('RASTERSCAN_MAX_IN_FLIGHT', 32)),
+                                thread_name_prefix='rasterscan')
+
+
+class RecognitionTrigger(BaseTrigger):
+    """
+    Upload a prepared image to the recognizer endpoint and write the raw
+    response next to it. Only file paths go through the trigger/event
+    payloads (they are stored in the metadata database), and the API key is
+    read from the triggerer's environment rather than serialized
+    """
+
+    def __init__(self, upload_path: str, response_path: str, url: str = DEFAULT_URL,
+                 request_timeout: float = 300.0):
+        super().__init__()
+        self.upload_path = upload_path
+        self.response_path = response_path
+        self.url = url
+        self.request_timeout = request_timeout
+
+    def serialize(self) -> Tuple[str, Dict[str, Any]]:
+        return (
+            'floorplan_recognition.RecognitionTrigger',
+            {
+                'upload_path': self.upload_path,
+                'response_path': self.response_path,
+                'url': self.url,
+                'request_timeout': self.request_timeout
+            }
+        )
+
+    async def run(self) -> AsyncIterator[TriggerEvent]:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(_HTTP_POOL, self._recognize)
+        except Exception as e:
+            yield TriggerEvent({'status': 'error', 'message': f"{type(e).__name__}: {e}"})
+            return
+        yield TriggerEvent({'status': 'success', 'response_path': self.response_path})
+
+    def _recognize(self):
+        import requests
+        from dotenv import load_dotenv
+        from src.rasterscan import atomic_write_json
+        load_dotenv()
+
+        with open(self.upload_path, 'rb') as f:
+            image_data = f.read()
+        response = requests.post(
+            self.url,
+            files={'image': ('floorplan.png', image_data, 'image/png')},
+            headers={'x-api-key': os.getenv('RASTER_API_KEY', '')},
+            timeout=self.request_timeout
+        )
+        response.raise_for_status()
+
+        # Identical uploads share response_path, so write through a unique temp file
+        atomic_write_json(response.json(), self.response_path)
+
+
+class RecognizeFloorplanOperator(BaseOperator):
+    """
+    Recognize a floorplan image without holding a worker slot during the
+    remote call. Returns the raw JSON path (pulled by the clean task)
+    """
+
+    template_fields = ('image_path', 'output_path')
+
+    def __init__(self, *, image_path: str, output_path: str, default_image_path: Optional[str] = None,
+                 url: Optional[str] = None, preprocess: Optional[bool] = None, skip_existing: bool = True,
+                 request_timeout: float = 300.0, **kwargs):
+        """
+        Args:
+            image_path: image to recognize (templated, e.g. from dag_run.conf)
+            default_image_path: used when image_path renders empty
+            url: recognizer endpoint; defaults to $RASTERSCAN_URL or the RasterScan API
+            preprocess: shrink the upload with ImagePreprocessor and map the result back;
+                        defaults to $RASTERSCAN_PREPROCESS (off when '0') or on
+            skip_existing: reuse output_path if it already exists
+        """
+        super().__init__(**kwargs)
+        self.image_path = image_path
+        self.output_path = output_path
+        self.default_image_path = default_image_path
+        self.url = url
+        self.preprocess = preprocess
+        self.skip_existing = skip_existing
+        self.request_timeout = request_timeout
+
+    def execute(self, context):
+        output_path = Path(self.output_path)
+        if self.skip_existing and output_path.exists():
+            print(f"{output_path.name} already exists at {output_path}; skipping recognition")
+            return str(output_path)
+
+        image_path = self.image_path or self.default_image_path
+        if not image_path:
+            raise AirflowException("No image_path given for recognition")
+
+        preprocess = self.preprocess
+        if preprocess is None:
+            preprocess = os.getenv('RASTERSCAN_PREPROCESS', '1') != '0'
+        if preprocess:
+            from src.rasterscan import ImagePreprocessor
+            prepared = ImagePreprocessor().prepare(image_path)
+            image_data, transform = prepared.data, prepared.transform.to_dict()
+        else:
+            image_data, transform = Path(image_path).read_bytes(), None
+
+        # Staging files are named by upload content, so identical images share them
+        staging = output_path.parent / '.recognition'
+        staging.mkdir(parents=True, exist_ok=True)
+        key = hashlib.sha256(image_data).hexdigest()[:16]
+        upload_path = staging / f"{key}.png"
+        upload_path.write_bytes(image_data)
+
+        self.defer(
+            trigger=RecognitionTrigger(
+                upload_path=str(upload_path),
+                response_path=str(staging / f"{key}.response.json"),
+                url=self.url or os.getenv('RASTERSCAN_URL', DEFAULT_URL),
+                request_timeout=self.request_timeout
+            ),
+            method_name='execute_complete',
+            kwargs={'transform': transform},
+            timeout=timedelta(seconds=self.request_timeout + 60)
+        )
+
+    def execute_complete(self, context, event: Dict, transform: Optional[Dict] = None):
+        if event.get('status') != 'success':
+            raise AirflowException(f"Recognition failed: {event.get('message')}")
+
+        from src.rasterscan import ImageTransform, load_json, map_raw_to_original, save_json
+        raw = load_json(event['response_path'])
+        if transform:
+            raw = map_raw_to_original(raw, ImageTransform(**transform))
+
+        save_json(raw, self.output_path)
+        print(f"Recognized {len(raw.get('rooms', []))} rooms; {len(raw.get('walls', []))} walls; "
+              f"{len(raw.get('doors', []))} doors")
+        return str(self.output_path)
@@ -0,0 +1,104 @@
+"""
+Scaling benchmark for tile-parallel cleaning: cleans a synthetic
+campus-scale plan serially and with TiledCleaner at several worker counts,
+checks that every result is identical to the serial one and reports speedups.
+By default the tile grid grows with the worker count, so speedups mix the
+smaller per-tile work with the extra cores; pass --tile-size to keep the
+tiles fixed and measure core scaling alone
+
+    python benchmarks/clean_scaling.py
+    python benchmarks/clean_scaling.py --rows 40 --cols 40 --workers 1 2 4 8 16
+    python benchmarks/clean_scaling.py --tile-size 600
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.rasterscan.cleaner import FloorplanCleaner  # noqa: E402
+from src.rasterscan.tiled_cleaner import TiledCleaner  # noqa: E402
+
+
+def synthetic_plan(rows: int, cols: int, cell: float = 120.0, jitter: float = 2.0, seed: int = 0) -> Dict:
+    """
+    Raw recognizer output for a rows x cols grid of rooms: jittered room
+    outlines (with the odd duplicated vertex), one wall per room edge whose
+    endpoints need snapping, and a door on every other interior edge
+    """
+    rng = np.random.default_rng(seed)
+
+    def noisy(x, y):
+        dx, dy = rng.uniform(-jitter, jitter, 2)
+        return round(float(x + dx), 2), round(float(y + dy), 2)
+
+    rooms, walls, doors = [], [], []
+    for r in range(rows):
+        for c in range(cols):
+            x0, y0 = c * cell, r * cell
+            corners = [noisy(x0, y0), noisy(x0 + cell, y0), noisy(x0 + cell, y0 + cell), noisy(x0, y0 + cell)]
+            if rng.random() < 0.2:
+                corners.insert(2, noisy(*corners[1]))
+            rooms.append([{'x': x, 'y': y} for x, y in corners])
+
+            walls.append({'position': [list(noisy(x0, y0)), list(noisy(x0 + cell, y0))]})
+            walls.append({'position': [list(noisy(x0, y0)), list(noisy(x0, y0 + cell))]})
+            if c + 1 < cols and (r + c) % 2 == 0:
+                mx, my = x0 + cell, y0 + cell / 2
+                bbox = [noisy(mx - 3, my - 15), noisy(mx + 3, my - 15), noisy(mx + 3, my + 15), noisy(mx - 3, my + 15)]
+                doors.append({'bbox': [list(p) for p in bbox]})
+    return {'rooms': rooms, 'walls': walls, 'doors': doors}
+
+
+def timed(fn, repeat: int):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tile-parallel cleaning scaling benchmark")
+    parser.add_argument("--rows", type=int, default=30)
+    parser.add_argument("--cols", type=int, default=30)
+    parser.add_argument("--workers", type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument("--tile-size", type=float, default=None, help="fixed tile side in plan units")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default=None, help="write the report as JSON")
+    args = parser.parse_args()
+
+    raw = synthetic_plan(args.rows, args.cols)
+    print(f"Plan: {len(raw['rooms'])} rooms, {len(raw['walls'])} walls, {len(raw['doors'])} doors; "
+          f"{os.cpu_count()} CPUs available")
+
+    serial_time, serial = timed(lambda: FloorplanCleaner().clean(raw).to_dict(), args.repeat)
+    expected = json.dumps(serial, sort_keys=True)
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'vs 1':>6}  identical")
+    print(f"{'serial':>8} {serial_time:9.3f} {1.0:8.2f} {'-':>6}  -")
+
+    report = {'rooms': len(raw['rooms']), 'cpus': os.cpu_count(), 'serial': serial_time, 'parallel': {}}
+    identical = True
+    for workers in args.workers:
+        cleaner = TiledCleaner(workers=workers, tile_size=args.tile_size)
+        elapsed, result = timed(lambda: cleaner.clean(raw).to_dict(), args.repeat)
+        same = json.dumps(result, sort_keys=True) == expected
+        identical &= same
+        report['parallel'][workers] = elapsed
+        note = "" if workers <= (os.cpu_count() or 1) else "  (more workers than CPUs)"
+        base = report['parallel'].get(1, elapsed)
+        print(f"{workers:>8} {elapsed:9.3f} {serial_time / elapsed:8.2f} {base / elapsed:6.2f}  "
+              f"{'yes' if same else 'NO'}{note}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    sys.exit(0 if identical else 1)
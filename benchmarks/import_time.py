@@ -0,0 +1,121 @@
+"""
+Import-time benchmark: runs `python -X importtime` for the pipeline entry
+points and fails when one exceeds its budget
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 5 --top 15
+"""
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Set, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# (label, import statement, budget in ms, whether heavy modules are allowed,
+#  setup imports already paid by the host process, so not counted; the target
+#  is skipped when they cannot be imported)
+TARGETS = [
+    ('src.rasterscan', 'import src.rasterscan', 10, False, None),
+    ('src.gemini', 'import src.gemini', 10, False, None),
+    ('src.rasterscan.recognizer', 'import src.rasterscan.recognizer', 20, False, None),
+    # CLI startup: everything the entry points import before parsing arguments
+    ('rasterscan CLI', 'import src.rasterscan.main', 300, True, None),
+    ('gemini CLI', 'import src.gemini.main', 250, True, None),
+    # DAG parsing in the scheduler, which has Airflow itself loaded already
+    ('airflow DAG', 'import sys; sys.path.insert(0, "airflow/plugins"); '
+                    'import importlib.util as u; s = u.spec_from_file_location("floorplan_orchestration", '
+                    '"airflow/dags/floorplan_orchestration.py"); s.loader.exec_module(u.module_from_spec(s))',
+     50, False, 'import airflow; import airflow.providers.standard.operators.python'),
+]
+
+# Modules that must not be loaded by a plain package import
+HEAVY_MODULES = ['shapely', 'numpy', 'PIL', 'requests', 'google.generativeai']
+
+LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure(statement: str) -> List[Tuple[int, int, str]]:
+    """
+    Run one fresh interpreter and parse its -X importtime report into
+    [(self_us, cumulative_us, module)]
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            modules.append((int(match.group(1)), int(match.group(2)), match.group(4)))
+    return modules
+
+
+def run_target(label: str, statement: str, runs: int, top: int,
+               baseline: Set[str]) -> Tuple[float, List[str]]:
+    """
+    Best-of-runs import time in ms and the heavy modules it loaded. Modules
+    already imported by a bare interpreter (site, .pth hooks) are not counted
+    """
+    best_total, best_modules = None, []
+    for _ in range(runs):
+        modules = [m for m in measure(statement) if m[2] not in baseline]
+        total = sum(self_us for self_us, _, _ in modules)
+        if best_total is None or total < best_total:
+            best_total, best_modules = total, modules
+
+    loaded = {name for _, _, name in best_modules}
+    heavy = [m for m in HEAVY_MODULES if m in loaded]
+
+    print(f"\n{label}: {best_total / 1000:.1f} ms")
+    for self_us, cumulative_us, name in sorted(best_modules, reverse=True)[:top]:
+        print(f"   {self_us / 1000:8.2f} ms self  {cumulative_us / 1000:8.2f} ms cumulative  {name}")
+    return best_total / 1000, heavy
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Import-time benchmark for the pipeline packages")
+    parser.add_argument("--runs", type=int, default=3, help="interpreters per target; the fastest run is kept")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules listed per target")
+    args = parser.parse_args()
+
+    interpreter = {name for _, _, name in measure('pass')}
+    failures = []
+    for label, statement, budget_ms, heavy_allowed, setup in TARGETS:
+        baseline = interpreter
+        if setup:
+            try:
+                baseline = interpreter | {name for _, _, name in measure(setup)}
+            except RuntimeError as e:
+                print(f"\n{label}: skipped ({e})")
+                continue
+            statement = f"{setup}; {statement}"
+        try:
+            total_ms, heavy = run_target(label, statement, args.runs, args.top, baseline)
+        except RuntimeError as e:
+            failures.append(f"{label}: import failed ({e})")
+            continue
+
+        if total_ms > budget_ms:
+            failures.append(f"{label}: {total_ms:.1f} ms exceeds budget of {budget_ms} ms")
+        if heavy and not heavy_allowed:
+            failures.append(f"{label}: eagerly imports {', '.join(heavy)}")
+
+    print()
+    if failures:
+        print("FAILED")
+        for failure in failures:
+            print(f" -> {failure}")
+        return 1
+    print("All import-time budgets met")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
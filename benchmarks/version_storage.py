@@ -0,0 +1,64 @@
+"""
+Storage benchmark for delta-encoded optimization versions: runs a chain of
+optimizer actions on the cleaned sample plan, stores it in a VersionStore
+and compares the bytes with one full optimized JSON per version, then
+checks and times materialization of every version from a cold store
+
+    python benchmarks/version_storage.py
+    python benchmarks/version_storage.py --chain 100 --snapshot-every 50
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.rasterscan.cleaner import FloorplanCleaner  # noqa: E402
+from src.rasterscan.helper import load_json, dict_to_floorplan  # noqa: E402
+from src.rasterscan.optimizer import FloorplanOptimizer  # noqa: E402
+from src.rasterscan.versions import VersionStore  # noqa: E402
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delta-encoded version storage benchmark")
+    parser.add_argument("--raw", default=str(PROJECT_ROOT / 'outputs' / 'rasterscan' / 'recognizer_raw.json'))
+    parser.add_argument("--chain", type=int, default=50, help="optimizations applied one after another")
+    parser.add_argument("--snapshot-every", type=int, default=20)
+    args = parser.parse_args()
+
+    optimizer = FloorplanOptimizer()
+    current = json.loads(json.dumps(FloorplanCleaner().clean(load_json(args.raw)).to_dict()))
+    expected = [current]
+
+    with tempfile.TemporaryDirectory() as root:
+        store = VersionStore(root, snapshot_every=args.snapshot_every)
+        version = store.commit('plan', current, action={'action': 'clean'})
+        commit_s = 0.0
+        for i in range(args.chain):
+            floorplan = dict_to_floorplan(current)
+            result = optimizer.add_new_room(floorplan, min_area=2000) if i % 3 == 0 else optimizer.split_bedroom(floorplan)
+            current = json.loads(json.dumps(result.to_dict()))
+            start = time.perf_counter()
+            version = store.commit('plan', current, parent=version, action={'action': result.metadata.get('action')})
+            commit_s += time.perf_counter() - start
+            expected.append(current)
+        commit_ms = commit_s / args.chain * 1000
+
+        cold = VersionStore(root, snapshot_every=args.snapshot_every)
+        start = time.perf_counter()
+        identical = all(cold.materialize('plan', v) == data for v, data in enumerate(expected))
+        materialize_ms = (time.perf_counter() - start) / len(expected) * 1000
+
+        stats = store.stats('plan')
+        full_bytes = sum(len(json.dumps(data)) for data in expected)
+        print(f"Versions: {stats['versions']} ({stats['snapshots']} snapshots, snapshot every {args.snapshot_every})")
+        print(f"Full JSON per version: {full_bytes:>10} bytes")
+        print(f"Delta-encoded store:   {stats['stored_bytes']:>10} bytes "
+              f"({full_bytes / stats['stored_bytes']:.1f}x smaller; snapshots {stats['snapshot_bytes']} bytes)")
+        print(f"Commit: {commit_ms:.2f} ms/version; materialize (cold, in order): {materialize_ms:.2f} ms/version")
+        print(f"All versions identical after materialization: {'yes' if identical else 'NO'}")
+    sys.exit(0 if identical else 1)
@@ -0,0 +1,25 @@
+"""
+Gemini floorplan pipeline (prompt-engineering variant).
+
+Like src.rasterscan, public classes are loaded lazily:
+
+    from src.gemini import GeminiFloorplanProcessor
+"""
+import importlib
+
+_EXPORTS = {
+    'GeminiFloorplanProcessor': 'gemini_processor',
+    'LocalFloorplanCleaner': 'local_cleaner',
+    'PromptPayloadEncoder': 'payload',
+    'IncrementalFloorplanParser': 'streaming',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,14 +1,27 @@
 import json
 import os
-from typing import Dict, Optional
+import time
+from typing import Callable, Dict, List, Optional
 from datetime import datetime
-from PIL import Image
-import google.generativeai as genai
 
-from prompts import (
+from .prompts import (
     RECOGNITION_PROMPT,
     CLEANING_PROMPT_TEMPLATE,
-    OPTIMIZATION_PROMPT_TEMPLATE
+    OPTIMIZATION_PROMPT_TEMPLATE,
+    ROOM_REPAIR_PROMPT_TEMPLATE
+)
+from .local_cleaner import LocalFloorplanCleaner
+from .payload import PromptPayloadEncoder, estimate_tokens, merge_chunks
+from .streaming import IncrementalFloorplanParser
+from .schema import (
+    RAW_SCHEMA,
+    CANONICAL_SCHEMA,
+    ROOM_REPAIR_SCHEMA,
+    to_response_schema,
+    from_response,
+    validate,
+    repair,
+    repair_json_text
 )
 
 
@@ -20,7 +33,28 @@ class GeminiFloorplanProcessor:
     3. Optimization
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None,
+                 encoder: Optional[PromptPayloadEncoder] = None,
+                 stream: bool = False,
+                 on_element: Optional[Callable[[str, Dict], None]] = None,
+                 structured_output: bool = True,
+                 max_retries: int = 1,
+                 preprocessor=None):
+        """
+        Args:
+            api_key: Google AI API key (defaults to GOOGLE_API_KEY)
+            encoder: prompt payload encoder; set a token_budget on it to chunk
+                     very large plans into several cleaning calls
+            stream: stream responses and parse rooms/walls/doors/windows as they arrive
+            on_element: called with (array name, element) for each streamed element
+            structured_output: request schema-constrained JSON (response_schema)
+            max_retries: extra Gemini calls allowed when a response cannot be parsed or repaired
+            preprocessor: optional ImagePreprocessor (src/rasterscan/preprocess.py) used to
+                          shrink the image before recognition
+        """
+        if max_retries < 0:
+            raise ValueError(f"max_retries must be >= 0, got {max_retries}")
+
         self.api_key = api_key or os.environ.get('GOOGLE_API_KEY')
         
         if not self.api_key:
@@ -29,8 +63,28 @@ class GeminiFloorplanProcessor:
                 "or pass api_key parameter"
             )
         
+        import google.generativeai as genai  # lazy: heavy, only needed once a processor exists
+
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel(os.environ.get('GEMINI_MODEL'))
+        self.local_cleaner = LocalFloorplanCleaner()
+        self.encoder = encoder or PromptPayloadEncoder()
+        self.stream = stream
+        self.on_element = on_element
+        self.structured_output = structured_output
+        self.max_retries = max_retries
+        self.preprocessor = preprocessor
+        self.metrics = {
+            'calls': 0,
+            'parse_failures': 0,
+            'schema_failures': 0,
+            'json_repairs': 0,
+            'schema_repairs': 0,
+            'truncated_responses': 0,
+            'retries': 0
+        }
+        self.last_clean_stats = {}
+        self.call_log = []
         
     
     def recognize(self, image_path: str) -> Dict:
@@ -38,12 +92,15 @@ class GeminiFloorplanProcessor:
         Task 1: Extract floorplan structure from image
         """
         print(f"\nTASK 1: Recognition Processing Floorplan")
-        # Load image
-        img = Image.open(image_path)
+        # Load image (downscaled/compressed when a preprocessor is set)
+        if self.preprocessor:
+            img = self.preprocessor.prepare(image_path).image
+        else:
+            from PIL import Image
+            img = Image.open(image_path)
         
         try:
-            response = self.model.generate_content([RECOGNITION_PROMPT, img])
-            result = self._extract_json(response.text)
+            result = self._generate_json('recognize', [RECOGNITION_PROMPT, img], RAW_SCHEMA)
             
             print(f"TASK 1: Recognition complete!")
             return result
@@ -52,27 +109,119 @@ class GeminiFloorplanProcessor:
             print(f"Error during recognition: {e}")
             raise
     
-    def clean(self, raw_json: Dict) -> Dict:
+    def clean(self, raw_json: Dict, mode: str = "llm") -> Dict:
         """
         Task 2: Clean and validate floorplan data
+
+        Args:
+            mode: 'llm' sends the whole floorplan to Gemini, 'hybrid' cleans
+                  locally first and only sends the rooms that fail validation
         """
         print(f"\nTASK 2: Cleaning Floorplan Data")
-        # Format prompt with data
-        prompt = CLEANING_PROMPT_TEMPLATE.format(
-            raw_json=json.dumps(raw_json, indent=2),
-            timestamp=datetime.now().isoformat()
-        )
-        
+        if mode == "hybrid":
+            return self._clean_hybrid(raw_json)
+
+        # Plans over the encoder's token budget are cleaned chunk by chunk
+        chunks = self.encoder.chunk(raw_json)
+        results = []
+
         try:
-            response = self.model.generate_content(prompt)
-            result = self._extract_json(response.text)
-            print(f"TASK 2: Cleaning complete!")
+            for chunk in chunks:
+                prompt = self._cleaning_prompt(chunk)
+                results.append(self._generate_json('clean', prompt, CANONICAL_SCHEMA))
+
+            result = results[0] if len(results) == 1 else self._merge_chunks(results)
+            print(f"TASK 2: Cleaning complete! ({len(chunks)} call(s))")
             return result
             
         except Exception as e:
             print(f"Error during cleaning: {e}")
             raise
     
+    def _cleaning_prompt(self, raw_json: Dict) -> str:
+        return CLEANING_PROMPT_TEMPLATE.format(
+            raw_json=self.encoder.encode(raw_json),
+            timestamp=datetime.now().isoformat()
+        )
+
+    def _merge_chunks(self, results: List[Dict]) -> Dict:
+        """
+        Merge chunked cleaning results without duplicates and recompute adjacency/metadata
+        """
+        return self.local_cleaner.finalize(merge_chunks(results, self.encoder.precision))
+
+    def _clean_hybrid(self, raw_json: Dict) -> Dict:
+        """
+        Deterministic fast path: clean locally, then repair only the failed
+        rooms with the LLM and merge them back
+        """
+        cleaned, failed = self.local_cleaner.clean(raw_json)
+        full_tokens = estimate_tokens(self._cleaning_prompt(raw_json))
+        stats = {
+            'local_rooms': len(cleaned['rooms']),
+            'llm_rooms': len(failed),
+            'llm_calls': 0,
+            'llm_calls_avoided': 1,
+            'estimated_tokens_sent': 0,
+            'estimated_tokens_avoided': full_tokens
+        }
+
+        if failed:
+            prompt = ROOM_REPAIR_PROMPT_TEMPLATE.format(
+                rooms_json=self.encoder.encode(failed),
+                walls_json=self.encoder.encode(self._walls_near(failed, cleaned['walls']))
+            )
+            try:
+                repaired = self._generate_json('clean_repair', prompt, ROOM_REPAIR_SCHEMA).get('rooms', [])
+            except Exception as e:
+                print(f"Error during cleaning: {e}")
+                raise
+
+            # Normalize the LLM rooms with the same rules. A repair that is missing,
+            # still invalid or overlaps a kept room once snapped is replaced by the
+            # local fallback of the failed room
+            repaired_by_id = {r.get('id'): r for r in repaired}
+            fallbacks = []
+            for room in failed:
+                fixed = self.local_cleaner.clean_room(repaired_by_id.get(room.get('id'), {}))
+                if not fixed or self.local_cleaner.overlaps(fixed, cleaned['rooms']):
+                    fixed = self.local_cleaner.fallback_room(room)
+                    fallbacks.append(room.get('id'))
+                if fixed:
+                    cleaned['rooms'].append(fixed)
+            cleaned = self.local_cleaner.finalize(cleaned)
+
+            sent = estimate_tokens(prompt)
+            stats.update({
+                'llm_calls': 1,
+                'llm_calls_avoided': 0,
+                'local_fallback_rooms': fallbacks,
+                'estimated_tokens_sent': sent,
+                'estimated_tokens_avoided': max(full_tokens - sent, 0)
+            })
+
+        cleaned['metadata']['hybrid_cleaning'] = stats
+        self.last_clean_stats = stats
+        print(f"TASK 2: Cleaning complete! {stats['local_rooms']} rooms cleaned locally, "
+              f"{stats['llm_rooms']} sent to Gemini (~{stats['estimated_tokens_avoided']} tokens avoided)")
+        return cleaned
+
+    def _walls_near(self, rooms: List[Dict], walls: List[Dict], margin: float = 0.5) -> List[Dict]:
+        """
+        Walls touching the bounding box of the given rooms
+        """
+        xs = [v[0] for r in rooms for v in r.get('vertices', [])]
+        ys = [v[1] for r in rooms for v in r.get('vertices', [])]
+        if not xs:
+            return []
+        minx, maxx = min(xs) - margin, max(xs) + margin
+        miny, maxy = min(ys) - margin, max(ys) + margin
+
+        def inside(p):
+            return minx <= p[0] <= maxx and miny <= p[1] <= maxy
+
+        return [w for w in walls if inside(w['start']) or inside(w['end'])]
+
     def optimize(self, canonical_json: Dict, action: Dict) -> Dict:
         """
         Task 3: Optimize floorplan based on natural language action
@@ -81,14 +230,18 @@ class GeminiFloorplanProcessor:
 
         # Format prompt with data
         prompt = OPTIMIZATION_PROMPT_TEMPLATE.format(
-            canonical_json=json.dumps(canonical_json, indent=2),
-            action=json.dumps(action, indent=2),
+            canonical_json=self.encoder.encode(canonical_json, drop_derived=False),
+            action=json.dumps(action),
             timestamp=datetime.now().isoformat()
         )
         
+        # Optimization needs the whole plan, so it is never chunked
+        budget = self.encoder.token_budget
+        if budget and estimate_tokens(prompt) > budget:
+            print(f"[WARNING] Optimization prompt (~{estimate_tokens(prompt)} tokens) exceeds budget of {budget}")
+
         try:
-            response = self.model.generate_content(prompt)
-            result = self._extract_json(response.text)
+            result = self._generate_json('optimize', prompt, CANONICAL_SCHEMA)
             print(f"TASK 3: Optimization complete")
             return result
             
@@ -96,6 +249,112 @@ class GeminiFloorplanProcessor:
             print(f"Error during optimization: {e}")
             raise
     
+    def _generate_json(self, stage: str, contents, schema: Optional[Dict] = None) -> Dict:
+        """
+        Call Gemini and return a response that matches the schema. Minor
+        defects are repaired locally; a new call is only made when the
+        response cannot be parsed or repaired, or when a streamed response
+        was cut off (its salvaged elements are used only on the last attempt)
+        """
+        errors = []
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.metrics['retries'] += 1
+                print(f"  [{stage}] Retrying ({attempt}/{self.max_retries})")
+            self.metrics['calls'] += 1
+
+            try:
+                result = self._request_json(stage, contents, schema)
+            except ValueError:
+                self.metrics['parse_failures'] += 1
+                if attempt < self.max_retries:
+                    continue
+                raise
+
+            salvaged = isinstance(result, dict) and (result.get('metadata') or {}).get('salvaged')
+            if salvaged:
+                # A cut-off stream is missing elements even when what arrived is valid
+                self.metrics['truncated_responses'] += 1
+                counts = result['metadata']['salvaged_counts']
+                if attempt < self.max_retries:
+                    print(f"  [{stage}] [WARNING] Truncated response ({counts} complete)")
+                    continue
+                print(f"  [{stage}] [WARNING] Truncated response on the last attempt, using the salvaged {counts}")
+
+            if schema is None:
+                return result
+
+            errors = validate(result, schema)
+            if not errors:
+                return result
+
+            self.metrics['schema_failures'] += 1
+            # Invalid elements are dropped only when no retry is left
+            result, fixes = repair(result, schema, drop_invalid=attempt == self.max_retries)
+            errors = validate(result, schema)
+            if not errors:
+                self.metrics['schema_repairs'] += 1
+                print(f"  [{stage}] Repaired {len(fixes)} schema defect(s) locally")
+                return result
+
+            print(f"  [{stage}] [ERROR] Response does not match schema: {errors[:5]}")
+
+        raise ValueError(f"Gemini response for '{stage}' does not match schema: {errors[:5]}")
+
+    def _request_json(self, stage: str, contents, schema: Optional[Dict] = None) -> Dict:
+        """
+        Single Gemini call, streamed when enabled. Records prompt/output
+        token counts and latency in call_log
+        """
+        kwargs = {}
+        if schema is not None and self.structured_output:
+            kwargs['generation_config'] = {
+                'response_mime_type': 'application/json',
+                'response_schema': to_response_schema(schema)
+            }
+
+        start = time.perf_counter()
+        first_element_s = None
+
+        if self.stream:
+            response = self.model.generate_content(contents, stream=True, **kwargs)
+            parser = IncrementalFloorplanParser()
+            for chunk in response:
+                for kind, element in parser.feed(self._chunk_text(chunk)):
+                    if first_element_s is None:
+                        first_element_s = round(time.perf_counter() - start, 3)
+                    if self.on_element:
+                        self.on_element(kind, element)
+            result = parser.finish()
+        else:
+            response = self.model.generate_content(contents, **kwargs)
+            result = None
+
+        usage = getattr(response, 'usage_metadata', None)
+        entry = {
+            'stage': stage,
+            'prompt_tokens': getattr(usage, 'prompt_token_count', None),
+            'output_tokens': getattr(usage, 'candidates_token_count', None),
+            'latency_s': round(time.perf_counter() - start, 3),
+            'first_element_s': first_element_s
+        }
+        self.call_log.append(entry)
+        print(f"  [{stage}] prompt tokens: {entry['prompt_tokens']}, "
+              f"output tokens: {entry['output_tokens']}, latency: {entry['latency_s']}s")
+
+        if result is None:
+            result = self._extract_json(response.text)
+        if 'generation_config' in kwargs:
+            result = from_response(result, schema)
+        return result
+
+    def _chunk_text(self, chunk) -> str:
+        try:
+            return chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. safety/finish metadata only)
+            return ''
+
     def _extract_json(self, response_text: str) -> Dict:
         """
         Extract JSON from Gemini response
@@ -111,11 +370,29 @@ class GeminiFloorplanProcessor:
                     text = text[4:]
                 text = text.strip()
         
-        # Parse JSON
+        # Parse JSON, then retry once after a local repair of the text
         try:
             return json.loads(text)
         except json.JSONDecodeError as e:
+            error = e
+
+        try:
+            result = json.loads(repair_json_text(text))
+            self.metrics['json_repairs'] += 1
+            return result
+        except json.JSONDecodeError:
             print(f"\n[ERROR] Failed to parse JSON response:")
             print(f"Response text: {text[:500]}...")
-            raise ValueError(f"Invalid JSON from Gemini: {e}")
+            raise ValueError(f"Invalid JSON from Gemini: {error}")
 
+    def metrics_summary(self) -> Dict:
+        """
+        Parse-failure, repair and retry rates over all Gemini calls so far
+        """
+        calls = self.metrics['calls'] or 1
+        return {
+            **self.metrics,
+            'parse_failure_rate': round(self.metrics['parse_failures'] / calls, 3),
+            'schema_failure_rate': round(self.metrics['schema_failures'] / calls, 3),
+            'retry_rate': round(self.metrics['retries'] / calls, 3)
+        }
@@ -0,0 +1,164 @@
+"""
+Deterministic local cleaner for the Gemini raw schema.
+Handles everything the CLEANING_PROMPT_TEMPLATE asks for on rooms that are
+already well formed, and reports the rooms that still need the LLM
+"""
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+
+import shapely
+from shapely.geometry import Polygon
+from shapely.geometry.polygon import orient
+
+
+class LocalFloorplanCleaner:
+
+    def __init__(self, precision: float = 0.1, wall_thickness: float = 0.15,
+                 adjacency_tolerance: float = 0.2):
+        """
+        Args:
+            precision: coordinate snapping grid in meters
+            wall_thickness: normalized wall thickness in meters
+            adjacency_tolerance: max gap between two rooms sharing a wall
+        """
+        self.precision = precision
+        self.wall_thickness = wall_thickness
+        self.adjacency_tolerance = adjacency_tolerance
+
+    def clean(self, raw_json: Dict) -> Tuple[Dict, List[Dict]]:
+        """
+        Returns the cleaned canonical JSON (valid rooms only) and the raw rooms
+        that failed validation
+        """
+        rooms, failed = [], []
+        for room in raw_json.get('rooms', []):
+            cleaned = self.clean_room(room)
+            if cleaned:
+                rooms.append(cleaned)
+            else:
+                failed.append(room)
+
+        cleaned_json = {
+            'version': '1.0',
+            'schema': 'canonical_v1',
+            'timestamp': datetime.now().isoformat(),
+            'metadata': {k: v for k, v in raw_json.get('metadata', {}).items() if k == 'coordinate_system'},
+            'rooms': rooms,
+            'walls': self._clean_walls(raw_json.get('walls', [])),
+            'doors': [self._snap_element(d) for d in raw_json.get('doors', [])],
+            'windows': [self._snap_element(w) for w in raw_json.get('windows', [])],
+            'adjacency_graph': {}
+        }
+        return self.finalize(cleaned_json), failed
+
+    def clean_room(self, room: Dict) -> Dict:
+        """
+        Snap, dedupe and orient a room polygon. Returns None if the polygon
+        cannot be fixed deterministically (too few vertices, self-intersecting)
+        """
+        vertices = self._dedupe([self._snap_point(v) for v in room.get('vertices', [])])
+        if len(vertices) < 3:
+            return None
+
+        poly = Polygon(vertices)
+        if not poly.is_valid or poly.area <= 0:
+            return None
+
+        poly = orient(poly, sign=1.0)  # counter-clockwise
+        return {
+            **room,
+            'vertices': [list(c) for c in poly.exterior.coords[:-1]],
+            'area': round(poly.area, 2),
+            'adjacent_rooms': []
+        }
+
+    def fallback_room(self, room: Dict) -> Optional[Dict]:
+        """
+        Deterministic last resort for a room clean_room rejected: the largest
+        valid part of its snapped polygon, holes dropped. None if nothing is left
+        """
+        vertices = self._dedupe([self._snap_point(v) for v in room.get('vertices', [])])
+        if len(vertices) < 3:
+            return None
+
+        repaired = shapely.make_valid(Polygon(vertices))
+        parts = [p for g in shapely.get_parts(repaired) for p in shapely.get_parts(g)
+                 if p.geom_type == 'Polygon' and p.area > 0]
+        if not parts:
+            return None
+        largest = max(parts, key=lambda p: p.area)
+        return self.clean_room({**room, 'vertices': [list(c) for c in largest.exterior.coords[:-1]]})
+
+    def overlaps(self, room: Dict, rooms: List[Dict]) -> bool:
+        """
+        Whether room overlaps any of rooms by more than one snapping cell
+        """
+        if not rooms:
+            return False
+        shared = shapely.area(shapely.intersection(Polygon(room['vertices']),
+                                                   [Polygon(r['vertices']) for r in rooms]))
+        return bool(shared.max() > self.precision ** 2)
+
+    def finalize(self, cleaned_json: Dict) -> Dict:
+        """
+        Recompute adjacency and metadata after rooms were added or replaced
+        """
+        rooms = cleaned_json['rooms']
+        graph = self._adjacency_graph(rooms)
+        for room in rooms:
+            room['adjacent_rooms'] = graph[room['id']]
+
+        cleaned_json['adjacency_graph'] = graph
+        cleaned_json['metadata'] = {
+            **cleaned_json.get('metadata', {}),
+            'total_area': round(sum(r['area'] for r in rooms), 2),
+            'room_count': len(rooms),
+            'wall_thickness_normalized': self.wall_thickness,
+            'cleaning_applied': True
+        }
+        return cleaned_json
+
+    def _adjacency_graph(self, rooms: List[Dict]) -> Dict[str, List[str]]:
+        graph = {r['id']: [] for r in rooms}
+        if len(rooms) < 2:
+            return graph
+
+        polygons = [Polygon(r['vertices']) for r in rooms]
+        tree = shapely.STRtree(polygons)
+        left, right = tree.query(polygons, predicate='dwithin', distance=self.adjacency_tolerance)
+        for i, j in zip(left, right):
+            if i != j:
+                graph[rooms[i]['id']].append(rooms[j]['id'])
+        return graph
+
+    def _clean_walls(self, walls: List[Dict]) -> List[Dict]:
+        cleaned = []
+        for wall in walls:
+            start = self._snap_point(wall.get('start', [0, 0]))
+            end = self._snap_point(wall.get('end', [0, 0]))
+            if start == end:
+                continue
+            cleaned.append({**wall, 'start': start, 'end': end, 'thickness': self.wall_thickness})
+        return cleaned
+
+    def _snap_element(self, element: Dict) -> Dict:
+        position = element.get('position')
+        if isinstance(position, list) and len(position) == 2 and not isinstance(position[0], list):
+            return {**element, 'position': self._snap_point(position)}
+        return element
+
+    def _snap_point(self, point: List[float]) -> List[float]:
+        step = self.precision
+        return [round(round(point[0] / step) * step, 6), round(round(point[1] / step) * step, 6)]
+
+    def _dedupe(self, vertices: List[List[float]]) -> List[List[float]]:
+        """
+        Remove consecutive duplicates (and the closing vertex if repeated)
+        """
+        cleaned = []
+        for v in vertices:
+            if not cleaned or v != cleaned[-1]:
+                cleaned.append(v)
+        if len(cleaned) > 1 and cleaned[0] == cleaned[-1]:
+            cleaned.pop()
+        return cleaned
@@ -2,7 +2,10 @@ import os
 import json
 from pathlib import Path
 from typing import Dict
-from gemini_processor import GeminiFloorplanProcessor
+from .gemini_processor import GeminiFloorplanProcessor
+
+# Reuse the image preprocessor of the RasterScan pipeline
+from ..rasterscan import ImagePreprocessor
 
 
 def save_json(data: Dict, filepath: Path):
@@ -28,7 +31,7 @@ def main():
     input_image = "floorplan-images/floorplan_raw.png"
     
     # Initialize processor
-    processor = GeminiFloorplanProcessor(api_key=API_KEY)
+    processor = GeminiFloorplanProcessor(api_key=API_KEY, preprocessor=ImagePreprocessor())
     
     # TASK 1: recognize
     try:
@@ -41,7 +44,7 @@ def main():
     
     # TASK 2: clean
     try:
-        cleaned_output = processor.clean(raw_output)
+        cleaned_output = processor.clean(raw_output, mode="hybrid")
         cleaned_path = output_dir / "cleaned_canonical.json"
         save_json(cleaned_output, cleaned_path)
     except Exception as e:
@@ -68,6 +71,8 @@ def main():
     except Exception as e:
         print(f"\nPipeline failed at optimization stage: {e}")
         return
+    
+    print(f"\nGemini call metrics: {processor.metrics_summary()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
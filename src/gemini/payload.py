@@ -0,0 +1,197 @@
+"""
+Compact prompt payloads for the Gemini clean/optimize prompts
+"""
+import json
+from typing import Dict, List, Optional, Tuple
+
+# Fields the cleaning prompts ask Gemini to recompute, so sending them there
+# only costs tokens. The optimize prompt keeps them: its area constraints need them
+DERIVED_FIELDS = ('area', 'length', 'adjacency_graph', 'total_area', 'total_area_sqm', 'room_count')
+
+# Non-room arrays distributed over chunks
+ELEMENT_KEYS = ('walls', 'doors', 'windows')
+
+KEY_ABBREVIATIONS = {
+    'rooms': 'R',
+    'walls': 'W',
+    'doors': 'D',
+    'windows': 'N',
+    'vertices': 'v',
+    'type': 't',
+    'name': 'n',
+    'start': 's',
+    'end': 'e',
+    'thickness': 'th',
+    'position': 'p',
+    'width': 'w',
+    'connects': 'c',
+    'confidence': 'cf',
+    'adjacent_rooms': 'a',
+    'metadata': 'm'
+}
+
+
+class PromptPayloadEncoder:
+    """
+    Encode floorplan JSON for prompts: compact separators, rounded
+    coordinates, optional key abbreviation and, by default, no derived fields.
+    With a token budget, large plans are split into several payloads
+    """
+
+    def __init__(self, precision: int = 2, abbreviate_keys: bool = False,
+                 drop_fields: Tuple[str, ...] = DERIVED_FIELDS,
+                 token_budget: Optional[int] = None):
+        """
+        Args:
+            precision: decimals kept for floats
+            abbreviate_keys: replace keys with KEY_ABBREVIATIONS and prepend a legend
+            drop_fields: keys removed at any depth unless encode() is told to keep them
+            token_budget: max estimated tokens per payload (None = never chunk)
+        """
+        self.precision = precision
+        self.abbreviate_keys = abbreviate_keys
+        self.drop_fields = set(drop_fields)
+        self.token_budget = token_budget
+
+    def encode(self, data, drop_derived: bool = True) -> str:
+        """
+        Encode data for a prompt; drop_derived=False keeps the drop_fields
+        for prompts that read them (optimize)
+        """
+        text = self._dumps(data, self.drop_fields if drop_derived else set())
+        if self.abbreviate_keys:
+            return self.legend() + '\n' + text
+        return text
+
+    def legend(self) -> str:
+        pairs = ', '.join(f"{short}={key}" for key, short in KEY_ABBREVIATIONS.items())
+        return f"Key legend (input only, answer with the full key names): {pairs}"
+
+    def chunk(self, data: Dict) -> List[Dict]:
+        """
+        Split a floorplan into sub-plans whose payload roughly fits the token
+        budget. Rooms are split in order; every wall, door and window goes to
+        exactly one chunk, the first whose rooms' bounding box contains it
+        (elements outside every box go to the last chunk)
+        """
+        rooms = data.get('rooms', [])
+        if not self.token_budget or not rooms or estimate_tokens(self.encode(data)) <= self.token_budget:
+            return [data]
+
+        # Size each room with its own walls/doors once, then pack greedily
+        sizes = [estimate_tokens(self._dumps(self._sub_plan(data, [room]))) for room in rooms]
+
+        groups, current, used = [], [], 0
+        for room, size in zip(rooms, sizes):
+            if current and used + size > self.token_budget:
+                groups.append(current)
+                current, used = [], 0
+            current.append(room)
+            used += size
+        groups.append(current)
+
+        bounds = [_bounds(group) for group in groups]
+        elements = {key: [[] for _ in groups] for key in ELEMENT_KEYS}
+        for key in ELEMENT_KEYS:
+            for item in data.get(key, []):
+                points = [item.get('start'), item.get('end')] if key == 'walls' else [item.get('position')]
+                owner = next((i for i, box in enumerate(bounds) if any(_inside(box, p) for p in points)),
+                             len(groups) - 1)
+                elements[key][owner].append(item)
+
+        return [self._sub_plan(data, group, {key: elements[key][i] for key in ELEMENT_KEYS})
+                for i, group in enumerate(groups)]
+
+    def _sub_plan(self, data: Dict, rooms: List[Dict], elements: Optional[Dict] = None) -> Dict:
+        """
+        Plan with the given rooms and elements; by default the walls, doors
+        and windows inside the rooms' bounding box
+        """
+        if elements is None:
+            box = _bounds(rooms)
+            elements = {
+                'walls': [w for w in data.get('walls', []) if _inside(box, w.get('start')) or _inside(box, w.get('end'))],
+                'doors': [d for d in data.get('doors', []) if _inside(box, d.get('position'))],
+                'windows': [w for w in data.get('windows', []) if _inside(box, w.get('position'))]
+            }
+        return {
+            **{k: v for k, v in data.items() if k not in ('rooms',) + ELEMENT_KEYS},
+            'rooms': rooms,
+            **elements
+        }
+
+    def _dumps(self, data, drop_fields=None) -> str:
+        drop_fields = self.drop_fields if drop_fields is None else drop_fields
+        return json.dumps(self._compact(data, drop_fields), separators=(',', ':'))
+
+    def _compact(self, value, drop_fields):
+        if isinstance(value, dict):
+            return {
+                self._key(k): self._compact(v, drop_fields)
+                for k, v in value.items() if k not in drop_fields
+            }
+        if isinstance(value, list):
+            return [self._compact(v, drop_fields) for v in value]
+        if isinstance(value, float):
+            rounded = round(value, self.precision)
+            return int(rounded) if rounded.is_integer() else rounded
+        return value
+
+    def _key(self, key: str) -> str:
+        return KEY_ABBREVIATIONS.get(key, key) if self.abbreviate_keys else key
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate (~4 characters per token) without an API round trip
+    """
+    return len(text) // 4
+
+
+def merge_chunks(results: List[Dict], precision: int = 2) -> Dict:
+    """
+    Concatenate the results of chunked calls, in chunk order, dropping
+    elements returned more than once. Elements are the same when their
+    geometry matches after rounding to `precision` decimals, even if ids
+    or other fields differ between chunks
+    """
+    merged = {**results[0]}
+    for key in ('rooms',) + ELEMENT_KEYS:
+        seen = set()
+        merged[key] = []
+        for item in (item for r in results for item in r.get(key, [])):
+            item_key = _geometry_key(key, item, precision)
+            if item_key not in seen:
+                seen.add(item_key)
+                merged[key].append(item)
+    return merged
+
+
+def _geometry_key(key: str, item: Dict, precision: int):
+    """
+    Rounded, order-independent geometry of an element: room vertices, wall
+    endpoints, opening position. Falls back to the full JSON text when the
+    geometry is missing or malformed
+    """
+    if key == 'rooms':
+        points = item.get('vertices')
+    elif key == 'walls':
+        points = [item.get('start'), item.get('end')]
+    else:
+        points = [item.get('position')]
+    try:
+        return key, tuple(sorted(tuple(round(c, precision) for c in p) for p in points))
+    except TypeError:
+        return key, json.dumps(item, sort_keys=True)
+
+
+def _bounds(rooms: List[Dict]) -> Optional[Tuple[float, float, float, float]]:
+    xs = [v[0] for r in rooms for v in r.get('vertices', [])]
+    ys = [v[1] for r in rooms for v in r.get('vertices', [])]
+    return (min(xs), min(ys), max(xs), max(ys)) if xs else None
+
+
+def _inside(bounds, point) -> bool:
+    if bounds is None or not isinstance(point, list) or len(point) != 2:
+        return False
+    return bounds[0] <= point[0] <= bounds[2] and bounds[1] <= point[1] <= bounds[3]
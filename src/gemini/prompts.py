@@ -162,4 +162,37 @@ Return ONLY the complete modified floorplan JSON (same schema as input):
   "doors": [...],
   "windows": [...],
   "adjacency_graph": {{...}}
-}}"""
\ No newline at end of file
+}}"""
+
+# Task 2 (hybrid mode): Repair only the rooms the local cleaner could not fix
+ROOM_REPAIR_PROMPT_TEMPLATE = """You are a geometric data validator for floorplan processing.
+
+The following rooms failed validation (self-intersecting, degenerate or
+unclosed polygons). The rest of the floorplan is already clean.
+
+Rooms to repair:
+{rooms_json}
+
+Neighbouring walls for context:
+{walls_json}
+
+Your tasks:
+1. Fix each room polygon so it is closed, valid and non-self-intersecting
+2. Keep the room id and type unchanged
+3. Snap coordinates to 0.1m precision
+4. Room polygons should be counter-clockwise
+5. Calculate accurate room areas
+
+Return ONLY valid JSON in this format (no markdown):
+
+{{
+  "rooms": [
+    {{
+      "id": "r1",
+      "type": "bedroom",
+      "vertices": [[x, y], ...],
+      "area": <calculated area>,
+      "metadata": {{"confidence": 0.9}}
+    }}
+  ]
+}}"""
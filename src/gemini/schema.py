@@ -0,0 +1,348 @@
+"""
+Schema definitions for Gemini JSON output, used both to request
+schema-constrained output and to validate/repair the responses locally
+"""
+import copy
+import dataclasses
+from typing import Dict, List, Tuple, Union, get_args, get_origin, get_type_hints
+
+from ..rasterscan.canonical_schema import Door, Point2D, Room, Wall, Window
+
+# Points are sent as [x, y] pairs rather than Point2D's {'x', 'y'}
+POINT = {'type': 'array', 'items': {'type': 'number'}, 'minItems': 2, 'maxItems': 2}
+
+_SCALARS = {float: 'number', int: 'integer', str: 'string', bool: 'boolean'}
+
+
+def _field_schema(hint) -> Dict:
+    if hint is Point2D:
+        return POINT
+    if hint in _SCALARS:
+        return {'type': _SCALARS[hint]}
+    if get_origin(hint) is Union:
+        return _field_schema(next(a for a in get_args(hint) if a is not type(None)))
+    if get_origin(hint) in (list, List):
+        return {'type': 'array', 'items': _field_schema(get_args(hint)[0])}
+    raise TypeError(f"No schema for field type {hint!r}")
+
+
+def _element_schema(cls, rename: Dict = None, override: Dict = None, extra: Dict = None,
+                    skip: Tuple = (), optional: Tuple = ()) -> Dict:
+    """
+    Build the schema of one element from its canonical_schema dataclass, in
+    the prompt's spelling: fields renamed by `rename`, field schemas
+    replaced by `override`, Gemini-only properties added from `extra`.
+    Fields without a default are required unless listed in `optional`
+    """
+    rename, override = rename or {}, override or {}
+    hints = get_type_hints(cls)
+    properties, required = {}, []
+    for f in dataclasses.fields(cls):
+        if f.name in skip:
+            continue
+        name = rename.get(f.name, f.name)
+        properties[name] = override.get(f.name) or _field_schema(hints[f.name])
+        if f.default is dataclasses.MISSING and f.name not in optional:
+            required.append(name)
+    properties.update(extra or {})
+    return {'type': 'object', 'properties': properties, 'required': required}
+
+
+_IDS = {'type': 'array', 'items': {'type': 'string'}}
+
+ROOM = _element_schema(
+    Room,
+    rename={'room_type': 'type'},
+    override={'vertices': {'type': 'array', 'items': POINT, 'minItems': 3}},
+    extra={
+        'name': {'type': 'string'},
+        'confidence': {'type': 'number'},
+        'adjacent_rooms': _IDS,
+        'metadata': {'type': 'object', 'properties': {'confidence': {'type': 'number'}}}
+    },
+    skip=('doors', 'windows'),  # sent at the top level, not per room
+    optional=('area',)  # recomputed locally
+)
+
+WALL = _element_schema(
+    Wall,
+    extra={'id': {'type': 'string'}, 'thickness': {'type': 'number'}, 'type': {'type': 'string'}}
+)
+
+# Openings are sent as their center point instead of a bbox
+DOOR = _element_schema(
+    Door,
+    rename={'connects_rooms': 'connects'},
+    override={'position': POINT},
+    extra={'id': {'type': 'string'}}
+)
+
+WINDOW = _element_schema(
+    Window,
+    override={'position': POINT},
+    extra={'id': {'type': 'string'}, 'room': {'type': 'string'}}
+)
+
+_ELEMENTS = {
+    'rooms': {'type': 'array', 'items': ROOM},
+    'walls': {'type': 'array', 'items': WALL},
+    'doors': {'type': 'array', 'items': DOOR},
+    'windows': {'type': 'array', 'items': WINDOW}
+}
+
+# Task 1 output (RECOGNITION_PROMPT)
+RAW_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'version': {'type': 'string'},
+        'source': {'type': 'string'},
+        'timestamp': {'type': 'string'},
+        **_ELEMENTS
+    },
+    'required': ['rooms', 'walls']
+}
+
+# Task 2/3 output (canonical_v1)
+CANONICAL_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'version': {'type': 'string'},
+        'schema': {'type': 'string'},
+        'timestamp': {'type': 'string'},
+        'metadata': {
+            'type': 'object',
+            'properties': {
+                'total_area': {'type': 'number'},
+                'room_count': {'type': 'integer'},
+                'wall_thickness_normalized': {'type': 'number'},
+                'cleaning_applied': {'type': 'boolean'}
+            }
+        },
+        **_ELEMENTS,
+        # room id -> adjacent room ids (requested as MAP_KEY/MAP_VALUE entries)
+        'adjacency_graph': {'type': 'object', 'additionalProperties': {'type': 'array', 'items': {'type': 'string'}}}
+    },
+    'required': ['rooms', 'walls']
+}
+
+# Task 2 hybrid repair output (ROOM_REPAIR_PROMPT_TEMPLATE)
+ROOM_REPAIR_SCHEMA = {
+    'type': 'object',
+    'properties': {'rooms': {'type': 'array', 'items': ROOM}},
+    'required': ['rooms']
+}
+
+# Keywords kept in response schemas, spelled as the SDK's Schema proto fields
+# (it rejects the JSON Schema spelling minItems/maxItems)
+_RESPONSE_SCHEMA_KEYS = {
+    'type': 'type',
+    'properties': 'properties',
+    'required': 'required',
+    'items': 'items',
+    'enum': 'enum',
+    'nullable': 'nullable',
+    'description': 'description',
+    'format': 'format',
+    'minItems': 'min_items',
+    'maxItems': 'max_items'
+}
+
+# Response schemas cannot express maps (additionalProperties), so a map is
+# requested as a list of {MAP_KEY: key, MAP_VALUE: value} entries. The only
+# map is adjacency_graph (room id -> neighbour ids)
+MAP_KEY = 'room'
+MAP_VALUE = 'neighbors'
+
+_PY_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'number': (int, float),
+    'integer': int,
+    'boolean': bool
+}
+
+
+def to_response_schema(schema: Dict) -> Dict:
+    """
+    Convert a schema above to the subset accepted by Gemini's response_schema:
+    upper-case types, proto field names, unsupported keywords removed and maps
+    encoded as entry lists (from_response decodes them)
+    """
+    if 'additionalProperties' in schema:
+        schema = {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {MAP_KEY: {'type': 'string'}, MAP_VALUE: schema['additionalProperties']},
+                'required': [MAP_KEY, MAP_VALUE]
+            }
+        }
+
+    out = {_RESPONSE_SCHEMA_KEYS[k]: copy.deepcopy(v) for k, v in schema.items()
+           if k in _RESPONSE_SCHEMA_KEYS and k not in ('properties', 'items')}
+    out['type'] = schema['type'].upper()
+
+    if 'items' in schema:
+        out['items'] = to_response_schema(schema['items'])
+    if 'properties' in schema:
+        out['properties'] = {
+            name: to_response_schema(sub) for name, sub in schema['properties'].items()
+            if sub['type'] != 'object' or 'properties' in sub or 'additionalProperties' in sub
+        }
+        out['required'] = [r for r in schema.get('required', []) if r in out['properties']]
+    return out
+
+
+def from_response(data, schema: Dict):
+    """
+    Decode the map entry lists of a response requested with
+    to_response_schema(schema); other values are returned unchanged
+    """
+    if 'additionalProperties' in schema:
+        if isinstance(data, list):
+            data = {e[MAP_KEY]: e.get(MAP_VALUE) for e in data if isinstance(e, dict) and MAP_KEY in e}
+        if isinstance(data, dict):
+            return {k: from_response(v, schema['additionalProperties']) for k, v in data.items()}
+        return data
+
+    if schema['type'] == 'object' and isinstance(data, dict):
+        for name, sub in schema.get('properties', {}).items():
+            if name in data:
+                data[name] = from_response(data[name], sub)
+    elif schema['type'] == 'array' and isinstance(data, list):
+        return [from_response(item, schema['items']) for item in data]
+    return data
+
+
+def validate(data, schema: Dict, path: str = '$') -> List[str]:
+    """
+    Validate data against a schema above; returns a list of error messages
+    """
+    expected = _PY_TYPES[schema['type']]
+    if not isinstance(data, expected) or (schema['type'] in ('number', 'integer') and isinstance(data, bool)):
+        return [f"{path}: expected {schema['type']}, got {type(data).__name__}"]
+
+    errors = []
+    if schema['type'] == 'object':
+        for name in schema.get('required', []):
+            if name not in data:
+                errors.append(f"{path}: missing '{name}'")
+        for name, sub in schema.get('properties', {}).items():
+            if name in data:
+                errors.extend(validate(data[name], sub, f"{path}.{name}"))
+        if 'additionalProperties' in schema:
+            for name, value in data.items():
+                errors.extend(validate(value, schema['additionalProperties'], f"{path}.{name}"))
+
+    elif schema['type'] == 'array':
+        if len(data) < schema.get('minItems', 0):
+            errors.append(f"{path}: expected at least {schema['minItems']} items")
+        if 'maxItems' in schema and len(data) > schema['maxItems']:
+            errors.append(f"{path}: expected at most {schema['maxItems']} items")
+        for i, item in enumerate(data):
+            errors.extend(validate(item, schema['items'], f"{path}[{i}]"))
+
+    return errors
+
+
+def repair(data, schema: Dict, drop_invalid: bool = False) -> Tuple[object, List[str]]:
+    """
+    Fix minor defects in place of a retry: numbers sent as strings, extra
+    point coordinates, missing required arrays. Array items that are still
+    invalid afterwards are kept, so validate() reports them and the caller
+    can retry, unless drop_invalid is set (the last attempt). Returns the
+    repaired data and the fixes
+    """
+    fixes = []
+    return _repair(data, schema, '$', fixes, drop_invalid), fixes
+
+
+def _repair(value, schema: Dict, path: str, fixes: List[str], drop_invalid: bool):
+    kind = schema['type']
+
+    if kind in ('number', 'integer') and isinstance(value, str):
+        try:
+            number = float(value)
+            fixes.append(f"{path}: parsed number from string")
+            return int(number) if kind == 'integer' else number
+        except ValueError:
+            return value
+
+    if kind == 'integer' and isinstance(value, float) and value.is_integer():
+        fixes.append(f"{path}: converted float to integer")
+        return int(value)
+
+    if kind == 'object' and isinstance(value, dict):
+        for name, sub in schema.get('properties', {}).items():
+            if name in value:
+                value[name] = _repair(value[name], sub, f"{path}.{name}", fixes, drop_invalid)
+            elif name in schema.get('required', []) and sub['type'] == 'array':
+                value[name] = []
+                fixes.append(f"{path}: added missing '{name}'")
+        return value
+
+    if kind == 'array' and isinstance(value, list):
+        if 'maxItems' in schema and len(value) > schema['maxItems']:
+            value = value[:schema['maxItems']]
+            fixes.append(f"{path}: truncated to {schema['maxItems']} items")
+
+        items = []
+        for i, item in enumerate(value):
+            item = _repair(item, schema['items'], f"{path}[{i}]", fixes, drop_invalid)
+            if drop_invalid and validate(item, schema['items']):
+                fixes.append(f"{path}[{i}]: dropped invalid item")
+            else:
+                items.append(item)
+        return items
+
+    return value
+
+
+def repair_json_text(text: str) -> str:
+    """
+    Best-effort fix of malformed JSON text: drop trailing commas and, for a
+    truncated response, cut back to the last complete member and close the
+    open arrays/objects
+    """
+    start = text.find('{')
+    if start == -1:
+        return text
+
+    out, stack = [], []
+    safe_len, safe_stack = 0, []
+    in_string = escape = False
+    for ch in text[start:]:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch == ',':
+            safe_len, safe_stack = len(out), list(stack)
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+            out.append(ch)
+            safe_len, safe_stack = len(out), list(stack)
+            continue
+        elif ch in '}]':
+            while out and out[-1] in ' \n\t\r,':
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                return ''.join(out)
+            safe_len, safe_stack = len(out), list(stack)
+            continue
+        out.append(ch)
+
+    # Truncated: keep only complete members
+    return ''.join(out[:safe_len]).rstrip(' \n\t\r,') + ''.join(reversed(safe_stack))
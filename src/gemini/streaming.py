@@ -0,0 +1,106 @@
+"""
+Incremental JSON parsing of streamed Gemini responses
+"""
+import json
+from typing import Dict, List, Tuple
+
+STREAMED_ARRAYS = ('rooms', 'walls', 'doors', 'windows')
+
+
+class IncrementalFloorplanParser:
+    """
+    Scan a streamed floorplan JSON once, character by character, and emit each
+    element of the top-level rooms/walls/doors/windows arrays as soon as its
+    closing brace arrives. Markdown fences around the JSON are ignored
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.elements = {key: [] for key in STREAMED_ARRAYS}
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._key = None
+        self._element_start = None
+
+    def feed(self, text: str) -> List[Tuple[str, Dict]]:
+        """
+        Add a chunk of response text and return the newly completed elements
+        as (array name, element) pairs
+        """
+        self.buffer += text
+        completed = []
+
+        for i in range(self._pos, len(self.buffer)):
+            ch = self.buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = self.buffer[self._string_start + 1:i]
+                continue
+
+            if not self._stack and ch != '{':
+                continue  # text before the JSON document (e.g. ```json)
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == ':' and len(self._stack) == 1:
+                self._key = self._last_string
+            elif ch in '{[':
+                if ch == '{' and self._in_tracked_array():
+                    self._element_start = i
+                self._stack.append(ch)
+            elif ch in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if ch == '}' and self._element_start is not None and self._in_tracked_array():
+                    element = self._load(self.buffer[self._element_start:i + 1])
+                    if element is not None:
+                        self.elements[self._key].append(element)
+                        completed.append((self._key, element))
+                    self._element_start = None
+
+        self._pos = len(self.buffer)
+        return completed
+
+    def finish(self) -> Dict:
+        """
+        Parse the complete response. If it is truncated or malformed, return
+        the elements completed so far marked metadata.salvaged, so the caller
+        can retry and fall back to them
+        """
+        text = self.buffer
+        start, end = text.find('{'), text.rfind('}')
+        if start != -1 and end > start:
+            result = self._load(text[start:end + 1])
+            if isinstance(result, dict):
+                return result
+
+        if not any(self.elements.values()):
+            raise ValueError(f"Invalid JSON from Gemini stream: {text[:500]}...")
+
+        return {
+            **{key: list(items) for key, items in self.elements.items()},
+            'metadata': {
+                'salvaged': True,
+                'salvaged_counts': {key: len(items) for key, items in self.elements.items()}
+            }
+        }
+
+    def _in_tracked_array(self) -> bool:
+        return self._stack == ['{', '['] and self._key in STREAMED_ARRAYS
+
+    def _load(self, text: str):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return None
@@ -0,0 +1,51 @@
+"""
+RasterScan floorplan pipeline.
+
+Public classes are loaded lazily on first attribute access, which keeps
+``import src.rasterscan`` cheap for the Airflow scheduler:
+
+    from src.rasterscan import FloorplanCleaner
+"""
+import importlib
+
+# public name -> submodule that defines it
+_EXPORTS = {
+    'Floorplan': 'canonical_schema',
+    'Room': 'canonical_schema',
+    'Wall': 'canonical_schema',
+    'Door': 'canonical_schema',
+    'Window': 'canonical_schema',
+    'Point2D': 'canonical_schema',
+    'FloorplanCleaner': 'cleaner',
+    'TiledCleaner': 'tiled_cleaner',
+    'FloorplanValidator': 'validator',
+    'OpeningIndex': 'openings',
+    'FloorplanOptimizer': 'optimizer',
+    'RoomPlacer': 'placement',
+    'FloorplanRecognizer': 'recognizer',
+    'RasterScanBackend': 'recognizer',
+    'ReplayBackend': 'recognizer',
+    'TiledRecognizer': 'tiling',
+    'ImagePreprocessor': 'preprocess',
+    'ImageTransform': 'preprocess',
+    'map_raw_to_original': 'preprocess',
+    'CheckpointStore': 'checkpoint',
+    'VersionStore': 'versions',
+    'FingerprintIndex': 'fingerprint',
+    'StreamingPipeline': 'stream',
+    'FloorplanComparator': 'compare',
+    'load_json': 'helper',
+    'save_json': 'helper',
+    'atomic_write_json': 'helper',
+    'dict_to_floorplan': 'helper',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
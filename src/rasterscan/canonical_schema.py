@@ -1,7 +1,6 @@
 import math
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dataclasses import dataclass
-from shapely.geometry import Polygon
 
 @dataclass
 class Point2D:
@@ -16,6 +15,8 @@ class Door:
     position: List[Point2D]
     width: float
     connects_rooms: List[str] = None
+    wall_index: Optional[int] = None  # host wall in Floorplan.walls
+    offset: Optional[float] = None  # distance from the host wall start to the door center
     
     def get_center(self) -> Point2D:
         bbox = self.position
@@ -27,6 +28,13 @@ class Door:
 class Window:
     position: List[Point2D]
     width: float
+    wall_index: Optional[int] = None
+    offset: Optional[float] = None
+    
+    def get_center(self) -> Point2D:
+        center_x = sum(p.x for p in self.position) / len(self.position)
+        center_y = sum(p.y for p in self.position) / len(self.position)
+        return Point2D(center_x, center_y)
 
 @dataclass
 class Wall:
@@ -50,7 +58,8 @@ class Room:
     doors: List[Door]
     windows: List[Window]
     
-    def get_polygon(self) -> Polygon:
+    def get_polygon(self) -> 'Polygon':
+        from shapely.geometry import Polygon  # lazy: keeps schema imports light
         coords = [(p.x, p.y) for p in self.vertices]
         if len(coords) < 3:
             return None
@@ -77,10 +86,8 @@ class Floorplan:
                     'room_type': r.room_type,
                     'vertices': [{'x': v.x, 'y': v.y} for v in r.vertices],
                     'area': r.area,
-                    'doors': [{'position': [{'x': p.x, 'y': p.y} for p in d.position], 
-                              'width': d.width} for d in r.doors],
-                    'windows': [{'position': [{'x': p.x, 'y': p.y} for p in w.position], 
-                                'width': w.width} for w in r.windows]
+                    'doors': [_opening_dict(d) for d in r.doors],
+                    'windows': [_opening_dict(w) for w in r.windows]
                 }
                 for r in self.rooms
             ],
@@ -96,3 +103,43 @@ class Floorplan:
             'perimeter': self.perimeter,
             'metadata': self.metadata or {}
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Floorplan':
+        """
+        Rebuild a Floorplan from the output of to_dict
+        """
+        def point(p: Dict) -> Point2D:
+            return Point2D(p['x'], p['y'])
+        
+        rooms = [
+            Room(
+                id=r['id'],
+                room_type=r['room_type'],
+                vertices=[point(v) for v in r['vertices']],
+                area=r['area'],
+                doors=[Door([point(p) for p in d['position']], d['width'],
+                            wall_index=d.get('wall_index'), offset=d.get('offset'))
+                       for d in r.get('doors', [])],
+                windows=[Window([point(p) for p in w['position']], w['width'],
+                                wall_index=w.get('wall_index'), offset=w.get('offset'))
+                         for w in r.get('windows', [])]
+            )
+            for r in data.get('rooms', [])
+        ]
+        walls = [Wall(point(w['start']), point(w['end'])) for w in data.get('walls', [])]
+        return cls(
+            rooms=rooms,
+            walls=walls,
+            total_area=data.get('total_area', 0),
+            perimeter=data.get('perimeter', 0),
+            metadata=data.get('metadata', {})
+        )
+
+
+def _opening_dict(opening) -> Dict:
+    data = {'position': [{'x': p.x, 'y': p.y} for p in opening.position], 'width': opening.width}
+    if opening.wall_index is not None:
+        data['wall_index'] = opening.wall_index
+        data['offset'] = opening.offset
+    return data
@@ -0,0 +1,90 @@
+"""
+Content-addressed checkpoints so unchanged pipeline stages are not recomputed
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .helper import atomic_write_json
+
+# Source files whose content defines each stage's code version
+STAGE_CODE = {
+    'clean': ['cleaner.py', 'tiled_cleaner.py', 'validator.py', 'openings.py', 'geometry.py',
+              'canonical_schema.py'],
+    'optimize': ['optimizer.py', 'openings.py', 'placement.py', 'validator.py', 'geometry.py', 'helper.py',
+                 'canonical_schema.py']
+}
+SRC_DIR = Path(__file__).resolve().parent
+
+
+def content_hash(data) -> str:
+    """
+    SHA-256 of the canonical JSON form of data
+    """
+    encoded = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def code_version(stage: str) -> str:
+    """
+    Hash of the source files a stage depends on
+    """
+    digest = hashlib.sha256()
+    for name in STAGE_CODE.get(stage, []):
+        digest.update(name.encode('utf-8'))
+        digest.update((SRC_DIR / name).read_bytes())
+    return digest.hexdigest()
+
+
+class CheckpointStore:
+    """
+    Stage outputs stored under the fingerprint of (stage, input content,
+    code version, parameters): <root>/<fp[:2]>/<fp>.json
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def fingerprint(self, stage: str, input_hash: str, params: Dict) -> str:
+        return content_hash({
+            'stage': stage,
+            'input': input_hash,
+            'code': code_version(stage),
+            'params': params
+        })
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        path = self._path(fingerprint)
+        if not path.exists():
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def put(self, fingerprint: str, data: Dict):
+        # A crashed run never leaves a partial checkpoint and concurrent
+        # writers of one fingerprint do not collide
+        atomic_write_json(data, self._path(fingerprint))
+
+    def _path(self, fingerprint: str) -> Path:
+        return self.root / fingerprint[:2] / f"{fingerprint}.json"
+
+    def run_stage(self, stage: str, input_data: Dict, params: Dict,
+                  compute: Callable[[], Dict], force: bool = False) -> Tuple[Dict, bool]:
+        """
+        Return the stage output from the store when its fingerprint matches,
+        otherwise compute and store it. Returns (output, reused)
+        """
+        fingerprint = self.fingerprint(stage, content_hash(input_data), params)
+        if not force:
+            cached = self.get(fingerprint)
+            if cached is not None:
+                return cached, True
+
+        output = compute()
+        self.put(fingerprint, output)
+        return output, False
+
+
+def format_report(report: Dict[str, bool]) -> List[str]:
+    return [f" -> {stage}: {'reused checkpoint' if reused else 'computed'}" for stage, reused in report.items()]
@@ -1,14 +1,24 @@
-from typing import List, Dict
-from canonical_schema import Point2D, Wall, Room, Door, Floorplan
-from shapely.geometry import Polygon, Point
+from typing import List, Dict, Optional
+import numpy as np
+import shapely
+from .canonical_schema import Point2D, Wall, Room, Door, Window, Floorplan
+from shapely.geometry import Polygon
+from shapely.validation import make_valid
+from .validator import FloorplanValidator
+from .geometry import room_polygons, door_centers
+from .openings import attach_to_walls
 
 class FloorplanCleaner:
     """
     Clean and normalize raw recognizer output
     """
     
-    def __init__(self, snap_threshold: float = 5.0):
+    # Maximum distance between a door/window and the outline of its room or its host wall
+    door_distance = 20
+    
+    def __init__(self, snap_threshold: float = 5.0, validate: bool = True):
         self.snap_threshold = snap_threshold
+        self.validator = FloorplanValidator() if validate else None
     
     def clean(self, raw_data: Dict) -> Floorplan:
         
@@ -19,11 +29,23 @@ class FloorplanCleaner:
         # Extract and clean rooms
         rooms = self._extract_rooms(raw_data.get('rooms', []))
         
-        # Extract doors
+        # Extract doors and windows
         doors = self._extract_doors(raw_data.get('doors', []))
+        windows = self._extract_windows(raw_data.get('windows', []))
         
-        # Assign doors to rooms
+        # Assign doors and windows to rooms
         self._assign_doors_to_rooms(rooms, doors)
+        self._assign_windows_to_rooms(rooms, windows)
+        
+        return self._assemble(raw_data, rooms, walls, doors, windows)
+    
+    def _assemble(self, raw_data: Dict, rooms: List[Room], walls: List[Wall], doors: List[Door],
+                  windows: List[Window]) -> Floorplan:
+        """
+        Attach openings to their host walls, build the floorplan from cleaned
+        elements and validate it
+        """
+        attach_to_walls(doors + windows, walls, self.door_distance)
         
         # Calculate metrics
         total_area = sum(r.area for r in rooms)
@@ -31,17 +53,26 @@ class FloorplanCleaner:
         
         metadata = {
             'source': 'RasterScan Recognizer',
+            'coordinate_system': 'image_pixels_top_left_origin',
             'cleaned': True,
             'room_count': len(rooms)
         }
         
-        return Floorplan(
+        floorplan = Floorplan(
             rooms=rooms,
             walls=walls,
             total_area=total_area,
             perimeter=perimeter,
             metadata=metadata
         )
+        
+        # Validate geometry (overlaps, rooms outside exterior, doors off walls)
+        if self.validator:
+            report = self.validator.validate(floorplan, doors)
+            metadata['validation_passed'] = report['passed']
+            metadata['cleaning_stats'] = report['counts']
+        
+        return floorplan
     
     def _extract_walls(self, wall_data: List[Dict]) -> List[Wall]:
         """
@@ -71,16 +102,7 @@ class FloorplanCleaner:
             points.append(w.end)
         
         # Group nearby points
-        for i, p in enumerate(points):
-            if i % 2 == 0:
-                # Find nearby points
-                for j, other in enumerate(points[i+1:], i+1):
-                    if p.distance_to(other) < self.snap_threshold:
-                        # Snap to average position
-                        avg_x = (p.x + other.x) / 2
-                        avg_y = (p.y + other.y) / 2
-                        points[i] = Point2D(avg_x, avg_y)
-                        points[j] = Point2D(avg_x, avg_y)
+        self._snap_points(points, range(len(points)))
         
         # Reconstruct walls with snapped points
         new_walls = []
@@ -90,6 +112,24 @@ class FloorplanCleaner:
         
         return new_walls
     
+    def _snap_points(self, points: List[Point2D], indices):
+        """
+        Snap points in place, in order. indices are the endpoint indices of
+        points (even = wall start); only wall starts pull other points
+        """
+        for a, i in enumerate(indices):
+            if i % 2 == 0:
+                p = points[a]
+                # Find nearby points
+                for b in range(a + 1, len(points)):
+                    other = points[b]
+                    if p.distance_to(other) < self.snap_threshold:
+                        # Snap to average position
+                        avg_x = (p.x + other.x) / 2
+                        avg_y = (p.y + other.y) / 2
+                        points[a] = Point2D(avg_x, avg_y)
+                        points[b] = Point2D(avg_x, avg_y)
+    
     def _extract_rooms(self, room_data: List[List[Dict]]) -> List[Room]:
         """
         Extract and clean rooms from raw data
@@ -97,38 +137,45 @@ class FloorplanCleaner:
         rooms = []
         
         for i, room_vertices in enumerate(room_data):
-            if not room_vertices or len(room_vertices) < 3:
-                continue
-            
-            # Extract vertices
-            vertices = []
-            for v in room_vertices:
-                vertices.append(Point2D(v['x'], v['y']))
-            
-            # Remove duplicate consecutive vertices
-            vertices = self._remove_duplicate_vertices(vertices)
-            
-            if len(vertices) < 3:
-                continue
-            
-            # Calculate area
-            poly = Polygon([(v.x, v.y) for v in vertices])
-            area = poly.area if poly.is_valid else 0
-            
-            room_type = self._infer_room_type(area, i)
-            
-            room = Room(
-                id=f"room_{i}",
-                room_type=room_type,
-                vertices=vertices,
-                area=area,
-                doors=[],
-                windows=[]
-            )
-            rooms.append(room)
+            room = self._extract_room(i, room_vertices)
+            if room:
+                rooms.append(room)
         
         return rooms
     
+    def _extract_room(self, i: int, room_vertices: List[Dict]) -> Optional[Room]:
+        """
+        Clean the i-th raw room; None when fewer than 3 vertices remain
+        """
+        if not room_vertices or len(room_vertices) < 3:
+            return None
+        
+        # Extract vertices
+        vertices = []
+        for v in room_vertices:
+            vertices.append(Point2D(v['x'], v['y']))
+        
+        # Remove duplicate consecutive vertices
+        vertices = self._remove_duplicate_vertices(vertices)
+        
+        if len(vertices) < 3:
+            return None
+        
+        # Calculate area, repairing self-intersecting polygons first
+        poly = Polygon([(v.x, v.y) for v in vertices])
+        area = poly.area if poly.is_valid else make_valid(poly).area
+        
+        room_type = self._infer_room_type(area, i)
+        
+        return Room(
+            id=f"room_{i}",
+            room_type=room_type,
+            vertices=vertices,
+            area=area,
+            doors=[],
+            windows=[]
+        )
+    
     def _remove_duplicate_vertices(self, vertices: List[Point2D]) -> List[Point2D]:
         """
         Remove consecutive duplicate vertices
@@ -161,36 +208,56 @@ class FloorplanCleaner:
         """
         Extract doors from raw data
         """
-        doors = []
-        for d in door_data:
+        return self._extract_openings(door_data, Door)
+    
+    def _extract_windows(self, window_data: List[Dict]) -> List[Window]:
+        """
+        Extract windows from raw data (same bbox format as doors)
+        """
+        return self._extract_openings(window_data, Window)
+    
+    def _extract_openings(self, opening_data: List[Dict], kind) -> List:
+        openings = []
+        for d in opening_data:
             bbox = d.get('bbox', [])
             if len(bbox) >= 4:
                 position = [Point2D(bbox[i][0], bbox[i][1]) for i in range(4)]
                 # Calculate width
                 width = position[0].distance_to(position[1])
-                doors.append(Door(position, width))
-        return doors
+                openings.append(kind(position, width))
+        return openings
     
     def _assign_doors_to_rooms(self, rooms: List[Room], doors: List[Door]):
         """
         Assign doors to rooms based on proximity
         """
-        for door in doors:
-            door_center = door.get_center()
-            door_point = Point(door_center.x, door_center.y)
-            
-            # Find rooms that contain or are close to the door
-            min_dist = float('inf')
-            closest_room = None
-            
-            for room in rooms:
-                poly = room.get_polygon()
-                if poly:
-                    # Check if door is on room boundary
-                    dist = poly.exterior.distance(door_point)
-                    if dist < min_dist and dist < 20:  # Threshold
-                        min_dist = dist
-                        closest_room = room
-            
-            if closest_room:
-                closest_room.doors.append(door)
+        for door, room in zip(doors, self._closest_rooms(doors, rooms)):
+            if room:
+                room.doors.append(door)
+    
+    def _assign_windows_to_rooms(self, rooms: List[Room], windows: List[Window]):
+        for window, room in zip(windows, self._closest_rooms(windows, rooms)):
+            if room:
+                room.windows.append(window)
+    
+    def _closest_rooms(self, openings: List, rooms: List[Room]) -> List[Optional[Room]]:
+        """
+        For every opening, the room whose outline is nearest to its center
+        within door_distance (the first one on ties), from a single STRtree query
+        """
+        closest = [None] * len(openings)
+        if not openings or not rooms:
+            return closest
+        
+        outlines = shapely.get_exterior_ring(room_polygons(rooms))
+        centers = shapely.points(door_centers(openings))
+        (opening_idx, room_idx), distance = shapely.STRtree(outlines).query_nearest(
+            centers, max_distance=self.door_distance, return_distance=True, all_matches=True)
+        
+        keep = distance < self.door_distance
+        opening_idx, room_idx = opening_idx[keep], room_idx[keep]
+        # Equidistant rooms are all returned; iterate so the lowest index wins
+        order = np.lexsort((-room_idx, opening_idx))
+        for k, r in zip(opening_idx[order].tolist(), room_idx[order].tolist()):
+            closest[k] = rooms[r]
+        return closest
@@ -0,0 +1,343 @@
+"""
+Cross-source comparison of canonical floorplans (e.g. RasterScan vs Gemini):
+match rooms and doors spatially, report missing / extra / mislabelled
+elements and geometric deviation, for one pair or a whole dataset
+
+    python -m src.rasterscan.compare outputs/rasterscan outputs/gemini
+    python -m src.rasterscan.compare outputs/stream outputs/gemini_stream --workers 8 --output diff.json
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+import shapely
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from .helper import load_json
+
+# metadata.coordinate_system values whose y axis points up
+Y_UP_SYSTEMS = ('cartesian_meters_bottom_left_origin',)
+
+
+class FloorplanComparator:
+    """
+    Compare a candidate floorplan against a reference. Both plans are
+    normalized to a unit, y-up frame first (their sources use different
+    units and axes, e.g. image pixels vs meters from the bottom left), then rooms are matched by IoU and doors by
+    distance, with optimal one-to-one assignment inside each group of
+    overlapping candidates
+    """
+
+    def __init__(self, min_iou: float = 0.3, door_tolerance: float = 0.03, normalize: bool = True):
+        """
+        Args:
+            min_iou: rooms overlapping less than this are not matched
+            door_tolerance: max door center distance, as a fraction of the plan's longest side
+            normalize: flip image-coordinate plans to y-up and scale both plans so
+                       their room extent spans [0, 1] on the longest side
+        """
+        self.min_iou = min_iou
+        self.door_tolerance = door_tolerance
+        self.normalize = normalize
+
+    def compare(self, reference: Dict, candidate: Dict) -> Dict:
+        ref, cand = plan_elements(reference), plan_elements(candidate)
+        if self.normalize:
+            ref, cand = normalize_plan(ref), normalize_plan(cand)
+        return {
+            'rooms': self._compare_rooms(ref, cand),
+            'doors': self._compare_doors(ref['doors'], cand['doors'])
+        }
+
+    def _compare_rooms(self, ref: Dict, cand: Dict) -> Dict:
+        ref_polys, cand_polys = ref['polygons'], cand['polygons']
+        pairs = np.empty((0, 2), dtype=int)
+        iou = np.empty(0)
+        if len(ref_polys) and len(cand_polys):
+            left, right = shapely.STRtree(cand_polys).query(ref_polys, predicate='intersects')
+            inter = shapely.area(shapely.intersection(ref_polys[left], cand_polys[right]))
+            union = shapely.area(ref_polys[left]) + shapely.area(cand_polys[right]) - inter
+            iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+            keep = iou >= self.min_iou
+            pairs, iou = np.column_stack([left[keep], right[keep]]), iou[keep]
+
+        matched = assign(pairs, 1 - iou, len(ref_polys), len(cand_polys))
+        i, j = (matched[:, 0], matched[:, 1]) if len(matched) else (np.empty(0, int), np.empty(0, int))
+        matched_iou = _pair_values(pairs, iou, matched)
+
+        a, b = ref_polys[i], cand_polys[j]
+        offsets = shapely.distance(shapely.centroid(a), shapely.centroid(b))
+        hausdorff = shapely.hausdorff_distance(a, b)
+        area_ratio = shapely.area(b) / np.maximum(shapely.area(a), 1e-12)
+
+        mislabelled = [
+            {'reference': ref['ids'][p], 'candidate': cand['ids'][q],
+             'reference_type': ref['types'][p], 'candidate_type': cand['types'][q]}
+            for p, q in zip(i, j)
+            if ref['types'][p] != cand['types'][q] and 'unknown' not in (ref['types'][p], cand['types'][q])
+        ]
+        return {
+            'reference': len(ref_polys),
+            'candidate': len(cand_polys),
+            'matched': len(matched),
+            'missing': [ref['ids'][k] for k in np.setdiff1d(np.arange(len(ref_polys)), i)],
+            'extra': [cand['ids'][k] for k in np.setdiff1d(np.arange(len(cand_polys)), j)],
+            'mislabelled': mislabelled,
+            'mean_iou': float(matched_iou.mean()) if len(matched) else 0.0,
+            'matches': [
+                {'reference': ref['ids'][p], 'candidate': cand['ids'][q], 'iou': float(v),
+                 'centroid_offset': float(o), 'hausdorff': float(h), 'area_ratio': float(r)}
+                for p, q, v, o, h, r in zip(i, j, matched_iou, offsets, hausdorff, area_ratio)
+            ]
+        }
+
+    def _compare_doors(self, ref: np.ndarray, cand: np.ndarray) -> Dict:
+        pairs = np.empty((0, 2), dtype=int)
+        distance = np.empty(0)
+        if len(ref) and len(cand):
+            ref_points, cand_points = shapely.points(ref), shapely.points(cand)
+            left, right = shapely.STRtree(cand_points).query(ref_points, predicate='dwithin',
+                                                             distance=self.door_tolerance)
+            pairs = np.column_stack([left, right])
+            distance = np.linalg.norm(ref[left] - cand[right], axis=1)
+
+        matched = assign(pairs, distance, len(ref), len(cand))
+        offsets = _pair_values(pairs, distance, matched)
+        return {
+            'reference': len(ref),
+            'candidate': len(cand),
+            'matched': len(matched),
+            'missing': len(ref) - len(matched),
+            'extra': len(cand) - len(matched),
+            'mean_offset': float(offsets.mean()) if len(matched) else 0.0
+        }
+
+
+def plan_elements(data: Dict) -> Dict:
+    """
+    Rooms (ids, normalized types, polygons) and door centers from either
+    canonical format: Floorplan.to_dict (vertices as {'x', 'y'}, doors inside
+    rooms) or the Gemini schema (vertices as [x, y], top-level doors)
+    """
+    ids, types, polygons = [], [], []
+    doors = []
+    for k, room in enumerate(data.get('rooms', [])):
+        coords = [(v['x'], v['y']) if isinstance(v, dict) else tuple(v[:2]) for v in room.get('vertices', [])]
+        for door in room.get('doors', []):
+            doors.append(_door_center(door))
+        if len(coords) < 3:
+            continue
+        polygon = shapely.make_valid(shapely.Polygon(coords))
+        if polygon.area <= 0:
+            continue
+        ids.append(room.get('id', str(k)))
+        types.append(str(room.get('room_type', room.get('type', 'unknown'))).lower().replace(' ', '_'))
+        polygons.append(polygon)
+
+    doors.extend(_door_center(d) for d in data.get('doors', []))
+    return {
+        'y_up': y_axis_up(data),
+        'ids': ids,
+        'types': types,
+        'polygons': np.array(polygons, dtype=object),
+        'doors': np.array([d for d in doors if d is not None], dtype=float).reshape(-1, 2)
+    }
+
+
+def y_axis_up(data: Dict) -> bool:
+    """
+    Whether a plan's y axis points up, from metadata.coordinate_system.
+    Without one, Gemini plans (canonical_v1 schema) are taken as y-up and
+    anything else as image pixels (y down), like RasterScan output
+    """
+    system = data.get('metadata', {}).get('coordinate_system')
+    if system:
+        return system in Y_UP_SYSTEMS
+    return data.get('schema') == 'canonical_v1'
+
+
+def normalize_plan(plan: Dict) -> Dict:
+    """
+    Flip y-down plans, then translate and scale so the rooms' bounding box
+    starts at the origin and its longest side is 1
+    """
+    if not len(plan['polygons']):
+        return plan
+    minx, miny, maxx, maxy = shapely.total_bounds(plan['polygons'])
+    scale = max(maxx - minx, maxy - miny) or 1.0
+    flip = np.array([1.0, 1.0 if plan.get('y_up', True) else -1.0])
+    origin = np.array([minx, miny if plan.get('y_up', True) else -maxy])
+    return {
+        **plan,
+        'y_up': True,
+        'polygons': shapely.transform(plan['polygons'], lambda xy: (xy * flip - origin) / scale),
+        'doors': (plan['doors'] * flip - origin) / scale
+    }
+
+
+def assign(pairs: np.ndarray, cost: np.ndarray, n_left: int, n_right: int) -> np.ndarray:
+    """
+    One-to-one assignment minimizing total cost over the candidate pairs.
+    The bipartite candidate graph is split into connected components and
+    the Hungarian algorithm runs on each small component separately
+    """
+    if not len(pairs):
+        return np.empty((0, 2), dtype=int)
+
+    graph = coo_matrix((np.ones(len(pairs)), (pairs[:, 0], n_left + pairs[:, 1])),
+                       shape=(n_left + n_right, n_left + n_right))
+    _, labels = connected_components(graph, directed=False)
+    pair_labels = labels[pairs[:, 0]]
+
+    matched = []
+    for label in np.unique(pair_labels):
+        members = np.flatnonzero(pair_labels == label)
+        left, li = np.unique(pairs[members, 0], return_inverse=True)
+        right, ri = np.unique(pairs[members, 1], return_inverse=True)
+        # Non-candidate pairs get a cost no real pair can reach
+        matrix = np.full((len(left), len(right)), cost[members].max() + 1e6)
+        matrix[li, ri] = cost[members]
+        rows, cols = linear_sum_assignment(matrix)
+        valid = matrix[rows, cols] < 1e6
+        matched.extend(zip(left[rows[valid]], right[cols[valid]]))
+    return np.array(sorted(matched), dtype=int).reshape(-1, 2)
+
+
+def compare_files(reference_path: str, candidate_path: str, min_iou: float = 0.3,
+                  door_tolerance: float = 0.03) -> Dict:
+    report = FloorplanComparator(min_iou, door_tolerance).compare(load_json(reference_path),
+                                                                  load_json(candidate_path))
+    return {'reference_path': str(reference_path), 'candidate_path': str(candidate_path), **report}
+
+
+def _compare_job(args: Tuple) -> Dict:
+    return compare_files(*args)
+
+
+def plan_pairs(reference_dir: str, candidate_dir: str, filename: str) -> List[Tuple[str, Path, Path]]:
+    """
+    (plan id, reference file, candidate file) for every plan present in
+    both directories: either the directories hold the file directly, or
+    one sub-directory per plan, possibly nested (stream outputs mirror the
+    input folders)
+    """
+    reference_dir, candidate_dir = Path(reference_dir), Path(candidate_dir)
+    if (reference_dir / filename).exists() and (candidate_dir / filename).exists():
+        return [(reference_dir.name, reference_dir / filename, candidate_dir / filename)]
+    plans = [path.parent.relative_to(reference_dir) for path in sorted(reference_dir.glob(f"**/*/{filename}"))]
+    return [
+        (plan.as_posix(), reference_dir / plan / filename, candidate_dir / plan / filename)
+        for plan in plans
+        if (candidate_dir / plan / filename).exists()
+    ]
+
+def compare_datasets(reference_dir: str, candidate_dir: str, filename: str = 'cleaned_canonical.json',
+                     min_iou: float = 0.3, door_tolerance: float = 0.03,
+                     workers: Optional[int] = None) -> Tuple[Dict[str, Dict], Dict]:
+    """
+    Compare every plan found in both directories on a process pool.
+    Returns (report per plan id, summary statistics)
+    """
+    pairs = plan_pairs(reference_dir, candidate_dir, filename)
+    jobs = [(ref, cand, min_iou, door_tolerance) for _, ref, cand in pairs]
+    workers = workers or os.cpu_count()
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            reports = list(pool.map(_compare_job, jobs, chunksize=max(len(jobs) // (workers * 4), 1)))
+    else:
+        reports = [_compare_job(job) for job in jobs]
+
+    by_plan = {plan_id: report for (plan_id, _, _), report in zip(pairs, reports)}
+    return by_plan, summarize(by_plan)
+
+
+def summarize(reports: Dict[str, Dict]) -> Dict:
+    """
+    Dataset totals and rates: precision = matched / candidate elements,
+    recall = matched / reference elements
+    """
+    def total(kind: str, key: str) -> int:
+        return sum(r[kind][key] if isinstance(r[kind][key], int) else len(r[kind][key]) for r in reports.values())
+
+    ious = np.array([m['iou'] for r in reports.values() for m in r['rooms']['matches']])
+    offsets = np.array([m['centroid_offset'] for r in reports.values() for m in r['rooms']['matches']])
+    rooms_matched, doors_matched = total('rooms', 'matched'), total('doors', 'matched')
+
+    def rate(count: int, base: int) -> float:
+        return round(count / base, 4) if base else 0.0
+
+    worst = sorted(reports, key=lambda plan_id: reports[plan_id]['rooms']['mean_iou'])[:5]
+    return {
+        'plans': len(reports),
+        'rooms': {
+            'reference': total('rooms', 'reference'),
+            'candidate': total('rooms', 'candidate'),
+            'matched': rooms_matched,
+            'missing': total('rooms', 'missing'),
+            'extra': total('rooms', 'extra'),
+            'mislabelled': total('rooms', 'mislabelled'),
+            'precision': rate(rooms_matched, total('rooms', 'candidate')),
+            'recall': rate(rooms_matched, total('rooms', 'reference')),
+            'mislabel_rate': rate(total('rooms', 'mislabelled'), rooms_matched),
+            'iou_mean': float(ious.mean()) if len(ious) else 0.0,
+            'iou_median': float(np.median(ious)) if len(ious) else 0.0,
+            'iou_p10': float(np.percentile(ious, 10)) if len(ious) else 0.0,
+            'centroid_offset_mean': float(offsets.mean()) if len(offsets) else 0.0
+        },
+        'doors': {
+            'reference': total('doors', 'reference'),
+            'candidate': total('doors', 'candidate'),
+            'matched': doors_matched,
+            'precision': rate(doors_matched, total('doors', 'candidate')),
+            'recall': rate(doors_matched, total('doors', 'reference'))
+        },
+        'worst_plans': worst
+    }
+
+
+def _pair_values(pairs: np.ndarray, values: np.ndarray, matched: np.ndarray) -> np.ndarray:
+    """
+    values of the candidate pairs selected by the assignment
+    """
+    if not len(matched):
+        return np.empty(0)
+    lookup = {(int(a), int(b)): v for (a, b), v in zip(pairs, values)}
+    return np.array([lookup[(int(a), int(b))] for a, b in matched])
+
+
+def _door_center(door: Dict) -> Optional[Tuple[float, float]]:
+    position = door.get('position') or door.get('bbox')
+    if not position:
+        return None
+    if isinstance(position[0], (int, float)):
+        return float(position[0]), float(position[1])
+    points = [(p['x'], p['y']) if isinstance(p, dict) else p[:2] for p in position]
+    return tuple(np.mean(np.array(points, dtype=float), axis=0))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare canonical floorplans from two sources")
+    parser.add_argument("reference_dir", help="e.g. outputs/rasterscan")
+    parser.add_argument("candidate_dir", help="e.g. outputs/gemini")
+    parser.add_argument("--file", default="cleaned_canonical.json", help="file compared in each plan directory")
+    parser.add_argument("--min-iou", type=float, default=0.3)
+    parser.add_argument("--door-tolerance", type=float, default=0.03,
+                        help="door match distance as a fraction of the plan's longest side")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default=None, help="write per-plan reports and the summary as JSON")
+    args = parser.parse_args()
+
+    reports, summary = compare_datasets(args.reference_dir, args.candidate_dir, args.file,
+                                        args.min_iou, args.door_tolerance, args.workers)
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'summary': summary, 'plans': reports}, f, indent=2)
+        print(f" -> Saved to: {args.output}")
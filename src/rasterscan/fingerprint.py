@@ -0,0 +1,309 @@
+"""
+Geometric fingerprints of floorplans for near-duplicate detection: the same
+layout uploaded shifted, rescaled, rotated or mirrored gets (almost) the same
+fingerprint, so its cleaned/optimized results can be reused after mapping
+them into the new coordinates
+"""
+import fcntl
+import json
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+import shapely
+
+from .canonical_schema import Floorplan
+from .helper import atomic_write_json
+
+BINS = 6
+TOP_ROOMS = 12
+FINGERPRINT_SIZE = TOP_ROOMS + 4 * BINS + 1
+MIN_WEIGHT = 1e-3
+
+
+def plan_polygons(source) -> np.ndarray:
+    """
+    Room polygons of a Floorplan, a Floorplan.to_dict() dict or raw
+    recognizer output (rooms as lists of {'x', 'y'})
+    """
+    if isinstance(source, Floorplan):
+        rings = [[(v.x, v.y) for v in r.vertices] for r in source.rooms]
+    else:
+        rings = [
+            [(v['x'], v['y']) for v in (room['vertices'] if isinstance(room, dict) else room)]
+            for room in source.get('rooms', [])
+        ]
+    polygons = shapely.make_valid(np.array([shapely.Polygon(r) for r in rings if len(r) >= 3], dtype=object))
+    return polygons[shapely.area(polygons) > 0]
+
+
+def fingerprint(polygons: np.ndarray) -> np.ndarray:
+    """
+    Translation, scale, rotation and mirror invariant descriptor: largest
+    normalized room areas, area-weighted histograms of room rectangularity,
+    aspect ratio and distance from the plan centroid, the adjacency degree
+    histogram and the room count. Rooms under min_weight of the total area
+    are ignored so recognition noise does not change the counts
+    """
+    vector = np.zeros(FINGERPRINT_SIZE)
+    areas = shapely.area(polygons)
+    keep = areas > MIN_WEIGHT * areas.sum() if len(areas) else areas > 0
+    polygons, areas = polygons[keep], areas[keep]
+    if not len(polygons):
+        return vector
+
+    total = areas.sum()
+    weights = areas / total
+    scale = np.sqrt(total)
+
+    top = np.sort(weights)[::-1][:TOP_ROOMS]
+    vector[:len(top)] = top
+
+    # Oriented bounding boxes: rectangularity and aspect ratio are stable under vertex noise
+    boxes = shapely.oriented_envelope(polygons)
+    box_coords = shapely.get_coordinates(shapely.get_exterior_ring(boxes)).reshape(len(boxes), 5, 2)
+    sides = np.linalg.norm(box_coords[:, 1:3] - box_coords[:, 0:2], axis=2)
+    rectangularity = areas / np.maximum(shapely.area(boxes), 1e-12)
+    aspect = sides.min(axis=1) / np.maximum(sides.max(axis=1), 1e-12)
+
+    centroids = shapely.get_coordinates(shapely.centroid(polygons))
+    radial = np.linalg.norm(centroids - weights @ centroids, axis=1) / scale
+
+    left, right = shapely.STRtree(polygons).query(polygons, predicate='dwithin', distance=0.01 * scale)
+    degree = np.bincount(left[left != right], minlength=len(polygons))
+
+    start = TOP_ROOMS
+    for values, high in [(rectangularity, 1.0), (aspect, 1.0), (radial, 1.5)]:
+        vector[start:start + BINS] = _soft_histogram(values, weights, high)
+        start += BINS
+    vector[start:start + BINS] = np.bincount(np.minimum(degree, BINS - 1), minlength=BINS) / len(polygons)
+    vector[-1] = np.log1p(len(polygons)) / 5
+    return vector
+
+
+def _soft_histogram(values: np.ndarray, weights: np.ndarray, high: float) -> np.ndarray:
+    """
+    Weighted histogram over [0, high] where each value is split linearly
+    between its two nearest bin centers, so small changes move little mass
+    """
+    position = np.clip(values / high * BINS - 0.5, 0, BINS - 1)
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, BINS - 1)
+    fraction = position - lower
+    histogram = np.bincount(lower, weights * (1 - fraction), minlength=BINS)
+    return histogram + np.bincount(upper, weights * fraction, minlength=BINS)
+
+
+@dataclass
+class SimilarityTransform:
+    """
+    target = rotate(mirror * (source - source_center)) * scale + target_center,
+    where mirror flips y when mirror_y is -1 and rotation is in radians
+    """
+    mirror_y: int
+    rotation: float
+    scale: float
+    source_center: Tuple[float, float]
+    target_center: Tuple[float, float]
+
+    def apply(self, coords: np.ndarray) -> np.ndarray:
+        cos, sin = np.cos(self.rotation), np.sin(self.rotation)
+        matrix = np.array([[cos, -sin * self.mirror_y], [sin, cos * self.mirror_y]]) * self.scale
+        return (np.asarray(coords, dtype=float) - self.source_center) @ matrix.T + self.target_center
+
+    def point(self, x: float, y: float) -> Tuple[float, float]:
+        tx, ty = self.apply([x, y])
+        return float(tx), float(ty)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def estimate_transform(source: np.ndarray, target: np.ndarray) -> Tuple[Optional[SimilarityTransform], float]:
+    """
+    Align source rooms onto target rooms: centers and scale from the room
+    areas; rotation and mirroring chosen by the best IoU of the two room
+    unions among the quarter turns and the turns matching the principal
+    axes of the room areas. Returns (transform, IoU)
+    """
+    if not len(source) or not len(target):
+        return None, 0.0
+
+    def frame(polygons):
+        areas = shapely.area(polygons)
+        centroids = shapely.get_coordinates(shapely.centroid(polygons))
+        center = areas @ centroids / areas.sum()
+        # Area-weighted second moments of the room centroids give the principal axis
+        d = centroids - center
+        sxx, syy, sxy = areas @ (d[:, 0] ** 2), areas @ (d[:, 1] ** 2), areas @ (d[:, 0] * d[:, 1])
+        return tuple(map(float, center)), np.sqrt(areas.sum()), 0.5 * np.arctan2(2 * sxy, sxx - syy)
+
+    source_center, source_scale, source_axis = frame(source)
+    target_center, target_scale, target_axis = frame(target)
+    source_union = shapely.union_all(source)
+    target_union = shapely.union_all(target)
+
+    best, best_iou = None, 0.0
+    for mirror_y in (1, -1):
+        # Mirroring y negates the source axis angle
+        turns = [0.0, target_axis - mirror_y * source_axis]
+        for rotation in [t + k * np.pi / 2 for t in turns for k in range(4)]:
+            transform = SimilarityTransform(mirror_y, float(rotation), float(target_scale / source_scale),
+                                            source_center, target_center)
+            mapped = shapely.transform(source_union, transform.apply)
+            union = shapely.union(mapped, target_union).area
+            iou = shapely.intersection(mapped, target_union).area / union if union else 0.0
+            if iou > best_iou:
+                best, best_iou = transform, iou
+    return best, float(best_iou)
+
+
+def transform_floorplan_dict(data: Dict, transform: SimilarityTransform) -> Dict:
+    """
+    Map a Floorplan.to_dict() result into new coordinates
+    """
+    s = transform.scale
+
+    def point(p: Dict) -> Dict:
+        x, y = transform.point(p['x'], p['y'])
+        return {'x': x, 'y': y}
+
+    def opening(o: Dict) -> Dict:
+        mapped = {**o, 'position': [point(p) for p in o['position']], 'width': o['width'] * s}
+        if o.get('offset') is not None:
+            mapped['offset'] = o['offset'] * s
+        return mapped
+
+    return {
+        **data,
+        'rooms': [
+            {**r, 'vertices': [point(v) for v in r['vertices']], 'area': r['area'] * s ** 2,
+             'doors': [opening(d) for d in r.get('doors', [])],
+             'windows': [opening(w) for w in r.get('windows', [])]}
+            for r in data.get('rooms', [])
+        ],
+        'walls': [
+            {**w, 'start': point(w['start']), 'end': point(w['end']), 'length': w.get('length', 0) * s}
+            for w in data.get('walls', [])
+        ],
+        'total_area': data.get('total_area', 0) * s ** 2,
+        'perimeter': data.get('perimeter', 0) * s
+    }
+
+
+class FingerprintIndex:
+    """
+    Fingerprints of processed plans in a locality-sensitive hash index
+    (p-stable random projections, several tables), persisted under root:
+    index.json holds the fingerprints, <plan_id>.json the stored results.
+    Processes may share root: additions are merged into index.json under a
+    lock on index.lock
+    """
+
+    def __init__(self, root: str, tables: int = 8, hashes_per_table: int = 4, bucket_width: float = 0.5,
+                 max_distance: float = 0.15, min_iou: float = 0.9, seed: int = 0):
+        """
+        Args:
+            bucket_width: projection quantization; larger finds more distant candidates
+            max_distance: fingerprint distance above which a candidate is ignored
+            min_iou: room-union IoU after alignment required to count as a duplicate
+        """
+        self.root = Path(root)
+        self.bucket_width = bucket_width
+        self.max_distance = max_distance
+        self.min_iou = min_iou
+        rng = np.random.default_rng(seed)
+        self.projections = rng.normal(size=(tables, hashes_per_table, FINGERPRINT_SIZE))
+        self.offsets = rng.uniform(0, bucket_width, size=(tables, hashes_per_table))
+
+        self.entries = {}
+        self.buckets = [{} for _ in range(tables)]
+        self._lock = threading.Lock()
+        self._merge_stored()
+
+    def _merge_stored(self):
+        """
+        Insert the entries of index.json, including ones other processes added
+        """
+        index_path = self.root / 'index.json'
+        if index_path.exists():
+            with open(index_path, 'r') as f:
+                for plan_id, entry in json.load(f).items():
+                    self._insert(plan_id, entry)
+
+    def _keys(self, vector: np.ndarray) -> List[Tuple[int, ...]]:
+        hashes = np.floor((self.projections @ vector + self.offsets) / self.bucket_width).astype(int)
+        return [tuple(row) for row in hashes]
+
+    def _insert(self, plan_id: str, entry: Dict):
+        self.entries[plan_id] = entry
+        for table, key in zip(self.buckets, self._keys(np.array(entry['fingerprint']))):
+            table.setdefault(key, set()).add(plan_id)
+
+    def candidates(self, vector: np.ndarray) -> List[Tuple[float, str]]:
+        """
+        Indexed plans sharing a bucket with vector, nearest first
+        """
+        with self._lock:
+            found = set().union(*(table.get(key, set()) for table, key in zip(self.buckets, self._keys(vector))))
+            scored = [(float(np.linalg.norm(np.array(self.entries[p]['fingerprint']) - vector)), p) for p in found]
+        return sorted(s for s in scored if s[0] <= self.max_distance)
+
+    def find(self, polygons: np.ndarray, params: Optional[Dict] = None
+             ) -> Optional[Tuple[str, SimilarityTransform, float]]:
+        """
+        Nearest verified near-duplicate processed with the same params:
+        (plan_id, transform from that plan to these polygons, IoU)
+        """
+        for _, plan_id in self.candidates(fingerprint(polygons)):
+            if self.entries[plan_id].get('params') != (params or {}):
+                continue
+            stored = self.load(plan_id)
+            transform, iou = estimate_transform(plan_polygons(stored['reference']), polygons)
+            if transform and iou >= self.min_iou:
+                return plan_id, transform, iou
+        return None
+
+    def reuse(self, polygons: np.ndarray, params: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Stored results of a near-duplicate mapped into these polygons'
+        coordinates, or None
+        """
+        match = self.find(polygons, params)
+        if match is None:
+            return None
+        plan_id, transform, iou = match
+        stored = self.load(plan_id)
+        results = {}
+        for name, data in stored['results'].items():
+            results[name] = transform_floorplan_dict(data, transform)
+            results[name]['metadata'] = {
+                **(data.get('metadata') or {}),
+                'reused_from': {'plan_id': plan_id, 'iou': round(iou, 4), 'transform': transform.to_dict()}
+            }
+        return results
+
+    def add(self, plan_id: str, results: Dict[str, Dict], reference: Dict, params: Optional[Dict] = None):
+        """
+        Index a processed plan. reference is the geometry the fingerprint is
+        computed from (raw output or a Floorplan dict); results are
+        Floorplan.to_dict() outputs to reuse, e.g. {'cleaned': ..., 'optimized': ...}
+        """
+        reference = {'rooms': reference.get('rooms', [])}
+        entry = {'fingerprint': fingerprint(plan_polygons(reference)).tolist(), 'params': params or {}}
+        with self._lock:
+            atomic_write_json({'reference': reference, 'results': results}, self.root / f"{plan_id}.json")
+            # Other processes may share root: merge their entries under a file
+            # lock before rewriting index.json, so no addition is lost
+            with open(self.root / 'index.lock', 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                self._merge_stored()
+                self._insert(plan_id, entry)
+                atomic_write_json(self.entries, self.root / 'index.json')
+
+    def load(self, plan_id: str) -> Dict:
+        with open(self.root / f"{plan_id}.json", 'r') as f:
+            return json.load(f)
+
@@ -0,0 +1,46 @@
+"""
+Vectorized shapely geometry of floorplan elements, shared by the validator,
+the opening index, the cleaners and room placement
+"""
+from typing import List
+
+import numpy as np
+import shapely
+
+from .canonical_schema import Room, Wall, Door
+
+
+def room_polygons(rooms: List[Room]) -> np.ndarray:
+    """
+    Build all room polygons in one call from a flat coordinate array
+    """
+    if not rooms:
+        return np.empty(0, dtype=object)
+
+    coords = np.array([(v.x, v.y) for r in rooms for v in r.vertices], dtype=float)
+    ring_index = np.repeat(np.arange(len(rooms)), [len(r.vertices) for r in rooms])
+    return shapely.polygons(shapely.linearrings(coords, indices=ring_index))
+
+
+def wall_lines(walls: List[Wall]) -> np.ndarray:
+    coords = np.array([[(w.start.x, w.start.y), (w.end.x, w.end.y)] for w in walls], dtype=float)
+    return shapely.linestrings(coords)
+
+
+def door_centers(doors: List[Door]) -> np.ndarray:
+    return np.array([(c.x, c.y) for c in (d.get_center() for d in doors)], dtype=float)
+
+
+def exterior_outline(walls: List[Wall]):
+    """
+    Outline of the building: union of the faces enclosed by the walls,
+    falling back to the convex hull when the walls do not close any face
+    """
+    if not walls:
+        return None
+
+    lines = wall_lines(walls)
+    faces = shapely.get_parts(shapely.polygonize(shapely.get_parts(shapely.union_all(lines))))
+    if len(faces):
+        return shapely.coverage_union_all(faces)
+    return shapely.convex_hull(shapely.multilinestrings(lines))
@@ -2,6 +2,8 @@
 Utility functions for floorplan processing
 """
 import json
+import os
+import tempfile
 from pathlib import Path
 from typing import Dict, List
 
@@ -18,5 +20,32 @@ def save_json(data: Dict, file_path: str, indent: int = 2):
     with open(file_path, 'w') as f:
         json.dump(data, f, indent=indent)
 
+def atomic_write_text(text: str, file_path: str):
+    """
+    Write through a unique temp file in the target directory, then rename, so
+    readers never see a partial file and concurrent writers do not collide
+    """
+    output_path = Path(file_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=output_path.parent, prefix=output_path.stem, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def atomic_write_json(data: Dict, file_path: str):
+    atomic_write_text(json.dumps(data), file_path)
+
+def dict_to_floorplan(data: Dict):
+    """
+    Convert a cleaned/optimized JSON dict back to a Floorplan dataclass
+    """
+    from .canonical_schema import Floorplan
+    return Floorplan.from_dict(data)
+
 def project_src_rasterscan_path() -> Path:
-    return Path(__file__).resolve().parents[1] / 'src' / 'rasterscan'
\ No newline at end of file
+    return Path(__file__).resolve().parent
\ No newline at end of file
@@ -1,60 +1,170 @@
+import argparse
 import json
 from pathlib import Path
 
-from helper import load_json
-from cleaner import FloorplanCleaner
-from optimizer import FloorplanOptimizer
-from recognizer import FloorplanRecognizer
+from .helper import load_json, dict_to_floorplan
+from .cleaner import FloorplanCleaner
+from .optimizer import FloorplanOptimizer
+from .recognizer import FloorplanRecognizer
+from .preprocess import ImagePreprocessor
+from .checkpoint import CheckpointStore, content_hash, format_report
+from .fingerprint import FingerprintIndex, plan_polygons
+from .versions import VersionStore
 
-def run_pipeline(input_image_path: str, output_raw_path: str, output_cleaned_path: str, 
-                 output_optimized_path: str):
-    
+def run_pipeline(input_image_path: str, output_raw_path: str, output_cleaned_path: str,
+                 output_optimized_path: str, checkpoint_dir: str = None, force: bool = False,
+                 snap_threshold: float = 5.0, optimizer_action: str = "split_bedroom",
+                 dedup_dir: str = None, clean_workers: int = 1, versions_dir: str = None,
+                 from_version: int = None):
+    """
+    Args:
+        checkpoint_dir: content-addressed checkpoint store; stages whose inputs,
+                        code and parameters are unchanged are reused from it
+        force: recompute every stage even if a checkpoint matches
+        dedup_dir: fingerprint index; a near-duplicate layout (shifted, rescaled,
+                   rotated or mirrored) reuses its cleaned/optimized results.
+                   Not used with from_version
+        clean_workers: processes cleaning spatial tiles of the plan in parallel;
+                       the result is identical to a serial clean
+        versions_dir: delta-encoded version store; the cleaned plan is version 0
+                      and every optimization is stored as a delta against its parent
+        from_version: stored version to optimize instead of the cleaned plan,
+                      which builds optimization chains
+    """
+
+    if from_version is not None and not versions_dir:
+        raise ValueError("from_version needs a versions_dir")
     print("STARTING FLOORPLAN PROCESSING PIPELINE")
+    store = CheckpointStore(checkpoint_dir) if checkpoint_dir else None
+    index = FingerprintIndex(dedup_dir) if dedup_dir else None
+    if index and from_version is not None:
+        # Indexed results are optimizations of the cleaned plan, not of a stored version
+        print("Not using the dedup index: optimizing a stored version")
+        index = None
+    versions = VersionStore(versions_dir) if versions_dir else None
+    params = {'snap_threshold': snap_threshold, 'action': optimizer_action}
+    report = {}
 
     # Task 1: Recognize and load raw data
 
     # Please add the API key to your .env file before running the recognizer
-    # recognizer = FloorplanRecognizer(method="rasterscan")
+    # recognizer = FloorplanRecognizer(method="rasterscan", preprocessor=ImagePreprocessor())
     # raw_data = recognizer.recognize_from_image(input_image_path, output_raw_path)
 
     print("\n[Task 1] Loading recognizer output...")
     raw_data = load_json(output_raw_path)
     print(f"Completed Task 1:\n -> Found {len(raw_data.get('rooms', []))} rooms; {len(raw_data.get('walls', []))} walls; {len(raw_data.get('doors', []))} doors")
-    
-    # Task 2: Clean and post-process
-    print("\n[Task 2] Cleaning and post-processing...")
-    cleaner = FloorplanCleaner(snap_threshold=5.0)
-    cleaned_floorplan = cleaner.clean(raw_data)
-    print(f"Completed Task 2:\n -> Cleaned to {len(cleaned_floorplan.rooms)} rooms")
-   
-    # Save cleaned floorplan
-    with open(output_cleaned_path, 'w') as f:
-        json.dump(cleaned_floorplan.to_dict(), f, indent=2)
-    print(f" -> Saved to: {output_cleaned_path}")
-    
-    # Task 3: Optimize (add bedroom)
-    print("\n[Task3] Optimizing: Adding bedroom...")
-    optimizer = FloorplanOptimizer()
-    # add a bedroom by splitting the biggest room
-    optimized_floorplan = optimizer.split_bedroom(cleaned_floorplan)
-    
-    bedroom_count = sum(1 for r in optimized_floorplan.rooms 
+
+    reused = None
+    if index and not force:
+        reused = index.reuse(plan_polygons(raw_data), params)
+    if reused:
+        source = reused['cleaned']['metadata']['reused_from']
+        print(f"\n[Tasks 2-3] Near-duplicate of {source['plan_id']} (IoU {source['iou']}); reusing its results")
+        cleaned_dict, optimized_dict = reused['cleaned'], reused['optimized']
+        cleaned_floorplan = dict_to_floorplan(cleaned_dict)
+        optimized_floorplan = dict_to_floorplan(optimized_dict)
+        with open(output_cleaned_path, 'w') as f:
+            json.dump(cleaned_dict, f, indent=2)
+    else:
+        # Task 2: Clean and post-process
+        print("\n[Task 2] Cleaning and post-processing...")
+        if clean_workers > 1:
+            from .tiled_cleaner import TiledCleaner  # lazy: scipy is only needed for tiled cleaning
+            cleaner = TiledCleaner(snap_threshold=snap_threshold, workers=clean_workers)
+        else:
+            cleaner = FloorplanCleaner(snap_threshold=snap_threshold)
+
+        def clean():
+            return cleaner.clean(raw_data).to_dict()
+
+        if store:
+            cleaned_dict, report['clean'] = store.run_stage(
+                'clean', raw_data, {'snap_threshold': snap_threshold}, clean, force)
+        else:
+            cleaned_dict = clean()
+        cleaned_floorplan = dict_to_floorplan(cleaned_dict)
+        print(f"Completed Task 2:\n -> Cleaned to {len(cleaned_floorplan.rooms)} rooms")
+
+        # Save cleaned floorplan
+        with open(output_cleaned_path, 'w') as f:
+            json.dump(cleaned_dict, f, indent=2)
+        print(f" -> Saved to: {output_cleaned_path}")
+
+        # Task 3: Optimize (add bedroom)
+        print("\n[Task3] Optimizing: Adding bedroom...")
+        optimizer = FloorplanOptimizer()
+        base_dict = cleaned_dict
+        if versions and from_version is not None:
+            base_dict = versions.materialize(content_hash(raw_data)[:16], from_version)
+            print(f" -> Starting from stored version {from_version}")
+        base_floorplan = dict_to_floorplan(base_dict)
+
+        def optimize():
+            # add a bedroom by splitting the biggest room
+            return getattr(optimizer, optimizer_action)(base_floorplan).to_dict()
+
+        if store:
+            optimized_dict, report['optimize'] = store.run_stage(
+                'optimize', base_dict, {'action': optimizer_action}, optimize, force)
+        else:
+            optimized_dict = optimize()
+        optimized_floorplan = dict_to_floorplan(optimized_dict)
+
+        if index:
+            index.add(content_hash(raw_data)[:16], {'cleaned': cleaned_dict, 'optimized': optimized_dict},
+                      raw_data, params)
+
+    bedroom_count = sum(1 for r in optimized_floorplan.rooms
                        if 'bedroom' in r.room_type.lower())
     print(f"Completed Task 3: \n -> Rooms after optimization: {len(optimized_floorplan.rooms)} \n -> Total bedrooms: {bedroom_count}")
-    
+
     # Save optimized floorplan
     with open(output_optimized_path, 'w') as f:
-        json.dump(optimized_floorplan.to_dict(), f, indent=2)
+        json.dump(optimized_dict, f, indent=2)
     print(f" -> Saved to: {output_optimized_path}")
-    
+
+    if versions:
+        plan_id = content_hash(raw_data)[:16]
+        if not versions.history(plan_id):
+            versions.commit(plan_id, cleaned_dict, action={'action': 'clean'})
+        parent = from_version if from_version is not None else 0
+        version = versions.commit(plan_id, optimized_dict, parent=parent, action={'action': optimizer_action})
+        stats = versions.stats(plan_id)
+        print(f" -> Stored as version {version} of {plan_id} (parent {parent}); "
+              f"{stats['versions']} versions in {stats['stored_bytes']} bytes")
+
+    if report:
+        print("\nCheckpoint report:")
+        print("\n".join(format_report(report)))
+
     print("PIPELINE COMPLETE")
-    
+
     return cleaned_floorplan, optimized_floorplan
 
 
 
 if __name__ == "__main__":
 
+    parser = argparse.ArgumentParser(description="RasterScan floorplan pipeline")
+    parser.add_argument("--force", action="store_true",
+                        help="recompute all stages even if a matching checkpoint exists")
+    parser.add_argument("--checkpoint-dir", default="outputs/rasterscan/.checkpoints",
+                        help="content-addressed checkpoint store ('' to disable)")
+    parser.add_argument("--snap-threshold", type=float, default=5.0)
+    parser.add_argument("--action", default="split_bedroom", help="FloorplanOptimizer method to apply")
+    parser.add_argument("--clean-workers", type=int, default=1,
+                        help="processes cleaning tiles of one large plan in parallel")
+    parser.add_argument("--versions-dir", default="",
+                        help="delta-encoded store of optimization versions (disabled by default)")
+    parser.add_argument("--from-version", type=int, default=None,
+                        help="optimize this stored version instead of the cleaned plan (needs --versions-dir)")
+    parser.add_argument("--dedup-dir", default="",
+                        help="fingerprint index used to reuse results of near-duplicate layouts (disabled by default)")
+    args = parser.parse_args()
+    if args.from_version is not None and not args.versions_dir:
+        parser.error("--from-version needs --versions-dir")
+
     # Create output directory
     output_dir = Path("outputs/rasterscan")
     output_dir.mkdir(exist_ok=True)
@@ -64,5 +174,13 @@ if __name__ == "__main__":
         input_image_path = "floorplan-images/floorplan_raw.png",
         output_raw_path= output_dir / "recognizer_raw.json",
         output_cleaned_path=output_dir / "cleaned_canonical.json",
-        output_optimized_path=output_dir / "optimized.json"
-    )
\ No newline at end of file
+        output_optimized_path=output_dir / "optimized.json",
+        checkpoint_dir=args.checkpoint_dir or None,
+        force=args.force,
+        snap_threshold=args.snap_threshold,
+        optimizer_action=args.action,
+        dedup_dir=args.dedup_dir or None,
+        clean_workers=args.clean_workers,
+        versions_dir=args.versions_dir or None,
+        from_version=args.from_version
+    )
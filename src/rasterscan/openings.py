@@ -0,0 +1,103 @@
+"""
+Doors and windows attached to their host walls. Hosts and positions along
+the wall are computed for all openings at once from an STRtree over the wall
+segments; OpeningIndex then serves per-wall and per-room lookups from dicts
+instead of rescanning geometry
+"""
+from typing import List, Dict, Optional, Tuple, Union
+
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from .canonical_schema import Point2D, Door, Window, Wall, Floorplan
+from .geometry import wall_lines, door_centers
+
+Opening = Union[Door, Window]
+
+
+def attach_to_walls(openings: List[Opening], walls: List[Wall], max_distance: float = 20.0) -> np.ndarray:
+    """
+    Set wall_index and offset of every opening: the host is the nearest wall
+    within max_distance of the opening center (lowest index on ties) and the
+    offset is the distance from the wall start to the projected center.
+    Openings without a host get None. Returns the host indices (-1 for none)
+    """
+    hosts = np.full(len(openings), -1)
+    offsets = np.zeros(len(openings))
+    if openings and walls:
+        lines = wall_lines(walls)
+        centers = shapely.points(door_centers(openings))
+        (opening_idx, wall_idx), _ = STRtree(lines).query_nearest(
+            centers, max_distance=max_distance, return_distance=True, all_matches=True)
+
+        # Equidistant walls are all returned; keep the lowest index per opening
+        order = np.lexsort((wall_idx, opening_idx))
+        opening_idx, wall_idx = opening_idx[order], wall_idx[order]
+        first = np.r_[True, opening_idx[1:] != opening_idx[:-1]] if len(order) else np.empty(0, dtype=bool)
+        hosts[opening_idx[first]] = wall_idx[first]
+
+        hosted = np.flatnonzero(hosts >= 0)
+        offsets[hosted] = shapely.line_locate_point(lines[hosts[hosted]], centers[hosted])
+
+    for opening, host, offset in zip(openings, hosts.tolist(), offsets.tolist()):
+        opening.wall_index = host if host >= 0 else None
+        opening.offset = offset if host >= 0 else None
+    return hosts
+
+
+class OpeningIndex:
+    """
+    Openings of a floorplan by host wall and by room. Built in one pass over
+    the rooms from the wall_index/offset set by attach_to_walls
+    """
+
+    def __init__(self, floorplan: Floorplan, openings: Optional[List[Opening]] = None):
+        """
+        Args:
+            openings: openings to index by wall instead of the rooms' ones, e.g.
+                      every door of the plan including those not assigned to a room
+        """
+        self.by_room: Dict[str, List[Opening]] = {}
+        self.by_wall: Dict[int, List[Tuple[Optional[str], Opening]]] = {}
+        room_of = {}
+        for room in floorplan.rooms:
+            self.by_room[room.id] = room.doors + room.windows
+            room_of.update((id(opening), room.id) for opening in self.by_room[room.id])
+
+        if openings is None:
+            openings = [opening for hosted in self.by_room.values() for opening in hosted]
+        for opening in openings:
+            if opening.wall_index is not None:
+                self.by_wall.setdefault(opening.wall_index, []).append((room_of.get(id(opening)), opening))
+        for hosted in self.by_wall.values():
+            hosted.sort(key=lambda item: item[1].offset)
+
+    def on_wall(self, wall_index: int) -> List[Tuple[Optional[str], Opening]]:
+        """
+        (room id or None, opening) pairs hosted by a wall, ordered along it
+        """
+        return self.by_wall.get(wall_index, [])
+
+    def in_room(self, room_id: str) -> List[Opening]:
+        return self.by_room.get(room_id, [])
+
+    def doors_on_wall(self, wall_index: int) -> List[Door]:
+        return [o for _, o in self.on_wall(wall_index) if isinstance(o, Door)]
+
+    def windows_on_wall(self, wall_index: int) -> List[Window]:
+        return [o for _, o in self.on_wall(wall_index) if isinstance(o, Window)]
+
+
+def wall_position(opening: Opening, walls: List[Wall]) -> Point2D:
+    """
+    Point of the host wall at the opening's offset; the opening center when
+    it has no host
+    """
+    if opening.wall_index is None or opening.wall_index >= len(walls):
+        return opening.get_center()
+    wall = walls[opening.wall_index]
+    length = wall.start.distance_to(wall.end)
+    t = opening.offset / length if length else 0.0
+    return Point2D(wall.start.x + (wall.end.x - wall.start.x) * t,
+                   wall.start.y + (wall.end.y - wall.start.y) * t)
@@ -1,7 +1,10 @@
+import logging
 from typing import List
-from canonical_schema import Point2D, Wall, Room, Door, Floorplan
+from .canonical_schema import Point2D, Wall, Room, Door, Floorplan
 from shapely.geometry import Polygon
 
+logger = logging.getLogger(__name__)
+
 
 class FloorplanOptimizer:
     """
@@ -14,11 +17,16 @@ class FloorplanOptimizer:
         Add a new bedroom to the floorplan by splitting the largest room
         It is a simple way to add a bedroom
         """
+        from .openings import OpeningIndex
+        
         # Find largest room and split it
         largest_room = max(floorplan.rooms, key=lambda r: r.area)
         
         # Split the largest room
         new_rooms = self._split_room(largest_room)
+        if len(new_rooms) > 1:
+            self._redistribute_openings(OpeningIndex(floorplan).in_room(largest_room.id), new_rooms,
+                                        floorplan.walls)
         
         # Replace old room with new rooms
         updated_rooms = [r for r in floorplan.rooms if r.id != largest_room.id]
@@ -39,6 +47,76 @@ class FloorplanOptimizer:
             }
         )
     
+    def add_new_room(self, floorplan: Floorplan, room_type: str = "bedroom",
+                     min_area: float = 10000, max_area: float = None, boundary=None,
+                     require_exterior_wall: bool = True) -> Floorplan:
+        """
+        Add a new room in free space inside the building outline, attached
+        to the existing plan (see placement.RoomPlacer). The plan is returned
+        unchanged, with a warning, when no placement satisfies the constraints
+        """
+        from .placement import RoomPlacer, polygon_vertices
+        
+        placer = RoomPlacer(min_area=min_area, max_area=max_area,
+                            require_exterior_wall=require_exterior_wall)
+        placements = placer.find(floorplan, boundary=boundary)
+        if not placements:
+            logger.warning("add_new_room: no free space for a %g %s", min_area, room_type)
+            return Floorplan(
+                rooms=floorplan.rooms,
+                walls=floorplan.walls,
+                total_area=floorplan.total_area,
+                perimeter=floorplan.perimeter,
+                metadata={**(floorplan.metadata or {}), 'add_room': {'placed': False}}
+            )
+        
+        best = placements[0]
+        new_room = Room(
+            id=f"new_{room_type}_{len(floorplan.rooms) + 1}",
+            room_type=room_type,
+            vertices=polygon_vertices(best['polygon']),
+            area=best['area'],
+            doors=[],
+            windows=[]
+        )
+        updated_rooms = floorplan.rooms + [new_room]
+        
+        return Floorplan(
+            rooms=updated_rooms,
+            walls=floorplan.walls,
+            total_area=sum(r.area for r in updated_rooms),
+            perimeter=floorplan.perimeter,
+            metadata={
+                **(floorplan.metadata or {}),
+                'optimized': True,
+                'action': 'add_room',
+                'add_room': {
+                    'placed': True,
+                    'room_id': new_room.id,
+                    'shared_length': best['shared_length'],
+                    'exterior_length': best['exterior_length'],
+                    'search_ms': best['search_ms']
+                }
+            }
+        )
+    
+    def _redistribute_openings(self, openings: List, parts: List[Room], walls: List[Wall]):
+        """
+        Move the doors and windows of a split room to the nearest of its
+        (rectangular) parts, by their position on the host wall; host walls
+        are unchanged
+        """
+        from .openings import wall_position
+        
+        bounds = [(min(v.x for v in p.vertices), min(v.y for v in p.vertices),
+                   max(v.x for v in p.vertices), max(v.y for v in p.vertices)) for p in parts]
+        for opening in openings:
+            point = wall_position(opening, walls)
+            gaps = [max(b[0] - point.x, 0, point.x - b[2]) ** 2 + max(b[1] - point.y, 0, point.y - b[3]) ** 2
+                    for b in bounds]
+            nearest = parts[gaps.index(min(gaps))]
+            (nearest.doors if isinstance(opening, Door) else nearest.windows).append(opening)
+    
     def _split_room(self, room: Room) -> List[Room]:
         """
         Split a room into two rooms (one becomes new bedroom)
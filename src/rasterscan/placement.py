@@ -0,0 +1,345 @@
+"""
+Free-space search for adding a room: rasterize the plan into an occupancy
+grid, find empty rectangles with summed-area tables and turn the best ones
+back into exact polygons
+"""
+import math
+import time
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+import shapely
+
+from .canonical_schema import Point2D, Floorplan
+from .geometry import room_polygons, exterior_outline
+
+Rect = Tuple[int, int, int, int]  # row, col, height, width in cells
+
+
+class RoomPlacer:
+    """
+    Find placements for a new rectangular room inside the building outline
+    (and property boundary) that do not overlap existing rooms or walls
+    """
+
+    def __init__(self, min_area: float = 10000, max_area: Optional[float] = None,
+                 min_side: Optional[float] = None, grid_cells: int = 256,
+                 require_exterior_wall: bool = True, allow_detached: bool = False):
+        """
+        Args:
+            min_area: smallest acceptable room area (plan units squared)
+            max_area: placements are grown to a maximal free rectangle up to this
+                      area (defaults to 2 * min_area)
+            min_side: shortest acceptable side (defaults to half the side of a
+                      square of min_area); also the minimum shared length for a door
+            grid_cells: cells along the longest side of the boundary
+            require_exterior_wall: at least min_side of the room's perimeter must
+                                   not be shared with existing rooms
+            allow_detached: accept rooms that do not touch the existing plan
+        """
+        self.min_area = min_area
+        self.max_area = max_area or 2 * min_area
+        self.min_side = min_side or 0.5 * math.sqrt(min_area)
+        self.grid_cells = grid_cells
+        self.require_exterior_wall = require_exterior_wall
+        self.allow_detached = allow_detached
+
+    def find(self, floorplan: Floorplan, boundary=None, limit: int = 1) -> List[Dict]:
+        """
+        Best non-overlapping placements, best first. Each has the exact
+        polygon, its area and the shared / exterior perimeter lengths.
+        The boundary defaults to plan_boundary(floorplan)
+        """
+        start = time.perf_counter()
+        boundary = boundary if boundary is not None else plan_boundary(floorplan)
+        if boundary is None or boundary.is_empty:
+            return []
+        grid = OccupancyGrid(floorplan, boundary, self.grid_cells)
+        cell = grid.cell
+
+        min_side = max(math.ceil(self.min_side / cell), 1)
+        min_cells = math.ceil(self.min_area / cell ** 2)
+        max_cells = math.floor(self.max_area / cell ** 2)
+
+        scored = [self._score_shape(grid, h, w, min_side)
+                  for h, w in self._shapes(min_side, min_cells, grid.free.shape)]
+        contact, exposure, rects = (np.concatenate(a) for a in zip(*scored)) if scored else ([], [], [])
+
+        placements = []
+        # Most contact with the existing plan first, then most exterior wall
+        for k in np.lexsort((-np.asarray(exposure), -np.asarray(contact))):
+            rect = tuple(int(v) for v in rects[k])
+            if any(_rects_overlap(rect, p['rect']) for p in placements):
+                continue
+            grown = grid.grow(rect, max_cells)
+            if not any(_rects_overlap(grown, p['rect']) for p in placements):
+                rect = grown
+            polygon = grid.exact_polygon(rect)
+            if polygon is None or polygon.area < self.min_area:
+                continue
+            placements.append({
+                'rect': rect,
+                'polygon': polygon,
+                'area': float(polygon.area),
+                'shared_length': float(contact[k] * cell),
+                'exterior_length': float(exposure[k] * cell)
+            })
+            if len(placements) >= limit:
+                break
+
+        for p in placements:
+            p['search_ms'] = round((time.perf_counter() - start) * 1000, 2)
+            p['cell_size'] = cell
+        return placements
+
+    def _shapes(self, min_side: int, min_cells: int, grid_shape: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """
+        A few (height, width) in cells with area >= min_cells, from square
+        to the most elongated shape that keeps both sides >= min_side
+        """
+        rows, cols = grid_shape
+        longest = max(math.ceil(min_cells / min_side), min_side)
+        sides = np.unique(np.geomspace(min_side, longest, num=6).round().astype(int))
+
+        shapes = set()
+        for side in sides:
+            other = max(math.ceil(min_cells / side), min_side)
+            shapes.update([(side, other), (other, side)])
+        return sorted((h, w) for h, w in shapes if h <= rows and w <= cols)
+
+    def _score_shape(self, grid: 'OccupancyGrid', height: int, width: int,
+                     min_side: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Every free position for one rectangle size with its contact with
+        existing rooms/walls and its exposed (exterior) perimeter, in cells
+        """
+        free = grid.window_sum(grid.blocked_sat, height, width) == 0
+        contact = grid.perimeter_sum(grid.occupied_sums, height, width)
+        exposure = 2 * (height + width) - grid.perimeter_sum(grid.room_sums, height, width)
+
+        feasible = free
+        if not self.allow_detached:
+            feasible = feasible & (contact >= min_side)
+        if self.require_exterior_wall:
+            feasible = feasible & (exposure >= min_side)
+
+        rows, cols = np.nonzero(feasible)
+        rects = np.column_stack([rows, cols, np.full(len(rows), height), np.full(len(rows), width)])
+        return contact[rows, cols], exposure[rows, cols], rects
+
+
+class OccupancyGrid:
+    """
+    Square cells over the boundary's bounding box. Room cells and cells
+    outside the boundary are dilated by one cell so partially covered cells
+    count as occupied; exact_polygon clips a free rectangle to the exact
+    geometry
+    """
+
+    def __init__(self, floorplan: Floorplan, boundary, grid_cells: int = 256):
+        self.boundary = boundary
+        minx, miny, maxx, maxy = boundary.bounds
+        self.cell = max(maxx - minx, maxy - miny) / grid_cells
+        self.origin = (minx, miny)
+        shape = (max(math.ceil((maxy - miny) / self.cell), 1), max(math.ceil((maxx - minx) / self.cell), 1))
+
+        rooms = [r for r in floorplan.rooms if len(r.vertices) >= 3]
+        polygons = room_polygons(rooms)
+        invalid = ~shapely.is_valid(polygons)
+        polygons[invalid] = shapely.make_valid(polygons[invalid])
+        self.polygons = polygons[shapely.area(polygons) > 0]
+
+        self.rooms = _dilate(rasterize(self.polygons, self.origin, self.cell, shape))
+        walls = self._rasterize_walls(floorplan, shape)
+        outside = _dilate(~rasterize(np.array([boundary]), self.origin, self.cell, shape))
+
+        self.occupied = self.rooms | walls
+        self.free = ~(self.occupied | outside)
+        self.blocked_sat = summed_area_table(~self.free)
+        # Running sums along rows and columns, shared by every rectangle size
+        self.occupied_sums = _strip_sums(self.occupied)
+        self.room_sums = _strip_sums(self.rooms)
+
+    def _rasterize_walls(self, floorplan: Floorplan, shape: Tuple[int, int]) -> np.ndarray:
+        """
+        Cells crossed by a wall, sampled at half-cell steps
+        """
+        mask = np.zeros(shape, dtype=bool)
+        if not floorplan.walls:
+            return mask
+
+        ends = np.array([[(w.start.x, w.start.y), (w.end.x, w.end.y)] for w in floorplan.walls], dtype=float)
+        lengths = np.linalg.norm(ends[:, 1] - ends[:, 0], axis=1)
+        steps = np.ceil(lengths / (self.cell / 2)).astype(int) + 1
+        wall = np.repeat(np.arange(len(ends)), steps)
+        fraction = (np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)) / np.repeat(
+            np.maximum(steps - 1, 1), steps)
+        xy = ends[wall, 0] + fraction[:, None] * (ends[wall, 1] - ends[wall, 0])
+
+        cols = np.clip(((xy[:, 0] - self.origin[0]) / self.cell).astype(int), 0, shape[1] - 1)
+        rows = np.clip(((xy[:, 1] - self.origin[1]) / self.cell).astype(int), 0, shape[0] - 1)
+        mask[rows, cols] = True
+        return mask
+
+    @staticmethod
+    def window_sum(sat: np.ndarray, height: int, width: int) -> np.ndarray:
+        """
+        Sum of every height x width window, indexed by its top-left cell
+        """
+        return sat[height:, width:] - sat[:-height, width:] - sat[height:, :-width] + sat[:-height, :-width]
+
+    def perimeter_sum(self, sums: Tuple[np.ndarray, np.ndarray], height: int, width: int) -> np.ndarray:
+        """
+        For every window position, the number of masked cells in the ring
+        of cells just outside the window (cells beyond the grid count as 0)
+        """
+        along_rows, along_cols = sums
+        horizontal = along_rows[:, width:] - along_rows[:, :-width]
+        vertical = along_cols[height:, :] - along_cols[:-height, :]
+        n_rows, n_cols = self.free.shape[0] - height + 1, self.free.shape[1] - width + 1
+
+        top = horizontal[:n_rows, 1:n_cols + 1]
+        bottom = horizontal[height + 1:height + 1 + n_rows, 1:n_cols + 1]
+        left = vertical[1:n_rows + 1, :n_cols]
+        right = vertical[1:n_rows + 1, width + 1:width + 1 + n_cols]
+        return top + bottom + left + right
+
+    def is_free(self, rect: Rect) -> bool:
+        row, col, height, width = rect
+        if row < 0 or col < 0 or row + height > self.free.shape[0] or col + width > self.free.shape[1]:
+            return False
+        sat = self.blocked_sat
+        return sat[row + height, col + width] - sat[row, col + width] - sat[row + height, col] + sat[row, col] == 0
+
+    def grow(self, rect: Rect, max_cells: int) -> Rect:
+        """
+        Extend the rectangle one cell row/column at a time while it stays
+        free and within max_cells (a maximal free rectangle when uncapped)
+        """
+        grown = True
+        while grown:
+            grown = False
+            row, col, height, width = rect
+            for candidate in [(row - 1, col, height + 1, width), (row, col, height + 1, width),
+                              (row, col - 1, height, width + 1), (row, col, height, width + 1)]:
+                if candidate[2] * candidate[3] <= max_cells and self.is_free(candidate):
+                    rect, grown = candidate, True
+                    break
+        return rect
+
+    def exact_polygon(self, rect: Rect):
+        """
+        The rectangle's cells clipped to the boundary and minus any sliver of
+        an existing room, so the room stays inside the building and never
+        overlaps a room
+        """
+        row, col, height, width = rect
+        x0, y0 = self.origin[0] + col * self.cell, self.origin[1] + row * self.cell
+        box = shapely.box(x0, y0, x0 + width * self.cell, y0 + height * self.cell)
+
+        nearby = self.polygons[shapely.intersects(self.polygons, box)]
+        shape = shapely.intersection(box, self.boundary)
+        if len(nearby):
+            shape = shapely.difference(shape, shapely.union_all(nearby))
+
+        parts = [p for p in shapely.get_parts(shape) if p.geom_type == 'Polygon']
+        if not parts:
+            return None
+        polygon = max(parts, key=lambda p: p.area)
+        return shapely.remove_repeated_points(shapely.Polygon(polygon.exterior)).simplify(0)
+
+def plan_boundary(floorplan: Floorplan):
+    """
+    Where a new room may go: the building outline formed by the walls
+    (validator's exterior check), within metadata['property_boundary']
+    (list of {'x', 'y'}) if present. Without walls, the property boundary
+    or the bounding box of the rooms
+    """
+    outline = exterior_outline(floorplan.walls)
+    points = (floorplan.metadata or {}).get('property_boundary')
+    if points:
+        boundary = shapely.Polygon([(p['x'], p['y']) for p in points])
+        return boundary if outline is None else shapely.intersection(outline, boundary)
+    if outline is not None:
+        return outline
+
+    coords = [(v.x, v.y) for r in floorplan.rooms for v in r.vertices]
+    return shapely.box(*shapely.multipoints(coords).bounds) if coords else None
+
+def summed_area_table(mask: np.ndarray) -> np.ndarray:
+    """
+    sat[r, c] = number of True cells above and left of (r, c), with a
+    leading row and column of zeros
+    """
+    sat = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.int32)
+    sat[1:, 1:] = mask.astype(np.int32).cumsum(axis=0).cumsum(axis=1)
+    return sat
+
+
+def polygon_vertices(polygon) -> List[Point2D]:
+    return [Point2D(float(x), float(y)) for x, y in polygon.exterior.coords[:-1]]
+
+
+def rasterize(polygons: np.ndarray, origin: Tuple[float, float], cell: float,
+              shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Cells whose center lies inside any of the polygons (holes respected).
+    Scanline fill for all polygons at once: every edge adds +1/-1 where it
+    crosses a row of cell centers, and a cumulative sum along each row gives
+    the winding number
+    """
+    rows, cols = shape
+    parts = shapely.get_parts(shapely.get_parts(polygons))  # collections from make_valid
+    parts = shapely.orient_polygons(parts[shapely.get_type_id(parts) == 3])
+    rings = shapely.get_rings(parts)
+    coords, ring_index = shapely.get_coordinates(rings, return_index=True)
+
+    # Edges between consecutive vertices of the same ring
+    same_ring = ring_index[:-1] == ring_index[1:]
+    (x0, y0), (x1, y1) = coords[:-1][same_ring].T, coords[1:][same_ring].T
+
+    # Cell-center rows crossed by each edge, half-open in y
+    first = np.clip(np.ceil((np.minimum(y0, y1) - origin[1]) / cell - 0.5), 0, rows).astype(int)
+    last = np.clip(np.ceil((np.maximum(y0, y1) - origin[1]) / cell - 0.5), 0, rows).astype(int)
+    counts = last - first
+
+    edge = np.repeat(np.arange(len(counts)), counts)
+    row = first[edge] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    y = origin[1] + (row + 0.5) * cell
+    x = x0[edge] + (y - y0[edge]) * (x1[edge] - x0[edge]) / (y1[edge] - y0[edge])
+
+    # A crossing affects the centers to its right
+    col = np.clip(np.ceil((x - origin[0]) / cell - 0.5), 0, cols).astype(int)
+    winding = np.zeros((rows, cols + 1), dtype=np.int32)
+    np.add.at(winding, (row, col), np.where(y1[edge] > y0[edge], 1, -1))
+    return np.cumsum(winding, axis=1)[:, :cols] != 0
+
+
+def _strip_sums(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cumulative sums of the mask (padded by one empty cell) along rows and
+    along columns; differences give the sum of any horizontal/vertical strip
+    """
+    padded = np.pad(mask.astype(np.int32), 1)
+    along_rows = np.zeros((padded.shape[0], padded.shape[1] + 1), dtype=np.int32)
+    along_rows[:, 1:] = padded.cumsum(axis=1)
+    along_cols = np.zeros((padded.shape[0] + 1, padded.shape[1]), dtype=np.int32)
+    along_cols[1:, :] = padded.cumsum(axis=0)
+    return along_rows, along_cols
+
+
+def _dilate(mask: np.ndarray) -> np.ndarray:
+    """
+    Grow a mask by one cell in all eight directions
+    """
+    padded = np.pad(mask, 1)
+    rows, cols = mask.shape
+    grown = np.zeros_like(mask)
+    for dr in (0, 1, 2):
+        for dc in (0, 1, 2):
+            grown |= padded[dr:dr + rows, dc:dc + cols]
+    return grown
+
+
+def _rects_overlap(a: Rect, b: Rect) -> bool:
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
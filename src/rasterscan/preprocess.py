@@ -0,0 +1,142 @@
+"""
+Image preprocessing before recognition: shrink the upload while keeping
+track of how to map recognizer coordinates back to the original image
+"""
+import io
+from dataclasses import dataclass, asdict
+from typing import Dict, Tuple
+
+
+@dataclass
+class ImageTransform:
+    """
+    Maps processed-image pixels back to original-image pixels:
+    original = processed / scale + offset
+    """
+    scale: float
+    offset_x: float
+    offset_y: float
+    original_size: Tuple[int, int]
+    processed_size: Tuple[int, int]
+
+    def to_original(self, x: float, y: float) -> Tuple[float, float]:
+        return x / self.scale + self.offset_x, y / self.scale + self.offset_y
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class PreparedImage:
+    image: 'PIL.Image.Image'
+    data: bytes
+    transform: ImageTransform
+
+
+class ImagePreprocessor:
+    """
+    Normalize a floorplan scan: transparency flattened onto white, grayscale,
+    optional posterization or binarization, whitespace crop, downscale to a
+    target resolution and lossless PNG re-compression
+    """
+
+    def __init__(self, max_side: int = 2048, grayscale: bool = True, gray_bits: int = 8,
+                 binarize: bool = False, threshold: int = 200, crop_whitespace: bool = True,
+                 margin: int = 10):
+        """
+        Args:
+            max_side: longest side of the processed image in pixels
+            gray_bits: bits kept per gray pixel; below 8 the image is posterized
+                       (4 = 16 levels), which removes scan/JPEG noise that can make
+                       the PNG larger than the source file but is lossy
+            threshold: gray level above which a pixel counts as background
+            margin: pixels kept around the drawing when cropping whitespace
+        """
+        self.max_side = max_side
+        self.grayscale = grayscale
+        self.gray_bits = gray_bits
+        self.binarize = binarize
+        self.threshold = threshold
+        self.crop_whitespace = crop_whitespace
+        self.margin = margin
+
+    def prepare(self, image_path: str) -> PreparedImage:
+        from PIL import Image, ImageOps
+
+        img = Image.open(image_path)
+        original_size = img.size
+        # Transparent pixels are background, whatever their color channels hold
+        if img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info:
+            rgba = img.convert('RGBA')
+            img = Image.alpha_composite(Image.new('RGBA', rgba.size, (255, 255, 255, 255)), rgba)
+        img = img.convert('L') if self.grayscale or self.binarize else img.convert('RGB')
+
+        # Crop to the drawing's bounding box
+        offset_x, offset_y = 0, 0
+        if self.crop_whitespace:
+            gray = img if img.mode == 'L' else img.convert('L')
+            ink = gray.point(lambda p: 255 if p < self.threshold else 0)
+            bbox = ink.getbbox()
+            if bbox:
+                left = max(bbox[0] - self.margin, 0)
+                top = max(bbox[1] - self.margin, 0)
+                right = min(bbox[2] + self.margin, img.width)
+                bottom = min(bbox[3] + self.margin, img.height)
+                img = img.crop((left, top, right, bottom))
+                offset_x, offset_y = left, top
+
+        # Downscale so the longest side fits max_side
+        scale = 1.0
+        if max(img.size) > self.max_side:
+            scale = self.max_side / max(img.size)
+            new_size = (max(round(img.width * scale), 1), max(round(img.height * scale), 1))
+            img = img.resize(new_size, Image.LANCZOS)
+
+        if self.binarize:
+            img = img.point(lambda p: 255 if p >= self.threshold else 0)
+        elif img.mode == 'L' and self.gray_bits < 8:
+            img = ImageOps.posterize(img, self.gray_bits)
+
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG', optimize=True)
+
+        transform = ImageTransform(
+            scale=scale,
+            offset_x=offset_x,
+            offset_y=offset_y,
+            original_size=original_size,
+            processed_size=img.size
+        )
+        return PreparedImage(image=img, data=buffer.getvalue(), transform=transform)
+
+
+def map_raw_to_original(raw: Dict, transform: ImageTransform) -> Dict:
+    """
+    Map RasterScan raw output (walls, doors, windows, rooms, area,
+    perimeter) from processed-image pixels back to original-image pixels
+    """
+    def point(p):
+        return list(transform.to_original(p[0], p[1]))
+
+    def vertex(v):
+        x, y = transform.to_original(v['x'], v['y'])
+        return {**v, 'x': x, 'y': y}
+
+    mapped = dict(raw)
+    mapped['walls'] = [
+        {**w, 'position': [point(p) for p in w.get('position', [])]}
+        for w in raw.get('walls', [])
+    ]
+    # Doors and windows share the bbox format
+    for key in ('doors', 'windows'):
+        mapped[key] = [
+            {**o, 'bbox': [point(p) for p in o.get('bbox', [])]}
+            for o in raw.get(key, [])
+        ]
+    mapped['rooms'] = [[vertex(v) for v in room] for room in raw.get('rooms', [])]
+    if isinstance(raw.get('area'), (int, float)):
+        mapped['area'] = raw['area'] / transform.scale ** 2
+    if isinstance(raw.get('perimeter'), (int, float)):
+        mapped['perimeter'] = raw['perimeter'] / transform.scale
+    mapped['preprocessing'] = transform.to_dict()
+    return mapped
@@ -1,68 +1,156 @@
 """
 TASK 1: Image -> Raw JSON (with HF/LLM)
 """
-import requests
-import base64
+import io
 import os
+import time
 from typing import List, Dict, Tuple, Optional
-from dotenv import load_dotenv
-from helper import save_json
+from .helper import save_json, load_json
+
+# requests, PIL, shapely, dotenv and the tiling/preprocessing modules are
+# imported where they are used so importing this module stays cheap
+
+
+class RasterScanBackend:
+    """
+    RasterScan raster-to-vector API. Backends take encoded image bytes and
+    return the raw recognition in that image's pixel coordinates
+    """
+    
+    def __init__(self, url: str = 'https://backend.rasterscan.com/raster-to-vector-raw',
+                 api_key: Optional[str] = None):
+        from dotenv import load_dotenv
+        load_dotenv()
+        
+        self.url = url
+        self.api_key = api_key or os.getenv("RASTER_API_KEY")
+    
+    def recognize(self, image_data: bytes, box: Optional[Tuple[int, int, int, int]] = None) -> Dict:
+        """
+        This code was adapted from the following publicly available source: 
+        https://www.rasterscan.com/#demo
+        """
+        import requests
+        
+        response = requests.post(
+            self.url,
+            files={'image': ('floorplan.png', image_data, 'image/png')},
+            headers={"x-api-key": self.api_key}
+        )
+        return response.json()
+
+
+class ReplayBackend:
+    """
+    Local stub backend: replays a saved raw recognition of the whole image,
+    clipped to the requested tile box. Useful to test tiling without the API
+    """
+    
+    def __init__(self, raw, delay: float = 0.0):
+        """
+        Args:
+            raw: raw recognition dict or path to its JSON
+            delay: seconds each call waits, to mimic API latency
+        """
+        self.raw = load_json(raw) if isinstance(raw, str) else raw
+        self.delay = delay
+    
+    def recognize(self, image_data: bytes, box: Optional[Tuple[int, int, int, int]] = None) -> Dict:
+        if self.delay:
+            time.sleep(self.delay)
+        if box is None:
+            return self.raw
+        import shapely
+        left, top, right, bottom = box
+        
+        walls = []
+        for w in self.raw.get('walls', []):
+            line = shapely.clip_by_rect(shapely.LineString(w['position'][:2]), left, top, right, bottom)
+            if not line.is_empty and line.geom_type == 'LineString':
+                walls.append({'position': [[x - left, y - top] for x, y in line.coords[:2]]})
+        
+        # Doors and windows share the bbox format
+        openings = {}
+        for key in ('doors', 'windows'):
+            openings[key] = []
+            for o in self.raw.get(key, []):
+                clipped = shapely.clip_by_rect(shapely.Polygon(o['bbox'][:4]), left, top, right, bottom)
+                if clipped.geom_type == 'Polygon' and not clipped.is_empty:
+                    openings[key].append({'bbox': [[x - left, y - top] for x, y in clipped.exterior.coords[:4]]})
+        
+        rooms = []
+        for room in self.raw.get('rooms', []):
+            if len(room) < 3:
+                continue
+            poly = shapely.make_valid(shapely.Polygon([(v['x'], v['y']) for v in room]))
+            for part in shapely.get_parts(shapely.clip_by_rect(poly, left, top, right, bottom)):
+                if part.geom_type == 'Polygon' and part.area > 0:
+                    rooms.append([{'x': x - left, 'y': y - top} for x, y in part.exterior.coords[:-1]])
+        
+        return {'walls': walls, 'doors': openings['doors'], 'windows': openings['windows'], 'rooms': rooms}
 
-load_dotenv()
 
 class FloorplanRecognizer:
 
-    def __init__(self, method: str = "hf"):
+    def __init__(self, method: str = "hf", preprocessor: Optional['ImagePreprocessor'] = None,
+                 backend=None, tile_size: Optional[int] = None, tile_overlap: int = 128,
+                 max_workers: int = 4):
         """
         Args:
             method: 'rasterscan' for RasterScan API, 'llm' for multimodal LLM
+            preprocessor: shrinks the image before upload; outputs are mapped
+                          back to original pixel coordinates
+            backend: recognizer backend (defaults to RasterScanBackend), e.g. ReplayBackend locally
+            tile_size: images larger than this are recognized in overlapping tiles
+            tile_overlap: pixels shared by neighbouring tiles
+            max_workers: tiles recognized concurrently
         """
         self.method = method
+        self.preprocessor = preprocessor
+        self.backend = backend
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.max_workers = max_workers
         
     def recognize_from_image(self, image_path: str, out_path: str) -> Dict:
-        if self.method == "rasterscan":
+        if self.method == "rasterscan" or self.backend is not None:
             return self._recognize_rasterscan(image_path, out_path)
         elif self.method == "llm":
             return self._recognize_llm(image_path, out_path)
     
     def _recognize_rasterscan(self, image_path: str, out_path: str) -> Dict:
         """
-        This code was adapted from the following publicly available source: 
-        https://www.rasterscan.com/#demo
+        Recognize with the backend, in tiles when the image exceeds tile_size
         """
-
-        # Convert image to base64
-        def image_to_base64(image_path):
+        from PIL import Image
+        from .preprocess import map_raw_to_original
+        from .tiling import TiledRecognizer
+        
+        backend = self.backend or RasterScanBackend()
+        
+        # Single upload of the original or preprocessed image
+        prepared = self.preprocessor.prepare(image_path) if self.preprocessor else None
+        if prepared:
+            image_data, image = prepared.data, prepared.image
+        else:
             with open(image_path, 'rb') as f:
-                return base64.b64encode(f.read()).decode('utf-8')
-
-        # Raster to Vector Base64
-        image_base64 = image_to_base64(image_path)
-
-        url = "https://backend.rasterscan.com/raster-to-vector-base64"
-        payload = {"image": image_base64}
-        headers = {
-            "x-api-key": os.getenv("RASTER_API_KEY"),
-            "Content-Type": "application/json"
-        }
-
-        response = requests.post(url, json=payload, headers=headers)
-
-        # Raster to Vector Raw
-        with open(image_path, 'rb') as f:
-            files = {'image': f}
-            headers = {
-                "x-api-key": os.getenv("RASTER_API_KEY")
-            }
-            response = requests.post(
-                'https://backend.rasterscan.com/raster-to-vector-raw',
-                files=files,
-                headers=headers
-            )
+                image_data = f.read()
+            image = Image.open(io.BytesIO(image_data))
+        
+        if self.tile_size and max(image.size) > self.tile_size:
+            tiler = TiledRecognizer(backend, tile_size=self.tile_size, overlap=self.tile_overlap,
+                                    max_workers=self.max_workers)
+            raw = tiler.recognize(image)
+        else:
+            raw = backend.recognize(image_data)
+        
+        # Map coordinates back to the original image pixels
+        if prepared:
+            raw = map_raw_to_original(raw, prepared.transform)
 
         # Save raw output
-        save_json(response.json(), out_path)
-        return response.json()
+        save_json(raw, out_path)
+        return raw
             
     def _recognize_llm(self, image_path: str) -> Dict:
         """
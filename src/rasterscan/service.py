@@ -0,0 +1,295 @@
+"""
+Long-lived local pipeline service: HTTP endpoints for recognize/clean/optimize
+backed by a pre-warmed worker pool, with micro-batching of concurrent requests
+
+    python -m src.rasterscan.service --port 8765 --workers 4
+
+    POST /clean     {"raw": {...}, "snap_threshold": 5.0}
+    POST /optimize  {"floorplan": {...cleaned JSON...}, "action": "split_bedroom"}
+    POST /recognize {"image_base64": "..."}
+    GET  /health
+
+With --replay, POST /raster-to-vector-raw (multipart "image" field) mimics
+the RasterScan API, so it can stand in for it as a local fake endpoint. Its
+responses are the saved recognition of the original image whatever was
+uploaded, so clients should upload the image without preprocessing
+"""
+import argparse
+import base64
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# Per-process state, created once by _warm_worker
+_cleaners = {}
+_optimizer = None
+_backend = None
+
+
+def _warm_worker(replay_raw_path: Optional[str] = None, replay_delay: float = 0.0):
+    """
+    Import the heavy dependencies and run a tiny clean/optimize once so the
+    first real request does not pay for it
+    """
+    global _optimizer, _backend
+    from .cleaner import FloorplanCleaner
+    from .optimizer import FloorplanOptimizer
+    from .recognizer import RasterScanBackend, ReplayBackend
+
+    _optimizer = FloorplanOptimizer()
+    _backend = ReplayBackend(replay_raw_path, delay=replay_delay) if replay_raw_path else RasterScanBackend()
+
+    square = [{'x': 0, 'y': 0}, {'x': 100, 'y': 0}, {'x': 100, 'y': 100}, {'x': 0, 'y': 100}]
+    warm = FloorplanCleaner().clean({'rooms': [square], 'walls': [{'position': [[0, 0], [100, 0]]}]})
+    _optimizer.split_bedroom(warm)
+
+
+def _clean(payload: Dict) -> Dict:
+    from .cleaner import FloorplanCleaner
+    snap_threshold = payload.get('snap_threshold', 5.0)
+    if snap_threshold not in _cleaners:
+        _cleaners[snap_threshold] = FloorplanCleaner(snap_threshold=snap_threshold)
+    return _cleaners[snap_threshold].clean(payload['raw']).to_dict()
+
+
+def _optimize(payload: Dict) -> Dict:
+    from .helper import dict_to_floorplan
+    action = payload.get('action', 'split_bedroom')
+    if action.startswith('_') or not hasattr(_optimizer, action):
+        raise ValueError(f"Unknown optimizer action: {action}")
+    return getattr(_optimizer, action)(dict_to_floorplan(payload['floorplan'])).to_dict()
+
+
+def _recognize(payload: Dict) -> Dict:
+    image_data = payload['image'] if 'image' in payload else base64.b64decode(payload['image_base64'])
+    return _backend.recognize(image_data)
+
+
+STAGES = {
+    'clean': _clean,
+    'optimize': _optimize,
+    'recognize': _recognize
+}
+
+# Payload fields each stage needs; a tuple lists alternatives
+REQUIRED_FIELDS = {
+    'clean': ['raw'],
+    'optimize': ['floorplan'],
+    'recognize': [('image_base64', 'image')]
+}
+
+
+def _missing_fields(stage: str, payload) -> Optional[str]:
+    """
+    Client error message when the payload lacks a field the stage needs
+    """
+    if not isinstance(payload, dict):
+        return "Expected a JSON object"
+    for field in REQUIRED_FIELDS[stage]:
+        options = field if isinstance(field, tuple) else (field,)
+        if not any(name in payload for name in options):
+            return "Missing field " + " or ".join(repr(name) for name in options)
+    return None
+
+# RasterScan-compatible route, answered by the recognize stage
+RASTERSCAN_PATH = '/raster-to-vector-raw'
+
+
+def _multipart_field(content_type: str, body: bytes, name: str) -> Optional[bytes]:
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode('utf-8') + body)
+    if not message.is_multipart():
+        return None
+    for part in message.iter_parts():
+        if part.get_param('name', header='content-disposition') == name:
+            return part.get_payload(decode=True)
+    return None
+
+
+def _run_batch(stage: str, payloads: List[Dict]) -> List[Dict]:
+    """
+    Runs in a worker process: one task per batch instead of per request.
+    Errors are returned per item so one bad request does not fail the batch;
+    a missing payload field is a client error (status 400), anything raised
+    by the stage itself a server error
+    """
+    results = []
+    for payload in payloads:
+        missing = _missing_fields(stage, payload)
+        if missing:
+            results.append({'error': missing, 'status': 400})
+            continue
+        try:
+            results.append({'result': STAGES[stage](payload)})
+        except Exception as e:
+            results.append({'error': f"{type(e).__name__}: {e}"})
+    return results
+
+
+class MicroBatcher:
+    """
+    Collect requests for one stage for at most max_wait_ms (or until
+    max_batch are queued) and split them evenly into one task per worker
+    """
+
+    def __init__(self, stage: str, pool: ProcessPoolExecutor, max_batch: int = 16,
+                 max_wait_ms: float = 5.0, workers: int = 1):
+        self.stage = stage
+        self.pool = pool
+        self.max_batch = max_batch
+        self.workers = workers
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, payload: Dict) -> Future:
+        future = Future()
+        self.requests.put((payload, future))
+        return future
+
+    def _loop(self):
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            size = -(-len(batch) // self.workers)
+            for start in range(0, len(batch), size):
+                self._dispatch(batch[start:start + size])
+
+    def _dispatch(self, batch: List):
+        payloads = [payload for payload, _ in batch]
+        futures = [future for _, future in batch]
+        try:
+            task = self.pool.submit(_run_batch, self.stage, payloads)
+        except Exception as e:
+            # e.g. a broken or shut down pool: answer now instead of leaving callers waiting
+            for future in futures:
+                future.set_result({'error': f"Worker pool unavailable: {e}"})
+            return
+        task.add_done_callback(lambda t, futures=futures: self._resolve(t, futures))
+
+    def _resolve(self, task: Future, futures: List[Future]):
+        if task.exception():
+            for future in futures:
+                future.set_result({'error': f"Worker failed: {task.exception()}"})
+            return
+        for future, result in zip(futures, task.result()):
+            future.set_result({**result, 'batch_size': len(futures)})
+
+
+class PipelineService:
+
+    def __init__(self, workers: int = 4, max_batch: int = 16, max_wait_ms: float = 5.0,
+                 replay_raw_path: Optional[str] = None, replay_delay: float = 0.0):
+        """
+        Args:
+            workers: worker processes kept warm for the service lifetime
+            max_batch: max requests collected per batch; a batch is split across workers
+            max_wait_ms: how long a batch waits for more requests
+            replay_raw_path: serve /recognize from a saved raw JSON (local stub)
+            replay_delay: seconds each replayed recognition takes, to mimic API latency
+        """
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker,
+                                        initargs=(replay_raw_path, replay_delay))
+        # Start every worker now rather than on the first request
+        for _ in range(workers):
+            self.pool.submit(_run_batch, 'clean', [])
+        self.batchers = {stage: MicroBatcher(stage, self.pool, max_batch, max_wait_ms, workers)
+                         for stage in STAGES}
+
+    def handle(self, stage: str, payload: Dict) -> Dict:
+        start = time.perf_counter()
+        response = self.batchers[stage].submit(payload).result()
+        response['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        return response
+
+    def serve(self, host: str = '127.0.0.1', port: int = 8765):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path == '/health':
+                    self._send(200, {'status': 'ok', 'stages': list(STAGES)})
+                else:
+                    self._send(404, {'error': f"Unknown path {self.path}"})
+
+            def do_POST(self):
+                if self.path == RASTERSCAN_PATH:
+                    self._rasterscan()
+                    return
+                stage = self.path.strip('/')
+                if stage not in STAGES:
+                    self._send(404, {'error': f"Unknown stage {stage}"})
+                    return
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    payload = json.loads(self.rfile.read(length))
+                except (ValueError, json.JSONDecodeError) as e:
+                    self._send(400, {'error': f"Invalid JSON body: {e}"})
+                    return
+                response = service.handle(stage, payload)
+                self._send(response.pop('status', 500) if 'error' in response else 200, response)
+
+            def _rasterscan(self):
+                length = int(self.headers.get('Content-Length', 0))
+                image_data = _multipart_field(self.headers.get('Content-Type', ''),
+                                              self.rfile.read(length), 'image')
+                if not image_data:
+                    self._send(400, {'error': "Expected a multipart 'image' field"})
+                    return
+                response = service.handle('recognize', {'image': image_data})
+                if 'error' in response:
+                    self._send(response.pop('status', 500), response)
+                else:
+                    self._send(200, response['result'])
+
+            def _send(self, status: int, body: Dict):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        print(f"Floorplan pipeline service listening on http://{host}:{port}")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            self.pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local floorplan pipeline service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--replay", default=None,
+                        help="raw recognizer JSON served by /recognize instead of the RasterScan API")
+    parser.add_argument("--replay-delay", type=float, default=0.0,
+                        help="seconds each replayed recognition waits, to mimic API latency")
+    args = parser.parse_args()
+
+    PipelineService(args.workers, args.max_batch, args.max_wait_ms, args.replay,
+                    args.replay_delay).serve(args.host, args.port)
@@ -0,0 +1,322 @@
+"""
+Streaming ingest: watch an input directory (or read image paths from a
+manifest stream) and push every image through recognize -> clean -> optimize.
+Stages are connected by bounded queues, so a slow stage blocks the ones
+before it instead of letting work pile up in memory
+
+    python -m src.rasterscan.stream --watch incoming/ --output-dir outputs/stream
+    find scans -name '*.png' | python -m src.rasterscan.stream --manifest -
+"""
+import argparse
+import hashlib
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from .helper import save_json, dict_to_floorplan
+from .cleaner import FloorplanCleaner
+from .optimizer import FloorplanOptimizer
+from .recognizer import FloorplanRecognizer, ReplayBackend
+from .preprocess import ImagePreprocessor
+from .checkpoint import CheckpointStore, content_hash
+from .fingerprint import FingerprintIndex, plan_polygons
+
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp')
+
+_STOP = object()
+_print_lock = threading.Lock()
+
+
+def _log(message: str):
+    # print() writes the text and the newline separately; keep worker lines whole
+    with _print_lock:
+        print(message, flush=True)
+
+
+class Stage:
+    """
+    A pool of worker threads reading items from inbox, applying fn and
+    passing the result to outbox. Items that raise are counted and dropped
+    """
+
+    def __init__(self, name: str, fn: Callable[[Dict], Dict], workers: int,
+                 inbox: queue.Queue, outbox: Optional[queue.Queue]):
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.done = 0
+        self.errors = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self._loop, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _loop(self):
+        while True:
+            item = self.inbox.get()
+            if item is _STOP:
+                return
+            start = time.perf_counter()
+            try:
+                result = self.fn(item)
+            except Exception as e:
+                _log(f"[{self.name}] {item['id']}: {type(e).__name__}: {e}")
+                with self._lock:
+                    self.errors += 1
+                    self.busy += time.perf_counter() - start
+                continue
+            with self._lock:
+                self.done += 1
+                self.busy += time.perf_counter() - start
+            if self.outbox is not None:
+                # Blocks while the next stage is saturated (back-pressure)
+                self.outbox.put(result)
+
+    def stop(self):
+        """
+        Let the workers drain the inbox, then wait for them to exit
+        """
+        for _ in self.threads:
+            self.inbox.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+
+
+class StreamingPipeline:
+    """
+    recognize -> clean -> optimize over a stream of image paths. Outputs are
+    written per image to <output_dir>/<image path relative to input_root>/,
+    so images of the same name in different folders do not collide. Images
+    outside input_root use their file name and a hash of the full path
+    """
+
+    def __init__(self, output_dir: str, recognizer: FloorplanRecognizer,
+                 workers: Optional[Dict[str, int]] = None, queue_size: int = 8,
+                 snap_threshold: float = 5.0, optimizer_action: str = 'split_bedroom',
+                 checkpoint_dir: Optional[str] = None, dedup_dir: Optional[str] = None,
+                 input_root: Optional[str] = None):
+        """
+        Args:
+            workers: worker threads per stage ('recognize', 'clean', 'optimize')
+            queue_size: max items waiting in front of each stage
+            checkpoint_dir: reuse clean/optimize outputs for unchanged inputs
+            dedup_dir: fingerprint index; near-duplicate layouts skip clean/optimize
+            input_root: directory the output folders mirror (default: working directory)
+        """
+        workers = {'recognize': 4, 'clean': 2, 'optimize': 2, **(workers or {})}
+        self.output_dir = Path(output_dir)
+        self.input_root = Path(input_root or '.').resolve()
+        self.recognizer = recognizer
+        self.cleaner = FloorplanCleaner(snap_threshold=snap_threshold)
+        self.optimizer = FloorplanOptimizer()
+        self.snap_threshold = snap_threshold
+        self.optimizer_action = optimizer_action
+        self.store = CheckpointStore(checkpoint_dir) if checkpoint_dir else None
+        self.index = FingerprintIndex(dedup_dir) if dedup_dir else None
+        self.params = {'snap_threshold': snap_threshold, 'action': optimizer_action}
+
+        queues = [queue.Queue(maxsize=queue_size) for _ in range(3)]
+        self.stages = [
+            Stage('recognize', self._recognize, workers['recognize'], queues[0], queues[1]),
+            Stage('clean', self._clean, workers['clean'], queues[1], queues[2]),
+            Stage('optimize', self._optimize, workers['optimize'], queues[2], None)
+        ]
+        self.started = time.perf_counter()
+
+    def submit(self, image_path: str):
+        """
+        Queue an image; blocks while the recognize stage is saturated
+        """
+        path = Path(image_path)
+        self.stages[0].inbox.put({'id': self._output_key(path), 'image_path': str(path)})
+
+    def _output_key(self, path: Path) -> str:
+        full = path.resolve()
+        try:
+            return full.relative_to(self.input_root).as_posix()
+        except ValueError:
+            return f"{path.name}-{hashlib.sha256(str(full).encode('utf-8')).hexdigest()[:8]}"
+
+    def close(self):
+        """
+        Finish everything submitted so far, stage by stage
+        """
+        for stage in self.stages:
+            stage.stop()
+
+    def _run_stage(self, stage: str, input_data: Dict, params: Dict, compute: Callable[[], Dict]) -> Dict:
+        if self.store is None:
+            return compute()
+        return self.store.run_stage(stage, input_data, params, compute)[0]
+
+    def _recognize(self, item: Dict) -> Dict:
+        out_path = self.output_dir / item['id'] / 'recognizer_raw.json'
+        item['raw'] = self.recognizer.recognize_from_image(item['image_path'], str(out_path))
+        return item
+
+    def _clean(self, item: Dict) -> Dict:
+        raw = item.pop('raw')
+        reused = self.index.reuse(plan_polygons(raw), self.params) if self.index else None
+        if reused:
+            item['cleaned'], item['optimized'] = reused['cleaned'], reused['optimized']
+        else:
+            item['reference'] = {'rooms': raw.get('rooms', [])}
+            item['cleaned'] = self._run_stage(
+                'clean', raw, {'snap_threshold': self.snap_threshold},
+                lambda: self.cleaner.clean(raw).to_dict())
+        save_json(item['cleaned'], str(self.output_dir / item['id'] / 'cleaned_canonical.json'))
+        return item
+
+    def _optimize(self, item: Dict) -> Dict:
+        cleaned = item.pop('cleaned')
+        optimized = item.pop('optimized', None)
+        if optimized is None:
+            optimized = self._run_stage(
+                'optimize', cleaned, {'action': self.optimizer_action},
+                lambda: getattr(self.optimizer, self.optimizer_action)(dict_to_floorplan(cleaned)).to_dict())
+            if self.index:
+                reference = item.pop('reference')
+                self.index.add(content_hash(reference)[:16], {'cleaned': cleaned, 'optimized': optimized},
+                               reference, self.params)
+        out_path = self.output_dir / item['id'] / 'optimized.json'
+        save_json(optimized, str(out_path))
+        reused = optimized.get('metadata', {}).get('reused_from')
+        note = f" (reused {reused['plan_id']})" if reused else ""
+        _log(f" -> {item['id']}: {len(optimized.get('rooms', []))} rooms{note} -> {out_path}")
+        return item
+
+    def stats(self) -> List[Dict]:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return [
+            {
+                'stage': stage.name,
+                'done': stage.done,
+                'errors': stage.errors,
+                'queued': stage.inbox.qsize(),
+                'per_second': stage.done / elapsed,
+                'utilization': stage.busy / (elapsed * len(stage.threads))
+            }
+            for stage in self.stages
+        ]
+
+
+def format_stats(stats: List[Dict]) -> str:
+    return " | ".join(
+        f"{s['stage']}: {s['done']} done, {s['errors']} failed, {s['queued']} queued, "
+        f"{s['per_second']:.2f}/s, {s['utilization']:.0%} busy"
+        for s in stats
+    )
+
+
+def watch_directory(input_dir: str, poll_interval: float = 1.0, once: bool = False) -> Iterator[str]:
+    """
+    Yield image files as they appear in input_dir. A file is yielded once
+    its size is unchanged between two polls (i.e. it is no longer being written)
+    """
+    seen = set()
+    sizes = {}
+    while True:
+        for path in sorted(Path(input_dir).iterdir()):
+            if path in seen or path.suffix.lower() not in IMAGE_SUFFIXES:
+                continue
+            size = path.stat().st_size
+            if once or sizes.get(path) == size:
+                seen.add(path)
+                yield str(path)
+            else:
+                sizes[path] = size
+        if once:
+            return
+        time.sleep(poll_interval)
+
+
+def read_manifest(stream: TextIO) -> Iterator[str]:
+    """
+    Yield one image path per non-empty line, as the lines arrive
+    """
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def run_stream(pipeline: StreamingPipeline, source: Iterable[str], stats_interval: float = 5.0):
+    stopped = threading.Event()
+
+    def report():
+        while not stopped.wait(stats_interval):
+            _log(f"[stats] {format_stats(pipeline.stats())}")
+
+    threading.Thread(target=report, daemon=True).start()
+    try:
+        for image_path in source:
+            pipeline.submit(image_path)
+    except KeyboardInterrupt:
+        print("Stopping: finishing images already submitted...")
+    finally:
+        pipeline.close()
+        stopped.set()
+    print(f"[stats] {format_stats(pipeline.stats())}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming floorplan ingest")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--watch", help="directory to watch for new images")
+    source.add_argument("--manifest", help="file with one image path per line ('-' for stdin)")
+    parser.add_argument("--once", action="store_true", help="process the files already in --watch and exit")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--output-dir", default="outputs/stream")
+    parser.add_argument("--input-root", default=None,
+                        help="output folders mirror image paths relative to this directory "
+                             "(default: the --watch directory, or the working directory)")
+    parser.add_argument("--recognize-workers", type=int, default=4)
+    parser.add_argument("--clean-workers", type=int, default=2)
+    parser.add_argument("--optimize-workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=8, help="max items waiting in front of each stage")
+    parser.add_argument("--stats-interval", type=float, default=5.0)
+    parser.add_argument("--snap-threshold", type=float, default=5.0)
+    parser.add_argument("--action", default="split_bedroom", help="FloorplanOptimizer method to apply")
+    parser.add_argument("--checkpoint-dir", default="", help="content-addressed checkpoint store (disabled by default)")
+    parser.add_argument("--dedup-dir", default="",
+                        help="fingerprint index used to reuse results of near-duplicate layouts (disabled by default)")
+    parser.add_argument("--replay", default=None,
+                        help="raw recognizer JSON returned for every image instead of calling the RasterScan API")
+    args = parser.parse_args()
+
+    # A replayed recognition is already in original pixels, so it is not preprocessed
+    recognizer = FloorplanRecognizer(
+        method="rasterscan",
+        preprocessor=None if args.replay else ImagePreprocessor(),
+        backend=ReplayBackend(args.replay) if args.replay else None
+    )
+    pipeline = StreamingPipeline(
+        args.output_dir, recognizer,
+        workers={
+            'recognize': args.recognize_workers,
+            'clean': args.clean_workers,
+            'optimize': args.optimize_workers
+        },
+        queue_size=args.queue_size,
+        snap_threshold=args.snap_threshold,
+        optimizer_action=args.action,
+        checkpoint_dir=args.checkpoint_dir or None,
+        dedup_dir=args.dedup_dir or None,
+        input_root=args.input_root or args.watch
+    )
+
+    if args.watch:
+        paths = watch_directory(args.watch, args.poll_interval, args.once)
+    elif args.manifest == '-':
+        paths = read_manifest(sys.stdin)
+    else:
+        paths = read_manifest(open(args.manifest, 'r'))
+    run_stream(pipeline, paths, args.stats_interval)
@@ -0,0 +1,208 @@
+"""
+Tile-parallel cleaning of a single very large floorplan: walls, rooms and
+doors are partitioned into spatial tiles that are cleaned on a process pool
+and merged into exactly the floorplan FloorplanCleaner.clean would return
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+import shapely
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from .canonical_schema import Point2D, Wall, Floorplan
+from .cleaner import FloorplanCleaner
+from .geometry import door_centers
+
+
+class TiledCleaner(FloorplanCleaner):
+    """
+    FloorplanCleaner that splits one plan into tiles and cleans them in
+    parallel. Elements near a tile edge are handled so the result is
+    identical to a serial clean:
+
+    - endpoint snapping depends on the order of the snaps, so endpoints are
+      grouped into clusters that can never reach each other (a snapped point
+      stays inside the bounding box of its cluster); each cluster is snapped
+      serially, in endpoint order, by the tile owning its first endpoint
+    - doors and windows are matched against every room within
+      door_distance of the tile's openings (the halo), in the original room order
+    - rooms are owned by the tile of their first vertex; results are merged
+      back in room and opening order, attached to walls and validated once
+    """
+
+    def __init__(self, snap_threshold: float = 5.0, validate: bool = True,
+                 workers: Optional[int] = None, tile_size: Optional[float] = None):
+        """
+        Args:
+            workers: worker processes (defaults to the CPU count); 1 cleans in-process
+            tile_size: tile side in plan units; by default the plan is cut into
+                       about 4 tiles per worker
+        """
+        super().__init__(snap_threshold=snap_threshold, validate=validate)
+        self.workers = workers or os.cpu_count() or 1
+        self.tile_size = tile_size
+
+    def clean(self, raw_data: Dict) -> Floorplan:
+        walls = self._extract_walls(raw_data.get('walls', []))
+        doors = self._extract_doors(raw_data.get('doors', []))
+        windows = self._extract_windows(raw_data.get('windows', []))
+        openings = doors + windows
+        room_data = raw_data.get('rooms', [])
+        room_index = [i for i, r in enumerate(room_data) if r and len(r) >= 3]
+
+        points = [p for w in walls for p in (w.start, w.end)]
+        point_coords = np.array([(p.x, p.y) for p in points], dtype=float).reshape(-1, 2)
+        groups = snap_groups(point_coords, self.snap_threshold)
+        first_vertices = np.array([(room_data[i][0]['x'], room_data[i][0]['y']) for i in room_index],
+                                  dtype=float).reshape(-1, 2)
+        room_boxes = raw_room_bounds([room_data[i] for i in room_index])
+        centers = door_centers(openings).reshape(-1, 2) if openings else np.empty((0, 2))
+
+        # Every element belongs to the tile containing its anchor point
+        anchors = [point_coords[[g[0] for g in groups]].reshape(-1, 2), first_vertices, centers]
+        tile_of = self._tile_function(np.concatenate(anchors))
+        group_tile, room_tile, opening_tile = (tile_of(a) for a in anchors)
+
+        tasks = []
+        for tile in np.unique(np.concatenate([group_tile, room_tile, opening_tile])):
+            tile_groups = [groups[g] for g in np.flatnonzero(group_tile == tile)]
+            tile_openings = np.flatnonzero(opening_tile == tile)
+            owned = np.flatnonzero(room_tile == tile)
+            halo = np.empty(0, dtype=int)
+            if len(tile_openings):
+                reach = self.door_distance * (1 + 1e-9) + 1e-9
+                low = centers[tile_openings].min(axis=0) - reach
+                high = centers[tile_openings].max(axis=0) + reach
+                halo = np.flatnonzero(np.all(room_boxes[:, :2] <= high, axis=1) &
+                                      np.all(room_boxes[:, 2:] >= low, axis=1))
+            tasks.append((
+                self.snap_threshold,
+                self.door_distance,
+                [(g.tolist(), [(points[j].x, points[j].y) for j in g]) for g in tile_groups],
+                [(room_index[r], room_data[room_index[r]]) for r in np.union1d(owned, halo)],
+                {f"room_{room_index[r]}" for r in owned},
+                [(int(k), openings[k]) for k in tile_openings]
+            ))
+
+        if self.workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(_clean_tile, tasks))
+        else:
+            results = [_clean_tile(task) for task in tasks]
+
+        # Merge in the serial order: endpoints by index, rooms by raw index, openings in order
+        rooms = []
+        opening_rooms = {}
+        for snapped, tile_rooms, assigned in results:
+            for indices, group in snapped:
+                for j, p in zip(indices, group):
+                    points[j] = p
+            rooms.extend(tile_rooms)
+            opening_rooms.update(assigned)
+        rooms.sort(key=lambda r: int(r.id[len('room_'):]))
+
+        walls = [Wall(points[i], points[i + 1]) for i in range(0, len(points) - 1, 2)]
+        by_id = {r.id: r for r in rooms}
+        for k, opening in enumerate(openings):
+            if opening_rooms.get(k):
+                room = by_id[opening_rooms[k]]
+                (room.doors if k < len(doors) else room.windows).append(opening)
+
+        return self._assemble(raw_data, rooms, walls, doors, windows)
+
+    def _tile_function(self, coords: np.ndarray):
+        """
+        Map points to the index of their tile in a grid over coords
+        """
+        if not len(coords):
+            return lambda xy: np.zeros(len(xy), dtype=int)
+        low = coords.min(axis=0)
+        extent = np.maximum(coords.max(axis=0) - low, 1e-9)
+        if self.tile_size:
+            counts = np.ceil(extent / self.tile_size).astype(int)
+        else:
+            counts = np.full(2, math.ceil(math.sqrt(4 * self.workers)))
+        counts = np.maximum(counts, 1)
+
+        def tile_of(xy: np.ndarray) -> np.ndarray:
+            cell = np.clip(((xy - low) / extent * counts).astype(int), 0, counts - 1)
+            return cell[:, 1] * counts[0] + cell[:, 0]
+        return tile_of
+
+
+def snap_groups(coords: np.ndarray, threshold: float) -> List[np.ndarray]:
+    """
+    Partition endpoints into clusters (ascending endpoint indices) that
+    cannot interact while snapping. Snapping only averages points of one
+    cluster, so each cluster stays inside its bounding box; clusters are
+    merged until all boxes are more than threshold apart
+    """
+    n = len(coords)
+    if threshold <= 0 or n < 2:
+        return [np.array([j]) for j in range(n)]
+
+    reach = threshold * (1 + 1e-9) + 1e-9
+    geoms = shapely.points(coords)
+    left, right = shapely.STRtree(geoms).query(geoms, predicate='dwithin', distance=reach)
+    labels = _components(n, left, right)
+    while True:
+        count = labels.max() + 1
+        low = np.full((count, 2), np.inf)
+        high = np.full((count, 2), -np.inf)
+        np.minimum.at(low, labels, coords)
+        np.maximum.at(high, labels, coords)
+        # Boxes grown by half the reach intersect when the clusters are within reach
+        boxes = shapely.box(*(low - reach / 2).T, *(high + reach / 2).T)
+        left, right = shapely.STRtree(boxes).query(boxes, predicate='intersects')
+        if np.all(left == right):
+            break
+        labels = _components(count, left, right)[labels]
+
+    order = np.argsort(labels, kind='stable')
+    return np.split(order, np.flatnonzero(np.diff(labels[order])) + 1)
+
+
+def raw_room_bounds(room_data: List[List[Dict]]) -> np.ndarray:
+    """
+    (minx, miny, maxx, maxy) of each raw room
+    """
+    if not room_data:
+        return np.empty((0, 4))
+    coords = np.array([(v['x'], v['y']) for room in room_data for v in room], dtype=float)
+    index = np.repeat(np.arange(len(room_data)), [len(room) for room in room_data])
+    low = np.full((len(room_data), 2), np.inf)
+    high = np.full((len(room_data), 2), -np.inf)
+    np.minimum.at(low, index, coords)
+    np.maximum.at(high, index, coords)
+    return np.hstack([low, high])
+
+
+def _components(n: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    graph = coo_matrix((np.ones(len(left)), (left, right)), shape=(n, n))
+    return connected_components(graph, directed=False)[1]
+
+
+def _clean_tile(task: Tuple) -> Tuple[List, List, List]:
+    """
+    Worker: snap the tile's endpoint clusters, clean its rooms (and halo
+    rooms) and match its openings, using the serial FloorplanCleaner steps
+    """
+    snap_threshold, door_distance, groups, room_data, owned, openings = task
+    cleaner = FloorplanCleaner(snap_threshold=snap_threshold, validate=False)
+    cleaner.door_distance = door_distance
+
+    snapped = []
+    for indices, coords in groups:
+        points = [Point2D(x, y) for x, y in coords]
+        cleaner._snap_points(points, indices)
+        snapped.append((indices, points))
+
+    rooms = [room for room in (cleaner._extract_room(i, v) for i, v in room_data) if room]
+    closest = cleaner._closest_rooms([opening for _, opening in openings], rooms)
+    assigned = [(k, room.id if room else None) for (k, _), room in zip(openings, closest)]
+
+    return snapped, [r for r in rooms if r.id in owned], assigned
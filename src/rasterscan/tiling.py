@@ -0,0 +1,262 @@
+"""
+Tiled recognition of very large scans: split into overlapping tiles,
+recognize them concurrently and stitch the results into one raw recognition
+"""
+import io
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple
+
+import numpy as np
+import shapely
+from PIL import Image
+
+from .canonical_schema import Point2D, Wall
+from .cleaner import FloorplanCleaner
+
+Box = Tuple[int, int, int, int]
+
+
+class TiledRecognizer:
+    """
+    Run a recognizer backend over overlapping tiles of one large image.
+    The backend must provide recognize(image_data: bytes, box) -> raw dict
+    in the tile's own pixel coordinates (RasterScan raw format)
+    """
+
+    def __init__(self, backend, tile_size: int = 1024, overlap: int = 128,
+                 max_workers: int = 4, snap_threshold: float = 5.0):
+        """
+        Args:
+            tile_size: tile side in pixels
+            overlap: pixels shared by neighbouring tiles; should exceed the
+                     largest door/room fragment that a tile edge can cut
+            snap_threshold: distance under which stitched endpoints are merged
+        """
+        if overlap >= tile_size:
+            raise ValueError("Tile overlap must be smaller than the tile size")
+        self.backend = backend
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.max_workers = max_workers
+        self.snap_threshold = snap_threshold
+
+    def recognize(self, image: Image.Image) -> Dict:
+        boxes = self.tile_boxes(image.size)
+        image.load()  # decode once before tiles are cropped concurrently
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(lambda box: self._recognize_tile(image, box), boxes))
+
+        raw = self.stitch(results)
+        raw['tiling'] = {
+            'tiles': len(boxes),
+            'tile_size': self.tile_size,
+            'overlap': self.overlap
+        }
+        return raw
+
+    def tile_boxes(self, size: Tuple[int, int]) -> List[Box]:
+        """
+        Overlapping (left, top, right, bottom) boxes covering the whole image
+        """
+        width, height = size
+        stride = self.tile_size - self.overlap
+
+        def starts(length: int) -> List[int]:
+            if length <= self.tile_size:
+                return [0]
+            count = math.ceil((length - self.tile_size) / stride) + 1
+            return [min(i * stride, length - self.tile_size) for i in range(count)]
+
+        return [
+            (left, top, min(left + self.tile_size, width), min(top + self.tile_size, height))
+            for top in starts(height) for left in starts(width)
+        ]
+
+    def _recognize_tile(self, image: Image.Image, box: Box) -> Dict:
+        buffer = io.BytesIO()
+        image.crop(box).save(buffer, format='PNG', optimize=True)
+        raw = self.backend.recognize(buffer.getvalue(), box=box)
+        return translate_raw(raw, box[0], box[1])
+
+    def stitch(self, results: List[Dict]) -> Dict:
+        """
+        Merge tile results (already in global coordinates): snap and merge
+        walls, keep the most complete copy of each door and window and union
+        the room fragments cut by tile edges
+        """
+        walls = [w for r in results for w in r.get('walls', [])]
+        doors = [d for r in results for d in r.get('doors', [])]
+        windows = [w for r in results for w in r.get('windows', [])]
+        rooms = [room for r in results for room in r.get('rooms', [])]
+
+        merged_rooms = self._stitch_rooms(rooms)
+        outline = shapely.union_all(merged_rooms) if merged_rooms else None
+
+        return {
+            'walls': self._stitch_walls(walls),
+            'doors': self._stitch_openings(doors),
+            'windows': self._stitch_openings(windows),
+            'rooms': [
+                [{'x': x, 'y': y} for x, y in poly.exterior.coords[:-1]]
+                for poly in merged_rooms
+            ],
+            'area': float(sum(p.area for p in merged_rooms)),
+            'perimeter': float(outline.length) if outline is not None else 0
+        }
+
+    def _stitch_walls(self, walls: List[Dict]) -> List[Dict]:
+        segments = [w['position'] for w in walls if len(w.get('position', [])) >= 2]
+        if not segments:
+            return []
+
+        # Reuse the cleaner's endpoint snapping, then merge collinear overlaps
+        snapped = FloorplanCleaner(snap_threshold=self.snap_threshold)._snap_vertices([
+            Wall(Point2D(*s[0][:2]), Point2D(*s[1][:2])) for s in segments
+        ])
+        coords = np.array([[(w.start.x, w.start.y), (w.end.x, w.end.y)] for w in snapped], dtype=float)
+        lines = shapely.linestrings(coords)
+
+        tree = shapely.STRtree(lines)
+        left, right = tree.query(lines, predicate='dwithin', distance=self.snap_threshold)
+        keep = left < right
+        groups = _UnionFind(len(lines))
+        for i, j in zip(left[keep], right[keep]):
+            if self._collinear_overlap(coords[i], coords[j]):
+                groups.union(i, j)
+
+        stitched = []
+        for members in groups.groups():
+            seg = coords[members[0]]
+            direction = seg[1] - seg[0]
+            norm = np.linalg.norm(direction)
+            if norm == 0 or len(members) == 1:
+                stitched.append({'position': seg.tolist()})
+                continue
+            direction /= norm
+            points = coords[members].reshape(-1, 2)
+            t = (points - seg[0]) @ direction
+            start, end = points[np.argmin(t)], points[np.argmax(t)]
+            stitched.append({'position': [start.tolist(), end.tolist()]})
+        return stitched
+
+    def _collinear_overlap(self, a: np.ndarray, b: np.ndarray) -> bool:
+        """
+        Both segments on the same line (within snap threshold) and sharing
+        more than the snap threshold of length. Walls that only meet at a
+        junction are kept separate
+        """
+        direction = a[1] - a[0]
+        length = np.linalg.norm(direction)
+        if length == 0:
+            return False
+        direction /= length
+        normal = np.array([-direction[1], direction[0]])
+
+        if np.any(np.abs((b - a[0]) @ normal) > self.snap_threshold):
+            return False
+        t = (b - a[0]) @ direction
+        shared = min(t.max(), length) - max(t.min(), 0)
+        return shared > self.snap_threshold
+
+    def _stitch_openings(self, openings: List[Dict]) -> List[Dict]:
+        """
+        Doors or windows seen by several tiles: keep the copy with the
+        largest bbox (the one not cut by a tile edge)
+        """
+        openings = [o for o in openings if len(o.get('bbox', [])) >= 4]
+        if not openings:
+            return []
+
+        boxes = shapely.polygons(np.array([o['bbox'][:4] for o in openings], dtype=float))
+        areas = shapely.area(boxes)
+        groups = _UnionFind(len(openings))
+        for i, j in _overlapping_pairs(boxes, areas, min_ratio=0.5):
+            groups.union(i, j)
+
+        return [openings[max(members, key=lambda k: (areas[k], -k))] for members in groups.groups()]
+
+    def _stitch_rooms(self, rooms: List[List[Dict]]) -> List:
+        """
+        Union room fragments that overlap (same room seen by neighbouring
+        tiles); distinct rooms only share edges, so a small ratio is enough
+        """
+        polygons = [
+            shapely.make_valid(shapely.Polygon([(v['x'], v['y']) for v in room]))
+            for room in rooms if len(room) >= 3
+        ]
+        polygons = [p for p in polygons if p.area > 0]
+        if not polygons:
+            return []
+
+        polygons = np.array(polygons, dtype=object)
+        groups = _UnionFind(len(polygons))
+        for i, j in _overlapping_pairs(polygons, shapely.area(polygons), min_ratio=0.05):
+            groups.union(i, j)
+
+        merged = []
+        for members in groups.groups():
+            union = shapely.union_all(polygons[members])
+            # Keep the largest part if fragments only touch
+            parts = [p for p in shapely.get_parts(union) if p.geom_type == 'Polygon']
+            if parts:
+                merged.append(shapely.Polygon(max(parts, key=lambda p: p.area).exterior))
+        return merged
+
+
+def _overlapping_pairs(geoms: np.ndarray, areas: np.ndarray, min_ratio: float):
+    """
+    Index pairs whose shared area exceeds min_ratio of the smaller geometry
+    """
+    tree = shapely.STRtree(geoms)
+    left, right = tree.query(geoms, predicate='intersects')
+    keep = left < right
+    left, right = left[keep], right[keep]
+    if not len(left):
+        return []
+
+    shared = shapely.area(shapely.intersection(geoms[left], geoms[right]))
+    hits = shared > min_ratio * np.minimum(areas[left], areas[right])
+    return list(zip(left[hits], right[hits]))
+
+
+def translate_raw(raw: Dict, dx: float, dy: float) -> Dict:
+    """
+    Shift RasterScan raw coordinates from tile to global pixel space
+    """
+    def point(p):
+        return [p[0] + dx, p[1] + dy]
+
+    return {
+        **raw,
+        'walls': [{**w, 'position': [point(p) for p in w.get('position', [])]} for w in raw.get('walls', [])],
+        'doors': [{**d, 'bbox': [point(p) for p in d.get('bbox', [])]} for d in raw.get('doors', [])],
+        'windows': [{**w, 'bbox': [point(p) for p in w.get('bbox', [])]} for w in raw.get('windows', [])],
+        'rooms': [[{**v, 'x': v['x'] + dx, 'y': v['y'] + dy} for v in room] for room in raw.get('rooms', [])]
+    }
+
+
+class _UnionFind:
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        a, b = self.find(i), self.find(j)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+    def groups(self) -> List[List[int]]:
+        """
+        Members per group, groups ordered by their smallest member
+        """
+        found = {}
+        for i in range(len(self.parent)):
+            found.setdefault(self.find(i), []).append(i)
+        return list(found.values())
@@ -0,0 +1,157 @@
+"""
+Geometric validation of cleaned floorplans (Silver layer checks)
+"""
+from typing import List, Dict, Optional
+
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from .canonical_schema import Room, Wall, Door, Floorplan
+from .geometry import room_polygons, wall_lines, door_centers, exterior_outline
+from .openings import OpeningIndex
+
+
+class FloorplanValidator:
+    """
+    Validate all rooms, walls and doors of a floorplan at once using
+    shapely 2 vectorized operations and an STRtree for pairwise checks
+    """
+
+    def __init__(self, overlap_tolerance: float = 1.0, exterior_tolerance: float = 5.0,
+                 door_wall_tolerance: float = 20.0):
+        """
+        Args:
+            overlap_tolerance: minimum shared area for two rooms to count as overlapping
+            exterior_tolerance: distance a room may stick out of the exterior outline
+            door_wall_tolerance: maximum distance between a door center and its wall
+        """
+        self.overlap_tolerance = overlap_tolerance
+        self.exterior_tolerance = exterior_tolerance
+        self.door_wall_tolerance = door_wall_tolerance
+
+    def validate(self, floorplan: Floorplan, doors: Optional[List[Door]] = None) -> Dict:
+        """
+        Run every check and return a structured report.
+        Doors default to the ones attached to rooms
+        """
+        if doors is None:
+            doors = [d for r in floorplan.rooms for d in r.doors]
+
+        polygons = room_polygons(floorplan.rooms)
+        invalid = self._check_invalid(floorplan.rooms, polygons)
+        repaired = shapely.make_valid(polygons)
+
+        overlaps = self._check_overlaps(floorplan.rooms, repaired)
+        outside = self._check_outside_exterior(floorplan.rooms, repaired, floorplan.walls)
+        floating_doors = self._check_doors_on_walls(doors, floorplan.walls, OpeningIndex(floorplan, doors))
+
+        return {
+            'passed': not (invalid or overlaps or outside or floating_doors),
+            'counts': {
+                'rooms': len(floorplan.rooms),
+                'walls': len(floorplan.walls),
+                'doors': len(doors),
+                'invalid_rooms': len(invalid),
+                'overlapping_pairs': len(overlaps),
+                'rooms_outside_exterior': len(outside),
+                'doors_off_wall': len(floating_doors)
+            },
+            'invalid_rooms': invalid,
+            'overlaps': overlaps,
+            'rooms_outside_exterior': outside,
+            'doors_off_wall': floating_doors
+        }
+
+    def _check_invalid(self, rooms: List[Room], polygons: np.ndarray) -> List[Dict]:
+        """
+        Invalid or self-intersecting polygons with the area after make_valid repair
+        """
+        bad = np.flatnonzero(~shapely.is_valid(polygons))
+        if not len(bad):
+            return []
+
+        reasons = shapely.is_valid_reason(polygons[bad])
+        repaired_area = shapely.area(shapely.make_valid(polygons[bad]))
+        return [
+            {'room_id': rooms[i].id, 'reason': reason, 'repaired_area': float(area)}
+            for i, reason, area in zip(bad, reasons, repaired_area)
+        ]
+
+    def _check_overlaps(self, rooms: List[Room], polygons: np.ndarray) -> List[Dict]:
+        """
+        Pairwise room overlaps; candidates come from an STRtree query so only
+        rooms with intersecting bounding boxes are compared
+        """
+        if len(polygons) < 2:
+            return []
+
+        tree = STRtree(polygons)
+        left, right = tree.query(polygons, predicate='intersects')
+        keep = left < right
+        left, right = left[keep], right[keep]
+
+        # Rooms sharing a wall only touch; skip them before computing intersections
+        keep = ~shapely.touches(polygons[left], polygons[right])
+        left, right = left[keep], right[keep]
+        if not len(left):
+            return []
+
+        shared = shapely.area(shapely.intersection(polygons[left], polygons[right]))
+        hits = np.flatnonzero(shared > self.overlap_tolerance)
+        return [
+            {'rooms': [rooms[left[k]].id, rooms[right[k]].id], 'overlap_area': float(shared[k])}
+            for k in hits
+        ]
+
+    def _check_outside_exterior(self, rooms: List[Room], polygons: np.ndarray,
+                                walls: List[Wall]) -> List[Dict]:
+        """
+        Rooms sticking out of the exterior outline formed by the walls
+        """
+        exterior = exterior_outline(walls)
+        if exterior is None or not len(polygons):
+            return []
+
+        exterior = exterior.buffer(self.exterior_tolerance)
+        outside_area = shapely.area(shapely.difference(polygons, exterior))
+        hits = np.flatnonzero(outside_area > self.overlap_tolerance)
+        return [
+            {'room_id': rooms[i].id, 'outside_area': float(outside_area[i])}
+            for i in hits
+        ]
+
+    def _check_doors_on_walls(self, doors: List[Door], walls: List[Wall], index) -> List[Dict]:
+        """
+        Doors whose center is not within tolerance of any wall. The host of a
+        door in the OpeningIndex is normally its nearest wall (attach_to_walls),
+        so a hosted door is first measured against its host; the STRtree is
+        queried for unhosted doors and for those off their host, since a
+        wall_index may be stale after the walls changed
+        """
+        if not doors:
+            return []
+
+        centers = door_centers(doors)
+        if not walls:
+            return [{'door_index': i, 'center': centers[i].tolist()} for i in range(len(doors))]
+
+        lines = wall_lines(walls)
+        position = {id(door): i for i, door in enumerate(doors)}
+        hosted = [(position[id(o)], wall_index) for wall_index, pairs in index.by_wall.items()
+                  if wall_index < len(walls) for _, o in pairs if id(o) in position]
+        on_wall = np.zeros(len(doors), dtype=bool)
+        if hosted:
+            door_idx, wall_idx = np.array(hosted).T
+            on_wall[door_idx] = shapely.distance(lines[wall_idx], shapely.points(centers[door_idx])) \
+                <= self.door_wall_tolerance
+
+        rest = np.flatnonzero(~on_wall)
+        if len(rest):
+            found, _ = STRtree(lines).query(shapely.points(centers[rest]), predicate='dwithin',
+                                            distance=self.door_wall_tolerance)
+            on_wall[rest[found]] = True
+
+        off_wall = np.flatnonzero(~on_wall)
+        return [{'door_index': int(i), 'center': centers[i].tolist()} for i in off_wall]
+
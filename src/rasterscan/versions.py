@@ -0,0 +1,230 @@
+"""
+Delta-encoded floorplan versions (gold layer). Each optimization is stored
+as a structured delta against its parent version: rooms added, removed or
+modified by id, walls added or removed by position and changed top-level
+fields. A full snapshot is written every snapshot_every deltas, so
+materializing any version applies at most that many deltas
+"""
+import difflib
+import fcntl
+import json
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from .helper import atomic_write_text
+
+# Top-level Floorplan.to_dict() keys that are diffed element by element
+ELEMENT_KEYS = ('rooms', 'walls')
+
+
+def diff_floorplans(parent: Dict, child: Dict) -> Optional[Dict]:
+    """
+    Delta turning parent into child (both Floorplan.to_dict() outputs), or
+    None when rooms have no unique ids and the child must be a snapshot
+    """
+    parent_rooms = {r['id']: r for r in parent.get('rooms', [])}
+    child_rooms = {r['id']: r for r in child.get('rooms', [])}
+    if len(parent_rooms) != len(parent.get('rooms', [])) or len(child_rooms) != len(child.get('rooms', [])):
+        return None
+
+    rooms = {
+        'added': [r for rid, r in child_rooms.items() if rid not in parent_rooms],
+        'removed': [rid for rid in parent_rooms if rid not in child_rooms],
+        'modified': [r for rid, r in child_rooms.items() if rid in parent_rooms and parent_rooms[rid] != r]
+    }
+    # Room order is only stored when it is not "kept rooms, then added ones"
+    kept = [rid for rid in parent_rooms if rid in child_rooms]
+    order = [rid for rid in child_rooms]
+    if order != kept + [r['id'] for r in rooms['added']]:
+        rooms['order'] = order
+
+    # Walls have no ids and openings refer to them by index, so walls are
+    # diffed as a sequence: removed parent indices, added (child index, wall)
+    walls = {'added': [], 'removed': []}
+    if parent.get('walls', []) != child.get('walls', []):
+        parent_walls = [_wall_key(w) for w in parent.get('walls', [])]
+        child_walls = [_wall_key(w) for w in child.get('walls', [])]
+        matcher = difflib.SequenceMatcher(None, parent_walls, child_walls, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag in ('delete', 'replace'):
+                walls['removed'].extend(range(i1, i2))
+            if tag in ('insert', 'replace'):
+                walls['added'].extend([j, child['walls'][j]] for j in range(j1, j2))
+
+    fields = {k: v for k, v in child.items() if k not in ELEMENT_KEYS and parent.get(k) != v}
+    removed_fields = [k for k in parent if k not in ELEMENT_KEYS and k not in child]
+
+    delta = {}
+    if any(rooms.values()):
+        delta['rooms'] = {k: v for k, v in rooms.items() if v}
+    if walls['added'] or walls['removed']:
+        delta['walls'] = {k: v for k, v in walls.items() if v}
+    if fields:
+        delta['set'] = fields
+    if removed_fields:
+        delta['unset'] = removed_fields
+    return delta
+
+
+def apply_delta(parent: Dict, delta: Dict) -> Dict:
+    """
+    Rebuild the child version from its parent and the diff_floorplans delta
+    """
+    result = {k: v for k, v in parent.items() if k not in delta.get('unset', [])}
+    result.update(delta.get('set', {}))
+
+    rooms = delta.get('rooms')
+    if rooms:
+        removed = set(rooms.get('removed', []))
+        modified = {r['id']: r for r in rooms.get('modified', [])}
+        merged = [modified.get(r['id'], r) for r in parent.get('rooms', []) if r['id'] not in removed]
+        merged += rooms.get('added', [])
+        if 'order' in rooms:
+            by_id = {r['id']: r for r in merged}
+            merged = [by_id[rid] for rid in rooms['order']]
+        result['rooms'] = merged
+
+    walls = delta.get('walls')
+    if walls:
+        removed = set(walls.get('removed', []))
+        merged = [w for i, w in enumerate(parent.get('walls', [])) if i not in removed]
+        # Added walls are sorted by their final index, so inserting in order lands each in place
+        for j, wall in walls.get('added', []):
+            merged.insert(j, wall)
+        result['walls'] = merged
+    return result
+
+
+def _wall_key(wall: Dict) -> str:
+    return json.dumps(wall, sort_keys=True)
+
+
+def _parse_history(lines) -> List[Dict]:
+    # A line without its newline is a record another process is still appending
+    return [json.loads(line) for line in lines if line.strip() and line.endswith('\n')]
+
+
+class VersionStore:
+    """
+    Version history of floorplans under root:
+
+        <root>/<plan_id>/versions.jsonl   one record per version (append-only)
+        <root>/<plan_id>/<version>.json   snapshot or delta payload
+
+    Versions form a tree (a version may have several children); a version
+    is a snapshot when it has no parent, when its parent is snapshot_every
+    deltas away from the last snapshot, or when no delta can be built.
+    Processes sharing root are serialized by a file lock on versions.jsonl
+    """
+
+    def __init__(self, root: str, snapshot_every: int = 20, cache_size: int = 32):
+        """
+        Args:
+            snapshot_every: maximum deltas applied to materialize a version
+            cache_size: materialized versions kept in memory
+        """
+        self.root = Path(root)
+        self.snapshot_every = snapshot_every
+        self.cache_size = cache_size
+        self._cache: Dict[tuple, Dict] = {}
+        self._lock = threading.Lock()
+
+    def commit(self, plan_id: str, floorplan: Dict, parent: Optional[int] = None,
+               action: Optional[Dict] = None) -> int:
+        """
+        Store a new version of plan_id and return its version number
+        """
+        with self._lock:
+            plan_dir = self.root / plan_id
+            plan_dir.mkdir(parents=True, exist_ok=True)
+            # The thread lock is per store object; the file lock also serializes
+            # numbering and appending with other processes sharing the directory
+            with open(plan_dir / 'versions.jsonl', 'a+') as log:
+                fcntl.flock(log, fcntl.LOCK_EX)
+                log.seek(0)
+                history = _parse_history(log)
+                version = len(history)
+                depth = 0
+                payload = None
+                if parent is not None:
+                    if parent >= version:
+                        raise ValueError(f"Unknown parent version {parent} of {plan_id}")
+                    if history[parent]['depth'] < self.snapshot_every:
+                        payload = diff_floorplans(self._materialize(plan_id, parent, history), floorplan)
+                        depth = history[parent]['depth'] + 1
+
+                kind = 'snapshot' if payload is None else 'delta'
+                data = json.dumps(floorplan if payload is None else payload)
+                record = {
+                    'version': version,
+                    'parent': parent,
+                    'kind': kind,
+                    'depth': depth if kind == 'delta' else 0,
+                    'action': action,
+                    'bytes': len(data),
+                    'created_at': time.time()
+                }
+
+                atomic_write_text(data, plan_dir / f"{version}.json")
+                log.write(json.dumps(record) + '\n')
+
+            self._remember((plan_id, version), json.loads(json.dumps(floorplan)))
+            return version
+
+    def materialize(self, plan_id: str, version: Optional[int] = None) -> Dict:
+        """
+        Full floorplan dict of a version (the latest by default). It is
+        shared with the in-memory cache: copy it before modifying
+        """
+        with self._lock:
+            history = self.history(plan_id)
+            if not history:
+                raise KeyError(f"No versions stored for {plan_id}")
+            if version is None:
+                version = len(history) - 1
+            return self._materialize(plan_id, version, history)
+
+    def history(self, plan_id: str) -> List[Dict]:
+        path = self.root / plan_id / 'versions.jsonl'
+        if not path.exists():
+            return []
+        with open(path, 'r') as f:
+            return _parse_history(f)
+
+    def stats(self, plan_id: str) -> Dict:
+        """
+        Stored payload bytes by kind
+        """
+        history = self.history(plan_id)
+        return {
+            'versions': len(history),
+            'snapshots': sum(r['kind'] == 'snapshot' for r in history),
+            'stored_bytes': sum(r['bytes'] for r in history),
+            'snapshot_bytes': sum(r['bytes'] for r in history if r['kind'] == 'snapshot')
+        }
+
+    def _materialize(self, plan_id: str, version: int, history: List[Dict]) -> Dict:
+        # Walk up to the nearest cached version or snapshot, then apply deltas down
+        chain = []
+        while (plan_id, version) not in self._cache and history[version]['kind'] == 'delta':
+            chain.append(version)
+            version = history[version]['parent']
+
+        floorplan = self._cache.get((plan_id, version)) or self._load(plan_id, version)
+        self._remember((plan_id, version), floorplan)
+        for delta_version in reversed(chain):
+            floorplan = apply_delta(floorplan, self._load(plan_id, delta_version))
+            self._remember((plan_id, delta_version), floorplan)
+        return floorplan
+
+    def _load(self, plan_id: str, version: int) -> Dict:
+        with open(self.root / plan_id / f"{version}.json", 'r') as f:
+            return json.load(f)
+
+    def _remember(self, key: tuple, floorplan: Dict):
+        self._cache.pop(key, None)
+        self._cache[key] = floorplan
+        while len(self._cache) > self.cache_size:
+            self._cache.pop(next(iter(self._cache)))
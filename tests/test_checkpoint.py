@@ -0,0 +1,59 @@
+import pytest
+
+from src.rasterscan import checkpoint
+from src.rasterscan.checkpoint import CheckpointStore
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {'result': self.calls}
+
+
+@pytest.fixture
+def code_dir(tmp_path, monkeypatch):
+    src = tmp_path / 'src'
+    src.mkdir()
+    (src / 'stage.py').write_text('THRESHOLD = 5\n')
+    monkeypatch.setattr(checkpoint, 'SRC_DIR', src)
+    monkeypatch.setitem(checkpoint.STAGE_CODE, 'stage', ['stage.py'])
+    return src
+
+
+def test_same_input_and_params_reuse_the_checkpoint(tmp_path, code_dir):
+    store, compute = CheckpointStore(str(tmp_path / 'ckpt')), Counter()
+    assert store.run_stage('stage', {'rooms': []}, {'snap': 5}, compute) == ({'result': 1}, False)
+    assert store.run_stage('stage', {'rooms': []}, {'snap': 5}, compute) == ({'result': 1}, True)
+    assert compute.calls == 1
+
+
+def test_changed_params_or_input_miss(tmp_path, code_dir):
+    store, compute = CheckpointStore(str(tmp_path / 'ckpt')), Counter()
+    store.run_stage('stage', {'rooms': []}, {'snap': 5}, compute)
+    assert store.run_stage('stage', {'rooms': []}, {'snap': 6}, compute) == ({'result': 2}, False)
+    assert store.run_stage('stage', {'rooms': [1]}, {'snap': 5}, compute) == ({'result': 3}, False)
+    assert store.run_stage('stage', {'rooms': []}, {'snap': 6}, compute) == ({'result': 2}, True)
+
+
+def test_code_change_invalidates_the_checkpoint(tmp_path, code_dir):
+    store, compute = CheckpointStore(str(tmp_path / 'ckpt')), Counter()
+    store.run_stage('stage', {'rooms': []}, {}, compute)
+    (code_dir / 'stage.py').write_text('THRESHOLD = 6\n')
+    assert store.run_stage('stage', {'rooms': []}, {}, compute) == ({'result': 2}, False)
+
+
+def test_force_recomputes_and_overwrites(tmp_path, code_dir):
+    store, compute = CheckpointStore(str(tmp_path / 'ckpt')), Counter()
+    store.run_stage('stage', {'rooms': []}, {}, compute)
+    assert store.run_stage('stage', {'rooms': []}, {}, compute, force=True) == ({'result': 2}, False)
+    assert store.run_stage('stage', {'rooms': []}, {}, compute) == ({'result': 2}, True)
+    assert not list((tmp_path / 'ckpt').rglob('*.tmp'))
+
+
+def test_stage_code_files_exist():
+    for names in checkpoint.STAGE_CODE.values():
+        for name in names:
+            assert (checkpoint.SRC_DIR / name).is_file()
@@ -0,0 +1,33 @@
+from src.rasterscan.compare import FloorplanComparator
+
+# An L-shaped layout: a wide room along the top, a small room under its left end
+LAYOUT = {'living': [(0, 0), (10, 0), (10, 4), (0, 4)], 'bath': [(0, 4), (3, 4), (3, 7), (0, 7)]}
+
+
+def rasterscan_plan():
+    """Image pixels, y pointing down (the living room is at the top of the image)"""
+    rooms = [{'id': name, 'room_type': 'unknown', 'vertices': [{'x': x * 50, 'y': y * 50} for x, y in coords],
+              'doors': [], 'windows': []} for name, coords in LAYOUT.items()]
+    return {'rooms': rooms, 'walls': [], 'metadata': {'source': 'RasterScan Recognizer'}}
+
+
+def gemini_plan():
+    """Meters from the bottom left, y pointing up: the same layout, mirrored vertically"""
+    rooms = [{'id': name, 'type': 'unknown', 'vertices': [[x, 7 - y] for x, y in coords]}
+             for name, coords in LAYOUT.items()]
+    return {'schema': 'canonical_v1', 'rooms': rooms,
+            'metadata': {'coordinate_system': 'cartesian_meters_bottom_left_origin'}}
+
+
+def test_mirrored_sources_match_after_flipping_the_y_axis():
+    report = FloorplanComparator().compare(rasterscan_plan(), gemini_plan())['rooms']
+    assert report['matched'] == 2
+    assert [(m['reference'], m['candidate']) for m in report['matches']] == [('living', 'living'), ('bath', 'bath')]
+    assert report['mean_iou'] > 0.999
+
+
+def test_plans_in_the_same_coordinate_system_are_not_flipped():
+    candidate = gemini_plan()
+    candidate['metadata']['coordinate_system'] = 'image_pixels_top_left_origin'
+    report = FloorplanComparator().compare(rasterscan_plan(), candidate)['rooms']
+    assert report['mean_iou'] < 0.9
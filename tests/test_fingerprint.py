@@ -0,0 +1,64 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+import shapely
+
+from src.rasterscan.fingerprint import FingerprintIndex, estimate_transform, plan_polygons
+from src.rasterscan.helper import load_json
+
+from conftest import PROJECT_ROOT
+
+RAW = load_json(str(PROJECT_ROOT / 'outputs' / 'rasterscan' / 'recognizer_raw.json'))
+PARAMS = {'snap_threshold': 5.0, 'action': 'split_bedroom'}
+
+
+def moved(polygons, angle=0.0, mirror=False, scale=1.0, shift=(0.0, 0.0)):
+    cos, sin = np.cos(angle), np.sin(angle)
+    flip = -1.0 if mirror else 1.0
+    matrix = np.array([[cos, -sin * flip], [sin, cos * flip]]) * scale
+    return shapely.transform(polygons, lambda xy: xy @ matrix.T + shift)
+
+
+@pytest.mark.parametrize('angle, mirror', [(0.0, True), (np.pi / 2, False), (np.pi / 6, False), (2.0, True)])
+def test_transform_recovers_rotation_and_mirroring(angle, mirror):
+    source = plan_polygons(RAW)
+    target = moved(source, angle, mirror, scale=0.4, shift=(300.0, -50.0))
+    transform, iou = estimate_transform(source, target)
+    assert iou > 0.95
+    mapped = shapely.transform(source, transform.apply)
+    assert np.abs(shapely.get_coordinates(mapped) - shapely.get_coordinates(target)).max() < 1e-6
+
+
+def test_index_reuses_rotated_duplicate_only_with_same_params(tmp_path):
+    index = FingerprintIndex(str(tmp_path))
+    result = {'rooms': [], 'walls': [], 'total_area': 1.0, 'perimeter': 1.0, 'metadata': {}}
+    index.add('plan', {'optimized': result}, RAW, PARAMS)
+
+    rotated = moved(plan_polygons(RAW), np.pi / 3, scale=2.0)
+    reused = index.reuse(rotated, PARAMS)
+    assert reused['optimized']['metadata']['reused_from']['plan_id'] == 'plan'
+    assert index.reuse(rotated, {**PARAMS, 'action': 'add_new_room'}) is None
+
+
+def test_indexes_sharing_a_directory_keep_each_others_entries(tmp_path):
+    result = {'rooms': [], 'walls': [], 'total_area': 1.0, 'perimeter': 1.0, 'metadata': {}}
+    first, second = FingerprintIndex(str(tmp_path)), FingerprintIndex(str(tmp_path))
+    first.add('first', {'optimized': result}, RAW, PARAMS)
+    second.add('second', {'optimized': result}, RAW, {**PARAMS, 'action': 'add_new_room'})
+
+    assert set(FingerprintIndex(str(tmp_path)).entries) == {'first', 'second'}
+    assert second.reuse(plan_polygons(RAW), PARAMS)['optimized']['metadata']['reused_from']['plan_id'] == 'first'
+
+
+def _add(root, plan_ids):
+    index = FingerprintIndex(root)
+    for plan_id in plan_ids:
+        index.add(plan_id, {}, RAW, PARAMS)
+
+
+def test_concurrent_processes_do_not_lose_index_entries(tmp_path):
+    batches = [[f'plan_{worker}_{i}' for i in range(5)] for worker in range(4)]
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_add, [str(tmp_path)] * 4, batches))
+    assert set(FingerprintIndex(str(tmp_path)).entries) == {p for batch in batches for p in batch}
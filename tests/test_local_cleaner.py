@@ -0,0 +1,21 @@
+from src.gemini.local_cleaner import LocalFloorplanCleaner
+
+
+def test_fallback_room_keeps_a_valid_part_of_a_self_intersecting_room():
+    cleaner = LocalFloorplanCleaner()
+    bowtie = {'id': 'r1', 'type': 'bedroom', 'vertices': [[0, 0], [4, 4], [4, 0], [0, 4]]}
+    assert cleaner.clean_room(bowtie) is None
+
+    room = cleaner.fallback_room(bowtie)
+    assert room['id'] == 'r1'
+    assert room['area'] == 4.0
+    assert cleaner.finalize({'rooms': [room]})['metadata']['total_area'] == 4.0
+
+
+def test_overlaps_ignores_shared_walls():
+    cleaner = LocalFloorplanCleaner()
+    left = {'vertices': [[0, 0], [2, 0], [2, 2], [0, 2]]}
+    right = {'vertices': [[2, 0], [4, 0], [4, 2], [2, 2]]}
+    shifted = {'vertices': [[1.8, 0], [4, 0], [4, 2], [1.8, 2]]}
+    assert not cleaner.overlaps(right, [left])
+    assert cleaner.overlaps(shifted, [left])
@@ -0,0 +1,48 @@
+from src.rasterscan.canonical_schema import Point2D, Door, Room, Wall, Floorplan
+from src.rasterscan.openings import OpeningIndex, attach_to_walls
+from src.rasterscan.optimizer import FloorplanOptimizer
+from src.rasterscan.validator import FloorplanValidator
+
+
+def door(x, y, size=2):
+    return Door([Point2D(x - size, y - size), Point2D(x + size, y - size),
+                 Point2D(x + size, y + size), Point2D(x - size, y + size)], 2 * size)
+
+
+def plan(doors):
+    walls = [Wall(Point2D(0, 0), Point2D(200, 0)), Wall(Point2D(200, 0), Point2D(200, 100))]
+    attach_to_walls(doors, walls, max_distance=20)
+    room = Room('room_0', 'living_room', [Point2D(0, 0), Point2D(200, 0), Point2D(200, 100), Point2D(0, 100)],
+                20000, doors=doors[:2], windows=[])
+    return Floorplan([room], walls, 20000, 600, {})
+
+
+def test_door_check_uses_hosts_and_falls_back_for_unhosted_doors():
+    doors = [door(50, 3), door(150, 15), door(100, 60)]
+    floorplan = plan(doors)
+    assert OpeningIndex(floorplan, doors).on_wall(0) == [('room_0', doors[0]), ('room_0', doors[1])]
+    # Unassigned to any room and farther than the attach distance from every wall
+    assert doors[2].wall_index is None
+
+    report = FloorplanValidator(door_wall_tolerance=10).validate(floorplan, doors)
+    assert [d['door_index'] for d in report['doors_off_wall']] == [1, 2]
+    report = FloorplanValidator(door_wall_tolerance=100).validate(floorplan, doors)
+    assert report['doors_off_wall'] == []
+
+
+def test_door_check_falls_back_to_all_walls_for_a_stale_host():
+    doors = [door(196, 50)]
+    floorplan = plan(doors)
+    assert doors[0].wall_index == 1
+    # The host index points at the wrong wall, e.g. after the walls were reordered
+    doors[0].wall_index = 0
+
+    report = FloorplanValidator(door_wall_tolerance=10).validate(floorplan, doors)
+    assert report['doors_off_wall'] == []
+
+
+def test_split_bedroom_moves_openings_by_their_wall_position():
+    doors = [door(50, 3), door(150, 15)]
+    result = FloorplanOptimizer().split_bedroom(plan(doors))
+    parts = {r.id: r.doors for r in result.rooms}
+    assert parts == {'room_0_1': [doors[0]], 'room_0_2_bedroom': [doors[1]]}
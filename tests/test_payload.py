@@ -0,0 +1,47 @@
+import copy
+import json
+
+from conftest import PROJECT_ROOT
+from src.gemini.payload import PromptPayloadEncoder, merge_chunks
+
+RAW = PROJECT_ROOT / 'outputs' / 'gemini' / 'recognizer_raw.json'
+
+
+def test_chunk_and_merge_keep_every_element_once():
+    with open(RAW) as f:
+        data = json.load(f)
+    # A wall outside every room must not be dropped
+    data['walls'].append({'start': [-50.0, -50.0], 'end': [-40.0, -50.0], 'thickness': 0.15})
+
+    chunks = PromptPayloadEncoder(token_budget=200).chunk(copy.deepcopy(data))
+    assert len(chunks) > 1
+    for key in ('rooms', 'walls', 'doors', 'windows'):
+        assert sum(len(c.get(key, [])) for c in chunks) == len(data.get(key, []))
+
+    merged = merge_chunks(chunks + [chunks[0]])
+    for key in ('rooms', 'walls', 'doors', 'windows'):
+        assert len(merged[key]) == len(data.get(key, []))
+
+
+def test_derived_fields_are_kept_for_the_optimize_prompt():
+    plan = {'rooms': [{'id': 'r1', 'vertices': [[0, 0], [4, 0], [4, 3]], 'area': 6.0}],
+            'metadata': {'total_area': 6.0, 'room_count': 1}}
+    encoder = PromptPayloadEncoder()
+    assert 'area' not in encoder.encode(plan)
+    assert json.loads(encoder.encode(plan, drop_derived=False)) == {
+        'rooms': [{'id': 'r1', 'vertices': [[0, 0], [4, 0], [4, 3]], 'area': 6}],
+        'metadata': {'total_area': 6, 'room_count': 1}
+    }
+
+
+def test_merge_dedupes_by_rounded_geometry():
+    room = {'id': 'r1', 'type': 'bedroom', 'vertices': [[0, 0], [4, 0], [4, 3]]}
+    same_room = {'id': 'r7', 'type': 'bedroom', 'vertices': [[4.001, 0], [4, 3], [0, 0]], 'confidence': 0.8}
+    wall = {'start': [0, 0], 'end': [4, 0]}
+    reversed_wall = {'id': 'w2', 'start': [4.0, 0.0], 'end': [0.0, 0.004]}
+    other_wall = {'start': [0, 0], 'end': [4, 0.1]}
+
+    merged = merge_chunks([{'rooms': [room], 'walls': [wall]},
+                           {'rooms': [same_room], 'walls': [reversed_wall, other_wall]}])
+    assert merged['rooms'] == [room]
+    assert merged['walls'] == [wall, other_wall]
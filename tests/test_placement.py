@@ -0,0 +1,61 @@
+import logging
+
+import shapely
+
+from src.rasterscan.canonical_schema import Point2D, Room, Wall, Floorplan
+from src.rasterscan.cleaner import FloorplanCleaner
+from src.rasterscan.geometry import exterior_outline, room_polygons
+from src.rasterscan.helper import load_json
+from src.rasterscan.optimizer import FloorplanOptimizer
+from src.rasterscan.validator import FloorplanValidator
+
+from conftest import PROJECT_ROOT
+
+
+def rect_room(rid, x0, y0, x1, y1):
+    vertices = [Point2D(x0, y0), Point2D(x1, y0), Point2D(x1, y1), Point2D(x0, y1)]
+    return Room(rid, 'living_room', vertices, (x1 - x0) * (y1 - y0), doors=[], windows=[])
+
+
+def building(rooms):
+    """
+    A 400 x 200 outline; the rooms leave the rest of it empty
+    """
+    corners = [(0, 0), (400, 0), (400, 200), (0, 200)]
+    walls = [Wall(Point2D(*a), Point2D(*b)) for a, b in zip(corners, corners[1:] + corners[:1])]
+    return Floorplan(rooms, walls, sum(r.area for r in rooms), 1200, {})
+
+
+def check_placed(result, floorplan):
+    assert result.metadata['add_room']['placed']
+    new_room = result.rooms[-1]
+    polygon = room_polygons([new_room])[0]
+    assert polygon.is_valid and polygon.area >= 2000
+    assert exterior_outline(floorplan.walls).buffer(1e-6).contains(polygon)
+    assert not any(shapely.area(shapely.intersection(room_polygons(floorplan.rooms), polygon)) > 1e-6)
+
+    report = FloorplanValidator().validate(result)
+    assert report['counts']['rooms_outside_exterior'] == 0
+    assert report['counts']['overlapping_pairs'] == 0
+    return report
+
+
+def test_new_room_fills_free_space_inside_the_building():
+    floorplan = building([rect_room('room_0', 0, 0, 150, 200), rect_room('room_1', 150, 0, 250, 120)])
+    result = FloorplanOptimizer().add_new_room(floorplan, min_area=2000)
+    assert check_placed(result, floorplan)['passed']
+    assert shapely.bounds(room_polygons(result.rooms[-1:]))[0, 0] >= 150
+
+
+def test_new_room_in_the_sample_plan_stays_inside_and_does_not_overlap():
+    floorplan = FloorplanCleaner().clean(load_json(str(PROJECT_ROOT / 'outputs' / 'rasterscan' / 'recognizer_raw.json')))
+    check_placed(FloorplanOptimizer().add_new_room(floorplan, min_area=2000), floorplan)
+
+
+def test_full_building_leaves_the_plan_unchanged(caplog):
+    floorplan = building([rect_room('room_0', 0, 0, 200, 200), rect_room('room_1', 200, 0, 400, 200)])
+    with caplog.at_level(logging.WARNING):
+        result = FloorplanOptimizer().add_new_room(floorplan, min_area=2000)
+    assert result.rooms == floorplan.rooms
+    assert result.metadata['add_room'] == {'placed': False}
+    assert 'no free space' in caplog.text
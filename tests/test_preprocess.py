@@ -0,0 +1,50 @@
+import numpy as np
+from PIL import Image
+
+from src.rasterscan.preprocess import ImagePreprocessor, ImageTransform, map_raw_to_original
+
+
+def test_transparent_background_is_cropped_as_whitespace(tmp_path):
+    # Transparent black background, opaque black square at (40, 40)-(60, 60)
+    pixels = np.zeros((100, 100, 4), dtype=np.uint8)
+    pixels[40:60, 40:60] = (0, 0, 0, 255)
+    path = tmp_path / 'plan.png'
+    Image.fromarray(pixels, 'RGBA').save(path)
+
+    prepared = ImagePreprocessor(margin=10).prepare(str(path))
+    assert (prepared.transform.offset_x, prepared.transform.offset_y) == (30, 30)
+    assert prepared.image.size == (40, 40)
+    assert prepared.image.getpixel((0, 0)) == 255
+
+
+def test_gray_levels_are_kept_by_default(tmp_path):
+    gradient = np.tile(np.arange(256, dtype=np.uint8), (16, 1))
+    path = tmp_path / 'gradient.png'
+    Image.fromarray(gradient, 'L').save(path)
+
+    image = ImagePreprocessor(crop_whitespace=False).prepare(str(path)).image
+    assert len(np.unique(np.asarray(image))) == 256
+    posterized = ImagePreprocessor(crop_whitespace=False, gray_bits=4).prepare(str(path)).image
+    assert len(np.unique(np.asarray(posterized))) == 16
+
+
+def test_raw_output_is_mapped_back_to_original_pixels():
+    transform = ImageTransform(scale=0.5, offset_x=30, offset_y=10, original_size=(400, 300),
+                               processed_size=(100, 80))
+    box = [[10, 20], [30, 20], [30, 40], [10, 40]]
+    mapped_box = [[50.0, 50.0], [90.0, 50.0], [90.0, 90.0], [50.0, 90.0]]
+    raw = {
+        'walls': [{'position': [[0, 0], [100, 0]]}],
+        'doors': [{'bbox': box}],
+        'windows': [{'bbox': box, 'kind': 'sliding'}],
+        'rooms': [[{'x': 0, 'y': 0}, {'x': 10, 'y': 0}, {'x': 10, 'y': 10}]],
+        'area': 100,
+        'perimeter': 40
+    }
+    mapped = map_raw_to_original(raw, transform)
+
+    assert mapped['walls'] == [{'position': [[30.0, 10.0], [230.0, 10.0]]}]
+    assert mapped['doors'] == [{'bbox': mapped_box}]
+    assert mapped['windows'] == [{'bbox': mapped_box, 'kind': 'sliding'}]
+    assert mapped['rooms'][0][2] == {'x': 50.0, 'y': 30.0}
+    assert (mapped['area'], mapped['perimeter']) == (400, 80)
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+# The project's airflow/ folder is importable as a namespace package; check for Airflow itself
+pytest.importorskip('airflow.triggers.base')
+
+from src.rasterscan.service import PipelineService
+
+from conftest import PROJECT_ROOT
+
+sys.path.insert(0, str(PROJECT_ROOT / 'airflow' / 'plugins'))
+from floorplan_recognition import RecognitionTrigger  # noqa: E402
+
+RAW = PROJECT_ROOT / 'outputs' / 'rasterscan' / 'recognizer_raw.json'
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope='module')
+def fake_endpoint():
+    """
+    The local service replaying a saved recognition, as documented for
+    testing the DAG without the RasterScan API
+    """
+    port = free_port()
+    service = PipelineService(workers=1, replay_raw_path=str(RAW))
+    threading.Thread(target=service.serve, kwargs={'port': port}, daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    return f"http://127.0.0.1:{port}/raster-to-vector-raw"
+
+
+def run_trigger(trigger):
+    async def collect():
+        return [event.payload async for event in trigger.run()]
+    return asyncio.run(collect())
+
+
+def test_trigger_writes_the_fake_endpoint_response(tmp_path, fake_endpoint):
+    upload = tmp_path / 'upload.png'
+    upload.write_bytes(b'not decoded by the replaying endpoint')
+    response = tmp_path / 'upload.response.json'
+    trigger = RecognitionTrigger(str(upload), str(response), url=fake_endpoint, request_timeout=30)
+
+    assert run_trigger(trigger) == [{'status': 'success', 'response_path': str(response)}]
+    assert json.loads(response.read_text()) == json.loads(RAW.read_text())
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_trigger_reports_http_errors(tmp_path, fake_endpoint):
+    upload = tmp_path / 'upload.png'
+    upload.write_bytes(b'')
+    trigger = RecognitionTrigger(str(upload), str(tmp_path / 'response.json'), url=fake_endpoint,
+                                 request_timeout=30)
+
+    [event] = run_trigger(trigger)
+    assert event['status'] == 'error' and '400' in event['message']
+    assert not (tmp_path / 'response.json').exists()
+
+
+def test_trigger_round_trips_through_serialization(tmp_path):
+    trigger = RecognitionTrigger('a.png', 'a.json', url='http://fake', request_timeout=5)
+    path, kwargs = trigger.serialize()
+    assert path == 'floorplan_recognition.RecognitionTrigger'
+    assert RecognitionTrigger(**kwargs).serialize() == (path, kwargs)
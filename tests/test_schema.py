@@ -0,0 +1,51 @@
+import json
+
+from src.gemini.schema import (CANONICAL_SCHEMA, DOOR, RAW_SCHEMA, ROOM, ROOM_REPAIR_SCHEMA, WINDOW,
+                               from_response, repair, to_response_schema, validate)
+
+
+def test_response_schema_uses_proto_field_names():
+    for schema in (RAW_SCHEMA, CANONICAL_SCHEMA, ROOM_REPAIR_SCHEMA):
+        text = json.dumps(to_response_schema(schema))
+        assert 'minItems' not in text and 'maxItems' not in text and 'additionalProperties' not in text
+    point = to_response_schema(CANONICAL_SCHEMA)['properties']['walls']['items']['properties']['start']
+    assert (point['min_items'], point['max_items']) == (2, 2)
+
+
+def test_adjacency_graph_round_trips_through_entry_lists():
+    response_schema = to_response_schema(CANONICAL_SCHEMA)
+    assert response_schema['properties']['adjacency_graph']['type'] == 'ARRAY'
+
+    response = {
+        'rooms': [{'id': 'r1', 'type': 'bedroom', 'vertices': [[0, 0], [1, 0], [1, 1]]}],
+        'walls': [],
+        'adjacency_graph': [{'room': 'r1', 'neighbors': ['r2']}, {'room': 'r2', 'neighbors': ['r1']}]
+    }
+    decoded = from_response(response, CANONICAL_SCHEMA)
+    assert decoded['adjacency_graph'] == {'r1': ['r2'], 'r2': ['r1']}
+    assert validate(decoded, CANONICAL_SCHEMA) == []
+
+
+def test_element_schemas_follow_the_canonical_dataclasses():
+    for opening in (DOOR, WINDOW):
+        assert {'wall_index', 'offset'} <= set(opening['properties'])
+        assert opening['required'] == ['position', 'width']
+    assert DOOR['properties']['connects']['items'] == {'type': 'string'}
+    assert ROOM['required'] == ['id', 'type', 'vertices']
+    assert 'doors' not in ROOM['properties']
+
+
+def test_invalid_items_are_kept_until_the_last_attempt():
+    response = {
+        'rooms': [{'id': 'r1', 'type': 'bedroom', 'vertices': [[0, 0], [1, 0], [1, 1]], 'area': '1.5'},
+                  {'id': 'r2', 'type': 'bedroom', 'vertices': [[0, 0]]}],
+        'walls': []
+    }
+    repaired, fixes = repair(json.loads(json.dumps(response)), RAW_SCHEMA)
+    assert repaired['rooms'][0]['area'] == 1.5 and len(repaired['rooms']) == 2
+    assert validate(repaired, RAW_SCHEMA) == ['$.rooms[1].vertices: expected at least 3 items']
+
+    repaired, fixes = repair(response, RAW_SCHEMA, drop_invalid=True)
+    assert [r['id'] for r in repaired['rooms']] == ['r1']
+    assert '$.rooms[1]: dropped invalid item' in fixes
+    assert validate(repaired, RAW_SCHEMA) == []
@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from src.rasterscan import service
+from src.rasterscan.optimizer import FloorplanOptimizer
+from src.rasterscan.service import MicroBatcher, _run_batch
+
+SQUARE = [{'x': 0, 'y': 0}, {'x': 100, 'y': 0}, {'x': 100, 'y': 100}, {'x': 0, 'y': 100}]
+
+
+def test_batches_are_split_across_workers():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        batcher = MicroBatcher('clean', pool, max_batch=8, max_wait_ms=200, workers=4)
+        futures = [batcher.submit({'raw': {'rooms': [SQUARE]}}) for _ in range(8)]
+        responses = [f.result(timeout=10) for f in futures]
+    assert all('result' in r for r in responses)
+    assert [r['batch_size'] for r in responses] == [2] * 8
+
+
+def test_submit_failure_answers_pending_requests():
+    pool = ThreadPoolExecutor(max_workers=1)
+    pool.shutdown()
+    batcher = MicroBatcher('clean', pool, max_wait_ms=1)
+    assert 'error' in batcher.submit({'raw': {}}).result(timeout=5)
+    # The batching thread survived and still answers
+    assert 'error' in batcher.submit({'raw': {}}).result(timeout=5)
+
+
+def test_missing_field_is_a_client_error():
+    assert _run_batch('clean', [{}]) == [{'error': "Missing field 'raw'", 'status': 400}]
+    assert _run_batch('optimize', [{'raw': {}}]) == [{'error': "Missing field 'floorplan'", 'status': 400}]
+    assert _run_batch('recognize', [{}]) == [{'error': "Missing field 'image_base64' or 'image'", 'status': 400}]
+    assert _run_batch('clean', [[]]) == [{'error': "Expected a JSON object", 'status': 400}]
+
+
+def test_key_error_inside_a_stage_is_a_server_error(monkeypatch):
+    monkeypatch.setattr(service, '_optimizer', FloorplanOptimizer())
+    # The request has its fields; the stage failing on the plan is not a client error
+    assert _run_batch('optimize', [{'floorplan': {'rooms': [{'id': 'room_0'}]}}]) == \
+        [{'error': "KeyError: 'room_type'"}]
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+from PIL import Image
+
+from src.rasterscan.recognizer import FloorplanRecognizer, ReplayBackend
+from src.rasterscan.stream import StreamingPipeline, watch_directory
+
+from conftest import PROJECT_ROOT
+
+RAW = PROJECT_ROOT / 'outputs' / 'rasterscan' / 'recognizer_raw.json'
+
+
+@pytest.fixture
+def images(tmp_path):
+    incoming = tmp_path / 'incoming'
+    incoming.mkdir()
+    # Identical images share every checkpoint and fingerprint; a.png and a.jpg share a stem
+    for name in ('a.png', 'a.jpg', 'b.png', 'c.png'):
+        Image.new('RGB', (64, 64), 'white').save(incoming / name)
+    return incoming
+
+
+@pytest.mark.parametrize('dedup', [False, True])
+def test_duplicate_images_are_all_processed(tmp_path, images, dedup):
+    recognizer = FloorplanRecognizer(method='rasterscan', backend=ReplayBackend(str(RAW)))
+    pipeline = StreamingPipeline(
+        str(tmp_path / 'out'), recognizer,
+        workers={'recognize': 4, 'clean': 4, 'optimize': 4},
+        checkpoint_dir=str(tmp_path / 'checkpoints'),
+        dedup_dir=str(tmp_path / 'dedup') if dedup else None,
+        input_root=str(images)
+    )
+    for path in watch_directory(str(images), once=True):
+        pipeline.submit(path)
+    pipeline.close()
+
+    assert all(stage['errors'] == 0 for stage in pipeline.stats())
+    for name in ('a.png', 'a.jpg', 'b.png', 'c.png'):
+        for output in ('recognizer_raw.json', 'cleaned_canonical.json', 'optimized.json'):
+            assert (tmp_path / 'out' / name / output).exists(), f"{name}/{output}"
+    optimized = json.loads((tmp_path / 'out' / 'a.png' / 'optimized.json').read_text())
+    assert optimized['rooms']
+
+
+def test_same_file_names_in_different_folders_do_not_collide(tmp_path, monkeypatch):
+    for folder, size in (('north', 64), ('south', 32)):
+        (tmp_path / 'scans' / folder).mkdir(parents=True)
+        Image.new('RGB', (size, size), 'white').save(tmp_path / 'scans' / folder / 'plan.png')
+    outside = tmp_path / 'other' / 'plan.png'
+    outside.parent.mkdir()
+    Image.new('RGB', (16, 16), 'white').save(outside)
+
+    recognizer = FloorplanRecognizer(method='rasterscan', backend=ReplayBackend(str(RAW)))
+    pipeline = StreamingPipeline(str(tmp_path / 'out'), recognizer, input_root=str(tmp_path / 'scans'))
+    monkeypatch.chdir(tmp_path / 'scans')
+    for path in ('north/plan.png', str(tmp_path / 'scans' / 'south' / 'plan.png'), str(outside)):
+        pipeline.submit(path)
+    pipeline.close()
+
+    assert all(stage['errors'] == 0 for stage in pipeline.stats())
+    folders = {p.parent.relative_to(tmp_path / 'out').as_posix() for p in (tmp_path / 'out').rglob('optimized.json')}
+    hashed = folders - {'north/plan.png', 'south/plan.png'}
+    assert len(folders) == 3 and len(hashed) == 1 and hashed.pop().startswith('plan.png-')
@@ -0,0 +1,124 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.gemini.gemini_processor import GeminiFloorplanProcessor
+from src.gemini.schema import RAW_SCHEMA
+from src.gemini.streaming import IncrementalFloorplanParser
+
+PLAN = {
+    'rooms': [
+        {'id': 'room_0', 'name': 'Living "open" room {east}', 'vertices': [{'x': 0, 'y': 0}, {'x': 4, 'y': 0}]},
+        {'id': 'room_1', 'name': 'Back\\\\slash', 'vertices': [{'x': 4, 'y': 0}, {'x': 8, 'y': 0}]}
+    ],
+    'walls': [{'start': {'x': 0, 'y': 0}, 'end': {'x': 8, 'y': 0}}],
+    'doors': [],
+    'metadata': {'note': 'ends with a brace }'}
+}
+
+
+def feed(parser, text, size):
+    completed = []
+    for start in range(0, len(text), size):
+        completed += parser.feed(text[start:start + size])
+    return completed
+
+
+@pytest.mark.parametrize('size', [1, 7, 10000])
+def test_complete_stream_emits_every_element_once(size):
+    text = '```json\n' + json.dumps(PLAN, indent=2) + '\n```'
+    parser = IncrementalFloorplanParser()
+    completed = feed(parser, text, size)
+
+    assert completed == [('rooms', PLAN['rooms'][0]), ('rooms', PLAN['rooms'][1]), ('walls', PLAN['walls'][0])]
+    assert parser.finish() == PLAN
+
+
+def test_escaped_quotes_and_braces_inside_strings_do_not_end_an_element():
+    parser = IncrementalFloorplanParser()
+    text = json.dumps(PLAN)
+    cut = text.index('open')
+    assert parser.feed(text[:cut]) == []
+    assert parser.feed(text[cut:text.index('room_1')]) == [('rooms', PLAN['rooms'][0])]
+    assert parser.elements['rooms'][0]['name'] == 'Living "open" room {east}'
+
+
+def test_stream_cut_off_mid_element_is_salvaged():
+    text = json.dumps(PLAN)
+    parser = IncrementalFloorplanParser()
+    feed(parser, text[:text.index('Back')], 5)
+    result = parser.finish()
+
+    assert result['rooms'] == PLAN['rooms'][:1]
+    assert result['walls'] == []
+    assert result['metadata'] == {'salvaged': True,
+                                  'salvaged_counts': {'rooms': 1, 'walls': 0, 'doors': 0, 'windows': 0}}
+
+
+def test_stream_without_any_element_fails():
+    parser = IncrementalFloorplanParser()
+    parser.feed('{"rooms": [{"id": "ro')
+    with pytest.raises(ValueError):
+        parser.finish()
+
+
+class StreamingModel:
+    """
+    Stands in for genai.GenerativeModel: each call streams the next response
+    """
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        text = self.responses.pop(0)
+        return [SimpleNamespace(text=text[i:i + 16]) for i in range(0, len(text), 16)]
+
+
+def processor(responses, max_retries):
+    # Bypass __init__, which configures the Gemini SDK
+    gemini = GeminiFloorplanProcessor.__new__(GeminiFloorplanProcessor)
+    gemini.model = StreamingModel(responses)
+    gemini.stream = True
+    gemini.on_element = None
+    gemini.structured_output = False
+    gemini.max_retries = max_retries
+    gemini.metrics = dict.fromkeys(['calls', 'parse_failures', 'schema_failures', 'json_repairs',
+                                    'schema_repairs', 'truncated_responses', 'retries'], 0)
+    gemini.call_log = []
+    return gemini
+
+
+def test_truncated_stream_is_retried():
+    text = json.dumps(PLAN)
+    gemini = processor([text[:text.index('Back')], text], max_retries=1)
+    assert gemini._generate_json('clean', 'prompt') == PLAN
+    assert gemini.metrics['truncated_responses'] == 1 and gemini.metrics['retries'] == 1
+
+
+def test_salvaged_result_is_used_after_the_last_retry():
+    text = json.dumps(PLAN)
+    cut = text[:text.index('Back')]
+    gemini = processor([cut, cut], max_retries=1)
+    result = gemini._generate_json('clean', 'prompt')
+    assert result['rooms'] == PLAN['rooms'][:1] and result['metadata']['salvaged']
+    assert gemini.metrics['calls'] == 2
+
+
+def test_invalid_element_is_retried_before_it_is_dropped():
+    room = {'id': 'r1', 'type': 'bedroom', 'vertices': [[0, 0], [1, 0], [1, 1]]}
+    bad = json.dumps({'rooms': [room, {'id': 'r2', 'type': 'hall', 'vertices': [[0, 0]]}], 'walls': []})
+
+    gemini = processor([bad, json.dumps({'rooms': [room], 'walls': []})], max_retries=1)
+    assert gemini._generate_json('recognize', 'prompt', RAW_SCHEMA)['rooms'] == [room]
+    assert gemini.metrics['retries'] == 1 and gemini.metrics['schema_repairs'] == 0
+
+    gemini = processor([bad, bad], max_retries=1)
+    assert gemini._generate_json('recognize', 'prompt', RAW_SCHEMA)['rooms'] == [room]
+    assert gemini.metrics['calls'] == 2 and gemini.metrics['schema_repairs'] == 1
+
+
+def test_negative_max_retries_is_rejected():
+    with pytest.raises(ValueError, match='max_retries'):
+        GeminiFloorplanProcessor(api_key='unused', max_retries=-1)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from src.rasterscan.cleaner import FloorplanCleaner
+from src.rasterscan.helper import load_json
+from src.rasterscan.tiled_cleaner import TiledCleaner
+
+from conftest import PROJECT_ROOT
+
+SAMPLE = load_json(str(PROJECT_ROOT / 'outputs' / 'rasterscan' / 'recognizer_raw.json'))
+
+
+def grid_plan(rows=4, cols=4, cell=100.0, jitter=2.5, seed=0):
+    """
+    Raw plan of rows x cols rooms whose corners sit on multiples of cell,
+    i.e. on the tile seams when tile_size == cell: the wall endpoints that
+    snap together fall in different tiles, and doors straddle tile edges
+    """
+    rng = np.random.default_rng(seed)
+
+    def noisy(x, y):
+        dx, dy = rng.uniform(-jitter, jitter, 2)
+        return [round(float(x + dx), 2), round(float(y + dy), 2)]
+
+    rooms, walls, doors, windows = [], [], [], []
+    for r in range(rows):
+        for c in range(cols):
+            x0, y0 = c * cell, r * cell
+            corners = [noisy(x0, y0), noisy(x0 + cell, y0), noisy(x0 + cell, y0 + cell), noisy(x0, y0 + cell)]
+            rooms.append([{'x': x, 'y': y} for x, y in corners])
+            walls.append({'position': [noisy(x0, y0), noisy(x0 + cell, y0)]})
+            walls.append({'position': [noisy(x0, y0), noisy(x0, y0 + cell)]})
+            # Door centers just either side of the vertical seam x0 + cell
+            side = 1.5 if (r + c) % 2 else -1.5
+            mx, my = x0 + cell + side, y0 + cell / 2
+            doors.append({'bbox': [noisy(mx - 3, my - 12), noisy(mx + 3, my - 12),
+                                   noisy(mx + 3, my + 12), noisy(mx - 3, my + 12)]})
+        windows.append({'bbox': [noisy(-2, r * cell + 40), noisy(2, r * cell + 40),
+                                 noisy(2, r * cell + 60), noisy(-2, r * cell + 60)]})
+    return {'rooms': rooms, 'walls': walls, 'doors': doors, 'windows': windows}
+
+
+@pytest.mark.parametrize('tile_size', [50.0, 100.0, 130.0])
+@pytest.mark.parametrize('seed', [0, 1])
+def test_tiled_clean_matches_the_serial_clean(tile_size, seed):
+    raw = grid_plan(seed=seed)
+    expected = FloorplanCleaner().clean(raw).to_dict()
+    assert TiledCleaner(workers=1, tile_size=tile_size).clean(raw).to_dict() == expected
+
+
+@pytest.mark.parametrize('tile_size', [150.0, 400.0])
+def test_tiled_clean_of_the_sample_plan_matches_the_serial_clean(tile_size):
+    expected = FloorplanCleaner().clean(SAMPLE).to_dict()
+    assert TiledCleaner(workers=1, tile_size=tile_size).clean(SAMPLE).to_dict() == expected
+
+
+def test_tiles_cleaned_on_a_process_pool_match_the_serial_clean():
+    raw = grid_plan(rows=5, cols=5)
+    expected = FloorplanCleaner().clean(raw).to_dict()
+    assert TiledCleaner(workers=2, tile_size=100.0).clean(raw).to_dict() == expected
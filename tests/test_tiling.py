@@ -0,0 +1,64 @@
+import pytest
+import shapely
+from PIL import Image
+
+from src.rasterscan.recognizer import ReplayBackend
+from src.rasterscan.tiling import TiledRecognizer
+
+
+def bbox(x0, y0, x1, y1):
+    return {'bbox': [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]}
+
+
+def square(x0, y0, x1, y1):
+    return [{'x': x0, 'y': y0}, {'x': x1, 'y': y0}, {'x': x1, 'y': y1}, {'x': x0, 'y': y1}]
+
+
+# A 300 x 200 scan in 160 px tiles with 40 px overlap: tile columns start at
+# x = 0, 120, 140 and rows at y = 0, 40, so the door and the second window
+# lie in the overlap of three tile columns
+RAW = {
+    'walls': [{'position': [[10, 100], [290, 100]]}],
+    'rooms': [square(20, 20, 280, 90)],
+    'doors': [bbox(145, 120, 155, 130)],
+    'windows': [bbox(100, 95, 130, 105), bbox(145, 10, 158, 15)]
+}
+
+
+@pytest.fixture
+def stitched():
+    tiler = TiledRecognizer(ReplayBackend(RAW), tile_size=160, overlap=40, max_workers=2)
+    return tiler.recognize(Image.new('L', (300, 200), 255))
+
+
+def test_tile_boxes_cover_the_image_with_the_overlap():
+    tiler = TiledRecognizer(None, tile_size=160, overlap=40)
+    boxes = tiler.tile_boxes((300, 200))
+    assert boxes == [(0, 0, 160, 160), (120, 0, 280, 160), (140, 0, 300, 160),
+                     (0, 40, 160, 200), (120, 40, 280, 200), (140, 40, 300, 200)]
+    assert shapely.union_all([shapely.box(*b) for b in boxes]).equals(shapely.box(0, 0, 300, 200))
+    assert tiler.tile_boxes((100, 80)) == [(0, 0, 100, 80)]
+
+
+def test_wall_crossing_a_seam_is_merged(stitched):
+    assert stitched['tiling']['tiles'] == 6
+    assert stitched['walls'] == [{'position': [[10.0, 100.0], [290.0, 100.0]]}]
+
+
+def test_room_split_across_tiles_is_unioned(stitched):
+    [room] = stitched['rooms']
+    polygon = shapely.Polygon([(v['x'], v['y']) for v in room])
+    assert polygon.normalize().equals(shapely.box(20, 20, 280, 90).normalize())
+
+
+def test_openings_duplicated_at_a_seam_are_kept_once(stitched):
+    assert stitched['doors'] == [bbox(145, 120, 155, 130)]
+    assert sorted(stitched['windows'], key=lambda w: w['bbox'][0]) == RAW['windows']
+
+
+def test_replay_backend_clips_windows_to_the_tile():
+    clipped = ReplayBackend(RAW).recognize(b'', box=(0, 0, 160, 160))
+    assert [w['bbox'] for w in clipped['windows']] == [
+        bbox(100, 95, 130, 105)['bbox'], bbox(145, 10, 158, 15)['bbox']]
+    clipped = ReplayBackend(RAW).recognize(b'', box=(0, 40, 160, 200))
+    assert clipped['windows'] == [bbox(100, 55, 130, 65)]
@@ -0,0 +1,106 @@
+import copy
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from src.rasterscan.versions import VersionStore, apply_delta, diff_floorplans
+
+
+def room(rid, x, size=10):
+    return {'id': rid, 'room_type': 'bedroom', 'area': size * size, 'doors': [], 'windows': [],
+            'vertices': [{'x': x, 'y': 0}, {'x': x + size, 'y': 0}, {'x': x + size, 'y': size}, {'x': x, 'y': size}]}
+
+
+def wall(x1, y1, x2, y2):
+    return {'start': {'x': x1, 'y': y1}, 'end': {'x': x2, 'y': y2}, 'thickness': 1}
+
+
+@pytest.fixture
+def parent():
+    return {
+        'rooms': [room('room_0', 0), room('room_1', 10), room('room_2', 20)],
+        'walls': [wall(0, 0, 30, 0), wall(30, 0, 30, 10), wall(30, 10, 0, 10), wall(0, 10, 0, 0)],
+        'total_area': 300,
+        'metadata': {'action': None}
+    }
+
+
+def round_trip(parent, child):
+    delta = diff_floorplans(parent, child)
+    assert apply_delta(copy.deepcopy(parent), delta) == child
+    return delta
+
+
+def test_rooms_added_removed_and_modified(parent):
+    child = copy.deepcopy(parent)
+    del child['rooms'][1]
+    child['rooms'][0]['room_type'] = 'living_room'
+    child['rooms'].append(room('room_3', 30))
+    delta = round_trip(parent, child)
+    assert delta['rooms'] == {'added': [room('room_3', 30)], 'removed': ['room_1'], 'modified': [child['rooms'][0]]}
+    assert 'walls' not in delta
+
+
+def test_room_order_change(parent):
+    child = copy.deepcopy(parent)
+    child['rooms'].reverse()
+    assert round_trip(parent, child)['rooms'] == {'order': ['room_2', 'room_1', 'room_0']}
+
+
+def test_walls_inserted_and_removed(parent):
+    child = copy.deepcopy(parent)
+    child['walls'].insert(1, wall(10, 0, 10, 10))
+    del child['walls'][3]
+    child['walls'].append(wall(20, 0, 20, 10))
+    delta = round_trip(parent, child)
+    assert delta['walls'] == {'added': [[1, wall(10, 0, 10, 10)], [4, wall(20, 0, 20, 10)]], 'removed': [2]}
+
+
+def test_fields_set_and_unset(parent):
+    child = copy.deepcopy(parent)
+    child['total_area'] = 200
+    del child['metadata']
+    assert round_trip(parent, child) == {'set': {'total_area': 200}, 'unset': ['metadata']}
+
+
+def test_duplicate_room_ids_need_a_snapshot(parent):
+    child = copy.deepcopy(parent)
+    child['rooms'].append(room('room_0', 40))
+    assert diff_floorplans(parent, child) is None
+
+
+def test_snapshot_every_limits_the_delta_chain(tmp_path, parent):
+    store = VersionStore(str(tmp_path), snapshot_every=3)
+    plans = [parent]
+    store.commit('plan', parent)
+    for step in range(8):
+        child = copy.deepcopy(plans[-1])
+        child['rooms'].append(room(f'added_{step}', 100 + 10 * step))
+        plans.append(child)
+        assert store.commit('plan', child, parent=step) == step + 1
+
+    history = store.history('plan')
+    assert [r['kind'] for r in history] == ['snapshot', 'delta', 'delta', 'delta'] * 2 + ['snapshot']
+    assert max(r['depth'] for r in history) == 3
+
+    cold = VersionStore(str(tmp_path), snapshot_every=3)
+    assert [cold.materialize('plan', v) for v in range(len(plans))] == plans
+
+
+def _commit(root, plan, count):
+    store = VersionStore(root)
+    return [store.commit('plan', plan, parent=0) for _ in range(count)]
+
+
+def test_concurrent_processes_get_distinct_versions(tmp_path, parent):
+    root = str(tmp_path)
+    VersionStore(root).commit('plan', parent)
+    child = copy.deepcopy(parent)
+    child['total_area'] = 200
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        versions = [v for part in pool.map(_commit, [root] * 4, [child] * 4, [5] * 4) for v in part]
+
+    assert sorted(versions) == list(range(1, 21))
+    history = VersionStore(root).history('plan')
+    assert [r['version'] for r in history] == list(range(21))
+    assert all(VersionStore(root).materialize('plan', v) == child for v in range(1, 21))